@@ -10,6 +10,7 @@ from src.server.routes.item import router as itemsRouter, admin as itemsAdmin
 from src.server.routes.rune import router as runesRouter, admin as runesAdmin
 from src.server.routes.summonerspell import router as summonerspellsRouter, admin as summonerspellsAdmin
 from src.server.routes.migration import admin as migrationAdmin
+from src.server.utils.compression import CompressionMiddleware
 
 
 
@@ -26,6 +27,7 @@ def add_middleware(app: FastAPI) -> None:
         allow_methods=["*"],
         allow_headers=["*"]
     )
+    app.add_middleware(CompressionMiddleware)
 
 
 
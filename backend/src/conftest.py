@@ -1,11 +1,14 @@
 import copy
+import dataclasses
 import json
 import pytest
 
 from bs4 import BeautifulSoup
 from bson.objectid import ObjectId
 from datetime import datetime
+from typing import Callable
 
+from src.server import database
 from src.server.loader.helper import RuneClass
 from src.server.models.json_validation import (
     ChampionJson,
@@ -17,6 +20,7 @@ from src.server.models.json_validation import (
     SummonerspellJson
 )
 from src.server.models.champion import Champion
+from src.server.models.effect import Effect, EffectComponent
 from src.server.models.dataenums import (
     ActionEffect,
     ActionType,
@@ -24,6 +28,7 @@ from src.server.models.dataenums import (
     DamageSubType,
     DamageType,
     HpScaling,
+    ItemClass,
     EffectComp,
     HealProperties,
     ProcessedDamageProperties,
@@ -57,6 +62,8 @@ def compare_objects():
             return len(obj1) == len(obj2) and all(_compare(a, b, float_precision) for a, b in zip(obj1, obj2))
         if isinstance(obj1, dict):
             return obj1.keys() == obj2.keys() and all(_compare(obj1[k], obj2[k], float_precision) for k in obj1)
+        if dataclasses.is_dataclass(obj1) and not isinstance(obj1, type):
+            return all(_compare(getattr(obj1, f.name), getattr(obj2, f.name), float_precision) for f in dataclasses.fields(obj1))
         if hasattr(obj1, "__dict__") and hasattr(obj2, "__dict__"):
             return _compare(vars(obj1), vars(obj2), float_precision)
         return obj1 == obj2
@@ -68,6 +75,31 @@ def resolve_fixture(request):
     return request.getfixturevalue(request.param)  # Resolves fixture dynamically
 
 
+
+class VersionCollection():
+    # In-memory stand-in for the versions collection that every process reads the data version from.
+    def __init__(self) -> None:
+        self.documents: dict[str, dict] = {}
+
+    async def find_one(self, query: dict) -> dict | None:
+        document = self.documents.get(query["_id"])
+        return dict(document) if document else None
+
+    async def find_one_and_update(self, query: dict, update: dict, upsert: bool = False, return_document=None) -> dict:
+        document = self.documents.setdefault(query["_id"], {"_id": query["_id"], "version": 0})
+        document["version"] += update["$inc"]["version"]
+        return dict(document)
+
+
+@pytest.fixture(autouse=True)
+def version_collection(mocker) -> VersionCollection:
+    collection = VersionCollection()
+    mocker.patch.object(database, "version_collection", collection)
+    database.data_version_cache.clear()
+    yield collection
+    database.data_version_cache.clear()
+
+
 @pytest.fixture
 def load_html():
     def _loader(name: str) -> str:
@@ -520,3 +552,66 @@ def sim(aatrox_with_items) -> Simulation:
     aatrox2 = copy.deepcopy(aatrox_with_items)
     sim = Simulation(aatrox_with_items, aatrox2)
     return sim
+
+
+
+@pytest.fixture()
+def aatrox_dot(aatrox) -> Champion:
+    aatrox.w.effects = [Effect(
+        text="Damage over time.",
+        effect_components=[EffectComponent(
+            type_=EffectType.DAMAGE,
+            duration=3,
+            interval=0.5,
+            props=DamageProperties(
+                scaling="20 + 0.3 * ad",
+                dmg_type=DamageType.DOT,
+                dmg_sub_type=DamageSubType.MAGIC
+            )
+        )]
+    )]
+    aatrox.w.cooldown = "1"
+    aatrox.w.validated = True
+    aatrox.e.effects = [Effect(
+        text="Delayed damage over time.",
+        effect_components=[EffectComponent(
+            type_=EffectType.DAMAGE,
+            duration=2,
+            interval=0.25,
+            delay=0.2,
+            props=DamageProperties(
+                scaling="10 + rank * 5 + 0.1 * ad",
+                dmg_type=DamageType.DOT,
+                dmg_sub_type=DamageSubType.PHYSIC
+            )
+        )]
+    )]
+    aatrox.e.cooldown = "2"
+    aatrox.e.validated = True
+    return aatrox
+
+
+@pytest.fixture
+def dot_sim(aatrox_dot) -> Simulation:
+    ap = Rank(
+        q=3,
+        w=1,
+        e=1,
+        r=0
+    )
+    blue = Character(champion=aatrox_dot, lvl=9, rank=ap, items=[])
+    red = Character(champion=copy.deepcopy(aatrox_dot), lvl=9, rank=ap, items=[])
+    return Simulation(blue, red)
+
+
+
+@pytest.fixture
+def make_item() -> Callable[..., Item]:
+    # Builds a triforce clone with the given stats, for optimizer pools and item-heavy scenarios.
+    def make(index: int, stats: dict[str, float], gold: int, class_: ItemClass = ItemClass.LEGENDARY, into: list[str] = [], from_: list[str] = []) -> Item:
+        with open("src/tests/static/json/triforce.json", encoding='UTF-8') as f:
+            data = json.load(f)
+        data |= {"_id": f"{index:024x}", "item_id": str(1000 + index), "name": f"Item {index}", "stats": stats,
+                 "gold": gold, "class_": class_.value, "into": into, "from_": from_}
+        return Item.parse_obj(data)
+    return make
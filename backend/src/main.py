@@ -11,6 +11,8 @@ from src.server.routes.item import router as itemsRouter
 from src.server.routes.rune import router as runesRouter
 from src.server.routes.summonerspell import router as summonerspellsRouter
 from src.server.routes.simulation import router as simulationRouter
+from src.server.simulation.executor import shutdown_executor
+from src.server.utils.compression import CompressionMiddleware
 
 
 
@@ -26,6 +28,7 @@ def add_middleware(app: FastAPI) -> None:
         allow_methods=["*"],
         allow_headers=["*"]
     )
+    app.add_middleware(CompressionMiddleware)
     
 
 def include_routers(app: FastAPI) -> None:
@@ -47,6 +50,7 @@ async def lifespan(app: FastAPI):
     # This is where you can add any startup actions if needed
     yield
     # Cleanup actions can be added here if needed
+    shutdown_executor()
 
 
 def start_application() -> FastAPI:
@@ -1,26 +1,42 @@
 import asyncio
 import logging
 import os
+import pickle
 
 from bson import ObjectId
+from pydantic import BaseModel
 from datetime import datetime
 from motor.core import AgnosticCollection, AgnosticDatabase
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import ReturnDocument
 from pymongo.errors import InvalidURI
 from pymongo.results import UpdateResult
+from typing import Type, TypeVar
 
 from src.server.models.patch import NewPatch, Patch
-from src.server.models.champion import NewChampion, Champion, ShortChampion
+from src.server.models.champion import BaseStatTable, NewChampion, Champion, ShortChampion
 from src.server.models.item import NewItem, Item, ShortItem
 from src.server.models.rune import NewRune, Rune, ShortRune
 from src.server.models.summonerspell import NewSummonerspell, Summonerspell, ShortSummonerspell
 from src.server.models.dataenums import Map
+from src.server.models.trusted import decode_document
+from src.server.utils.cache import TTLCache, clear_document_caches, invalidate_document, register_document_cache
+from src.server.utils.compression import EncodedBody
+from src.server.utils.projection import mongo_projection, partial_model
+from src.server.utils.serialize import dumps_model
 
 
 
 
 patch_logger = logging.getLogger("patch_logger")
 
+T = TypeVar("T", bound=BaseModel)
+
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "2048"))
+DOCUMENT_CACHE_TTL = float(os.getenv("DOCUMENT_CACHE_TTL", "600"))
+DATA_VERSION_TTL = float(os.getenv("DATA_VERSION_TTL", "2"))
+DATA_VERSION_ID = "data"
+
 
 def connect_database() -> AgnosticDatabase:
     host = os.getenv("MONGODB_HOST", "")
@@ -55,6 +71,117 @@ champion_collection: AgnosticCollection = database.champions
 item_collection: AgnosticCollection = database.items
 rune_collection: AgnosticCollection = database.runes
 summonerspell_collection: AgnosticCollection = database.summonerspells
+version_collection: AgnosticCollection = database.versions
+
+# The public app and the admin app run as separate processes, so in-process invalidation never reaches the
+# process that serves reads. Every write bumps a counter stored in the database instead; caches of derived
+# data put it in their keys, and each process re-reads it at most every DATA_VERSION_TTL seconds.
+data_version_cache: TTLCache[str, int] = TTLCache(1, DATA_VERSION_TTL)
+
+# Parsed full documents keyed by (model, ObjectId, data version), stored pickled so that every hit hands out its
+# own copy and callers can never mutate what the next request gets. Entries are tagged with the id so update_* can drop them.
+document_cache: TTLCache[tuple[str, str, int], bytes] = register_document_cache(TTLCache(DOCUMENT_CACHE_SIZE, DOCUMENT_CACHE_TTL))
+# Champion base stat tables under the same keys. The table is kept out of the pickled copies and attached to each
+# one on the way out, so it is built once per champion and data version and shared by every Character of it.
+stat_table_cache: TTLCache[tuple[str, str, int], BaseStatTable] = register_document_cache(TTLCache(DOCUMENT_CACHE_SIZE, DOCUMENT_CACHE_TTL))
+# Serialized JSON of the same documents for the detail routes, under the same keys, so hits skip both parsing and
+# encoding. The bodies are immutable bytes and can be shared.
+document_json_cache: TTLCache[tuple[str, str, int], EncodedBody] = register_document_cache(TTLCache(DOCUMENT_CACHE_SIZE, DOCUMENT_CACHE_TTL))
+
+
+async def fetch_data_version() -> int:
+    version = data_version_cache.get(DATA_VERSION_ID)
+    if version is None:
+        document = await version_collection.find_one({"_id": DATA_VERSION_ID})
+        version = document["version"] if document else 0
+        data_version_cache.set(DATA_VERSION_ID, version)
+    return version
+
+
+async def bump_data_version() -> int:
+    document = await version_collection.find_one_and_update(
+        {"_id": DATA_VERSION_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    data_version_cache.set(DATA_VERSION_ID, document["version"])
+    return document["version"]
+
+
+def _cached_model(key: tuple[str, str, int]) -> BaseModel | None:
+    snapshot = document_cache.get(key)
+    if snapshot is None:
+        return None
+    return _share_stat_table(key, pickle.loads(snapshot))
+
+
+def _cache_model(key: tuple[str, str, int], model: BaseModel) -> None:
+    document_cache.set(key, pickle.dumps(model, pickle.HIGHEST_PROTOCOL), tags=[key[1]])
+    _share_stat_table(key, model)
+
+
+def _share_stat_table(key: tuple[str, str, int], model: BaseModel) -> BaseModel:
+    if isinstance(model, Champion):
+        table = stat_table_cache.get(key)
+        if table is None:
+            table = model.base_stat_table()
+            stat_table_cache.set(key, table, tags=[key[1]])
+        model._base_stat_table = table
+    return model
+
+
+async def _fetch_cached_by_id(collection: AgnosticCollection, model_cls: Type[T], id_: str) -> T | None:
+    object_id = ObjectId(id_)
+    key = (model_cls.__name__, str(object_id), await fetch_data_version())
+    model = _cached_model(key)
+    if model is None:
+        document = await collection.find_one({"_id":object_id})
+        if not document:
+            return None
+        model = decode_document(model_cls, document)
+        _cache_model(key, model)
+    return model
+
+
+async def _fetch_cached_by_ids(collection: AgnosticCollection, model_cls: Type[T], ids: list[str]) -> list[T | None]:
+    version = await fetch_data_version()
+    keys = [str(ObjectId(id_)) for id_ in ids]
+    models: dict[str, T | None] = {}
+    for key in keys:
+        if key not in models:
+            models[key] = _cached_model((model_cls.__name__, key, version))
+    missing = [ObjectId(key) for key, model in models.items() if model is None]
+    if missing:
+        async for document in collection.find({"_id": {"$in": missing}}):
+            model = decode_document(model_cls, document)
+            key = str(document["_id"])
+            _cache_model((model_cls.__name__, key, version), model)
+            models[key] = model
+    return [models[key] for key in keys]
+
+
+async def _fetch_json_by_id(collection: AgnosticCollection, model_cls: Type[T], id_: str) -> EncodedBody | None:
+    key = (model_cls.__name__, str(ObjectId(id_)), await fetch_data_version())
+    body = document_json_cache.get(key)
+    if body is None:
+        model = await _fetch_cached_by_id(collection, model_cls, id_)
+        if model is None:
+            return None
+        body = EncodedBody(dumps_model(model))
+        document_json_cache.set(key, body, tags=[key[1]])
+    return body
+
+
+async def _fetch_projected_by_id(collection: AgnosticCollection, model_cls: Type[T], id_: str, names: tuple[str, ...]) -> bytes | None:
+    object_id = ObjectId(id_)
+    model = _cached_model((model_cls.__name__, str(object_id), await fetch_data_version()))
+    if model is None:
+        document = await collection.find_one({"_id": object_id}, mongo_projection(model_cls, names))
+        if not document:
+            return None
+        model = partial_model(model_cls, names).parse_obj(document)
+    return dumps_model(model, include=set(names))
 
 
 
@@ -78,6 +205,8 @@ async def clear_patch(patch: str, hotfix: datetime | None) -> dict[str, int]:
         patch_collection.count_documents({"patch": patch, "hotfix": hotfix})
     )
 
+    await bump_data_version()
+    clear_document_caches()
     cleanup_successful = all(x == 0 for x in [champion_left, item_left, rune_left, spell_left])
 
     return {
@@ -150,6 +279,7 @@ async def clear_patches_collection() -> bool:
 async def add_champion(champion: NewChampion) -> str:
     document = champion.dict()
     result = await champion_collection.insert_one(document)
+    await bump_data_version()
     return result.inserted_id
 
 
@@ -164,7 +294,7 @@ async def fetch_champions_by_patch(patch: str, hotfix: datetime | None) -> list[
         {"patch":patch, "hotfix":hotfix},
         sort=[("name", 1)])
     async for document in cursor:
-        champion = Champion.parse_obj(document)
+        champion = decode_document(Champion, document)
         champions.append(champion)
     return champions
 
@@ -206,15 +336,25 @@ async def fetch_short_champions_by_patch(patch: str, hotfix: datetime | None) ->
 
 
 async def fetch_champion_by_id(id_: str) -> Champion | None:
-    document = await champion_collection.find_one({"_id":ObjectId(id_)})
-    if document:
-        champion = Champion.parse_obj(document)
-        return champion
-    return None
+    return await _fetch_cached_by_id(champion_collection, Champion, id_)
+
+
+async def fetch_champion_json_by_id(id_: str) -> EncodedBody | None:
+    return await _fetch_json_by_id(champion_collection, Champion, id_)
+
+
+async def fetch_champion_projection_by_id(id_: str, names: tuple[str, ...]) -> bytes | None:
+    return await _fetch_projected_by_id(champion_collection, Champion, id_, names)
+
+
+async def fetch_champions_by_ids(ids: list[str]) -> list[Champion | None]:
+    return await _fetch_cached_by_ids(champion_collection, Champion, ids)
 
 
 async def update_champion(champion: Champion) -> UpdateResult:
     result = await champion_collection.update_one({"_id":ObjectId(champion.id)}, {"$set": champion.dict()})
+    await bump_data_version()
+    invalidate_document(str(champion.id))
     return result
 
 
@@ -225,6 +365,7 @@ async def update_champion(champion: Champion) -> UpdateResult:
 async def add_item(item: NewItem) -> str:
     document = item.dict()
     result = await item_collection.insert_one(document)
+    await bump_data_version()
     return result.inserted_id
 
 
@@ -239,7 +380,7 @@ async def fetch_items_by_patch(patch: str, hotfix: datetime | None) -> list[Item
         {"patch":patch, "hotfix":hotfix},
         sort=[("name", 1)])
     async for document in cursor:
-        item = Item.parse_obj(document)
+        item = decode_document(Item, document)
         items.append(item)
     return items
 
@@ -258,14 +399,25 @@ async def fetch_short_items_by_patch(patch: str, hotfix: datetime | None, map: M
 
 
 async def fetch_item_by_id(id_: str) -> Item | None:
-    document = await item_collection.find_one({"_id":ObjectId(id_)})
-    if document:
-        return Item.parse_obj(document)
-    return None
+    return await _fetch_cached_by_id(item_collection, Item, id_)
+
+
+async def fetch_item_json_by_id(id_: str) -> EncodedBody | None:
+    return await _fetch_json_by_id(item_collection, Item, id_)
+
+
+async def fetch_item_projection_by_id(id_: str, names: tuple[str, ...]) -> bytes | None:
+    return await _fetch_projected_by_id(item_collection, Item, id_, names)
+
+
+async def fetch_items_by_ids(ids: list[str]) -> list[Item | None]:
+    return await _fetch_cached_by_ids(item_collection, Item, ids)
 
 
 async def update_item(item: Item):
     result = await item_collection.update_one({"_id":ObjectId(item.id)}, {"$set": item.dict()})
+    await bump_data_version()
+    invalidate_document(str(item.id))
     return result
 
 
@@ -275,6 +427,7 @@ async def update_item(item: Item):
 async def add_rune(rune: NewRune) -> str:
     document = rune.dict()
     result = await rune_collection.insert_one(document)
+    await bump_data_version()
     return result.inserted_id
 
 
@@ -289,7 +442,7 @@ async def fetch_runes_by_patch(patch: str, hotfix: datetime | None) -> list[Rune
         {"patch":patch, "hotfix":hotfix},
         sort=[("name", 1)])
     async for document in cursor:
-        rune = Rune.parse_obj(document)
+        rune = decode_document(Rune, document)
         runes.append(rune)
     return runes
 
@@ -307,14 +460,21 @@ async def fetch_short_runes_by_patch(patch: str, hotfix: datetime | None) -> lis
 
 
 async def fetch_rune_by_id(id_: str) -> Rune | None:
-    document = await rune_collection.find_one({"_id":ObjectId(id_)})
-    if document:
-        return Rune.parse_obj(document)
-    return None
+    return await _fetch_cached_by_id(rune_collection, Rune, id_)
+
+
+async def fetch_rune_json_by_id(id_: str) -> EncodedBody | None:
+    return await _fetch_json_by_id(rune_collection, Rune, id_)
+
+
+async def fetch_rune_projection_by_id(id_: str, names: tuple[str, ...]) -> bytes | None:
+    return await _fetch_projected_by_id(rune_collection, Rune, id_, names)
 
 
 async def update_rune(rune: Rune):
     result = await rune_collection.update_one({"_id":ObjectId(rune.id)}, {"$set": rune.dict()})
+    await bump_data_version()
+    invalidate_document(str(rune.id))
     return result
 
 
@@ -324,6 +484,7 @@ async def update_rune(rune: Rune):
 async def add_summonerspell(summonerspell: NewSummonerspell) -> str:
     document = summonerspell.dict()
     result = await summonerspell_collection.insert_one(document)
+    await bump_data_version()
     return result.inserted_id
 
 
@@ -338,7 +499,7 @@ async def fetch_summonerspells_by_patch(patch: str, hotfix: datetime | None) ->
         {"patch":patch, "hotfix":hotfix},
         sort=[("name", 1)])
     async for document in cursor:
-        summonerspell = Summonerspell.parse_obj(document)
+        summonerspell = decode_document(Summonerspell, document)
         summonerspells.append(summonerspell)
     return summonerspells
 
@@ -357,12 +518,19 @@ async def fetch_short_summonerspells_by_patch(patch: str, hotfix: datetime | Non
 
 
 async def fetch_summonerspell_by_id(id_: str) -> Summonerspell | None:
-    document = await summonerspell_collection.find_one({"_id":ObjectId(id_)})
-    if document:
-        return Summonerspell.parse_obj(document)
-    return None
-    
+    return await _fetch_cached_by_id(summonerspell_collection, Summonerspell, id_)
+
+
+async def fetch_summonerspell_json_by_id(id_: str) -> EncodedBody | None:
+    return await _fetch_json_by_id(summonerspell_collection, Summonerspell, id_)
+
+
+async def fetch_summonerspell_projection_by_id(id_: str, names: tuple[str, ...]) -> bytes | None:
+    return await _fetch_projected_by_id(summonerspell_collection, Summonerspell, id_, names)
+
 
 async def update_summonerspell(summonerspell: Summonerspell):
     result = await summonerspell_collection.update_one({"_id":ObjectId(summonerspell.id)}, {"$set": summonerspell.dict()})
+    await bump_data_version()
+    invalidate_document(str(summonerspell.id))
     return result
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, PrivateAttr, validator
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Self
+from typing import Iterable, Self
 
 from src.server.models.ability import ChampionAbility, ShortChampionAbility
 from src.server.models.passive import ChampionPassive
@@ -8,7 +9,34 @@ from src.server.models.image import Image
 
 from .pydanticid import PydanticObjectId
 
-from src.server.models.dataenums import RangeType, ResourceType
+from src.server.models.dataenums import RangeType, ResourceType, Stat
+
+
+
+
+MAX_LEVEL = 18
+
+
+def stat_growth(level: int) -> float:
+    return (level - 1) * (0.7025 + 0.0175 * (level - 1))
+
+
+@dataclass(frozen=True)
+class BaseStatTable:
+    stats: dict[Stat, tuple[float, ...]]
+    attackspeed_growth: tuple[float, ...]
+
+    @classmethod
+    def build(cls, champion: "NewChampion", levels: Iterable[int] = range(1, MAX_LEVEL + 1)) -> "BaseStatTable":
+        growths = tuple(stat_growth(level) for level in levels)
+        stats = {}
+        for stat in Stat:
+            base_value = getattr(champion, stat.value, None)
+            if isinstance(base_value, (int, float)):
+                per_level = getattr(champion, f"{stat.value}_per_lvl", 0)
+                stats[stat] = tuple(base_value + per_level * growth for growth in growths)
+        attackspeed_growth = tuple(champion.attackspeed_per_lvl * growth for growth in growths)
+        return cls(stats=stats, attackspeed_growth=attackspeed_growth)
 
 
 
@@ -57,6 +85,14 @@ class NewChampion(BaseModel):
 
     image: Image
 
+    _base_stat_table: BaseStatTable | None = PrivateAttr(default=None)
+
+
+    def base_stat_table(self) -> BaseStatTable:
+        if self._base_stat_table is None:
+            self._base_stat_table = BaseStatTable.build(self)
+        return self._base_stat_table
+
 
     @classmethod
     def parse_obj(cls, obj: dict) -> Self:
@@ -402,6 +402,10 @@ class Comparison(str, Enum):
     LT="Less than"
     EQ="Equal"
 
+class BuildObjective(str, Enum):
+    DAMAGE="damage"
+    DAMAGE_PER_GOLD="damage per gold"
+
 
 ############### BaseModels ###############
 
@@ -443,6 +447,55 @@ class TickEvent(BaseModel):
     result: list[EffectResult]
 
 
+# Internal counterparts of EffectResult/TickEvent; converted once when the response is built.
+@dataclass(slots=True)
+class EffectRecord:
+    source: ActionType
+    actor: Actor
+    target: Actor
+    type_: EffectType
+    value: float
+    raw: float | None = None
+    mitigated: float | None = None
+    overheal: float | None = None
+    damage_sub_type: DamageSubType | None = None
+
+    def to_model(self) -> EffectResult:
+        # Coerce exactly what validation would: given values become floats, unset ones keep the model default.
+        return EffectResult.construct(
+            source=self.source,
+            actor=self.actor,
+            target=self.target,
+            type_=self.type_,
+            value=float(self.value),
+            raw=0 if self.raw is None else float(self.raw),
+            mitigated=0 if self.mitigated is None else float(self.mitigated),
+            overheal=0 if self.overheal is None else float(self.overheal),
+            damage_sub_type=self.damage_sub_type
+        )
+
+
+@dataclass(slots=True)
+class TickRecord:
+    tick: int
+    result: list[EffectRecord]
+
+    def to_model(self) -> TickEvent:
+        return TickEvent.construct(tick=self.tick, result=[record.to_model() for record in self.result])
+
+
+class EffectTotal(BaseModel):
+    source: ActionType
+    actor: Actor
+    target: Actor
+    type_: EffectType
+    value: float
+    raw: float = 0
+    mitigated: float = 0
+    overheal: float = 0
+    count: int = 0
+
+
 
 class EffectProperties(BaseModel):
     pass
@@ -474,7 +527,9 @@ class StatusProperties(EffectProperties):
     strength: float = 0.0
 
 
-class ProcessedDamageProperties(EffectProperties):
+# Processed properties are built once per hit inside the simulation and never leave it, so they skip validation.
+@dataclass(slots=True)
+class ProcessedDamageProperties():
     value: float
     flat_pen: float
     percent_pen: float
@@ -484,24 +539,30 @@ class ProcessedDamageProperties(EffectProperties):
     vamp: float = 0
 
 
-class ProcessedHealProperties(EffectProperties):
+@dataclass(slots=True)
+class ProcessedHealProperties():
     value: float
     hp_scaling: HpScaling = HpScaling.FLAT
 
 
-class ProcessedShieldProperties(EffectProperties):
+@dataclass(slots=True)
+class ProcessedShieldProperties():
     value: float
     duration: int
     dmg_sub_type: DamageSubType = cast(DamageSubType, DamageSubType.TRUE)
     hp_scaling: HpScaling = HpScaling.FLAT
 
 
-class ProcessedStatusProperties(EffectProperties):
+@dataclass(slots=True)
+class ProcessedStatusProperties():
     type_: StatusType
     duration: int
     strength: float = 0.0
 
 
+ProcessedProperties = ProcessedDamageProperties | ProcessedHealProperties | ProcessedShieldProperties | ProcessedStatusProperties
+
+
 
 ############### Dataclasses ###############
 
@@ -522,13 +583,19 @@ class AttackspeedStats():
 #Queue
 
 
-@dataclass 
+@dataclass(slots=True)
 class QueueComponent():
     source: ActionType
     actor: Actor
     target: Actor
     type_: EffectType
-    props: EffectProperties | None = None
+    props: EffectProperties | ProcessedProperties | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class EventHandle:
+    tick: int
+    seq: int
 
 
 @dataclass
@@ -536,6 +603,7 @@ class DotState:
     start: int
     last_regular: int
     end: int
+    end_handle: EventHandle | None = field(default=None, compare=False)
 
 
 #Status
@@ -1,5 +1,20 @@
-from pydantic import BaseModel
-from src.server.models.dataenums import ActionType, Actor, TickEvent
+import os
+
+from datetime import datetime
+from pydantic import BaseModel, conint, conlist
+from src.server.models.champion import MAX_LEVEL
+from src.server.models.dataenums import ActionType, Actor, BuildObjective, EffectTotal, ItemClass, Map, Stat, TickEvent
+
+
+MAX_BATCH_VARIANTS = int(os.getenv("MAX_BATCH_VARIANTS", "256"))
+COMBO_MAX_ACTIONS = 12
+COMBO_BEAM_WIDTH = 16
+MAX_COMBO_ACTIONS = int(os.getenv("MAX_COMBO_ACTIONS", "24"))
+MAX_COMBO_BEAM_WIDTH = int(os.getenv("MAX_COMBO_BEAM_WIDTH", "64"))
+MAX_BUILD_SLOTS = int(os.getenv("MAX_BUILD_SLOTS", "6"))
+MAX_BUILD_TOP_K = int(os.getenv("MAX_BUILD_TOP_K", "20"))
+MAX_BUILD_EVALUATIONS = int(os.getenv("MAX_BUILD_EVALUATIONS", "20000"))
+MAX_SWEEP_POINTS = int(os.getenv("MAX_SWEEP_POINTS", "256"))
 
 
 class Rank(BaseModel):
@@ -26,16 +41,154 @@ class V1Request(BaseModel):
     ability_points_defender: Rank
     items_defender: list[str]
     combo: list[Action]
+    summary: bool = False
 
 
 class V1Response(BaseModel):
     tick_rate: int
     damage: int
     ticks: int
-    effect_list: list[TickEvent]
+    effect_list: list[TickEvent] = []
+    totals: list[EffectTotal] | None = None
+
+
+class ExtendRequest(BaseModel):
+    base: V1Request
+    actions: list[Action]
+
+
+class BatchVariant(BaseModel):
+    lvl_attacker: int | None = None
+    ability_points_attacker: Rank | None = None
+    items_attacker: list[str] | None = None
+    lvl_defender: int | None = None
+    ability_points_defender: Rank | None = None
+    items_defender: list[str] | None = None
+    combo: list[Action] | None = None
+
+
+class BatchRequest(BaseModel):
+    id_attacker: str
+    lvl_attacker: int
+    ability_points_attacker: Rank
+    items_attacker: list[str] = []
+    id_defender: str
+    lvl_defender: int
+    ability_points_defender: Rank
+    items_defender: list[str] = []
+    combo: list[Action] = []
+    summary: bool = False
+    variants: conlist(BatchVariant, max_items=MAX_BATCH_VARIANTS)
+
+    def resolve(self, variant: BatchVariant) -> V1Request:
+        overrides = variant.dict(exclude_none=True)
+        base = self.dict(exclude={"variants"})
+        return V1Request(**{**base, **overrides})
+
+
+class BatchResult(BaseModel):
+    index: int
+    result: V1Response | None = None
+    error: str | None = None
+
+
+class BatchResponse(BaseModel):
+    results: list[BatchResult]
+
+
+class ComboRequest(BaseModel):
+    id_attacker: str
+    lvl_attacker: int
+    ability_points_attacker: Rank
+    items_attacker: list[str] = []
+    id_defender: str
+    lvl_defender: int
+    ability_points_defender: Rank
+    items_defender: list[str] = []
+    tick_budget: int
+    max_actions: conint(ge=1, le=MAX_COMBO_ACTIONS) = COMBO_MAX_ACTIONS
+    beam_width: conint(ge=1, le=MAX_COMBO_BEAM_WIDTH) = COMBO_BEAM_WIDTH
+    action_types: list[ActionType] = [ActionType.AA, ActionType.Q, ActionType.W, ActionType.E, ActionType.R]
+
+    def base_request(self) -> V1Request:
+        return V1Request(**self.dict(include=set(V1Request.__fields__)), combo=[])
+
+
+class ComboResponse(BaseModel):
+    combo: list[Action]
+    result: V1Response
+    evaluated: int
 
 
-class ItemRequest(BaseModel):
+class BuildRequest(BaseModel):
+    id_attacker: str
+    lvl_attacker: int
+    ability_points_attacker: Rank
+    items_attacker: list[str] = []
+    id_defender: str
+    lvl_defender: int
+    ability_points_defender: Rank
+    items_defender: list[str] = []
+    combo: list[Action]
+    patch: str
+    hotfix: datetime | None = None
+    map: Map = Map.SR
+    item_classes: list[ItemClass] = [ItemClass.LEGENDARY, ItemClass.BOOTS]
+    slots: conint(ge=1, le=MAX_BUILD_SLOTS) = 6
+    budget: int | None = None
+    objective: BuildObjective = BuildObjective.DAMAGE
+    top_k: conint(ge=1, le=MAX_BUILD_TOP_K) = 5
+    max_evaluations: conint(ge=1, le=MAX_BUILD_EVALUATIONS) = 5000
+
+    def base_request(self) -> V1Request:
+        return V1Request(**self.dict(include=set(V1Request.__fields__)))
+
+
+class BuildResult(BaseModel):
     items: list[str]
-    new_item: str
+    gold: int
+    damage: int
+    damage_per_gold: float
+
+
+class BuildResponse(BaseModel):
+    builds: list[BuildResult]
+    candidates: int
+    evaluated: int
+    complete: bool
+
+
+class SweepPoint(BaseModel):
+    lvl_attacker: conint(ge=1, le=MAX_LEVEL) | None = None
+    ability_points_attacker: Rank | None = None
+    bonus_stats_attacker: dict[Stat, float] = {}
+    lvl_defender: conint(ge=1, le=MAX_LEVEL) | None = None
+
+
+class SweepRequest(BaseModel):
+    id_attacker: str
+    lvl_attacker: int
+    ability_points_attacker: Rank
+    items_attacker: list[str] = []
+    id_defender: str
+    lvl_defender: int
+    ability_points_defender: Rank
+    items_defender: list[str] = []
+    combo: list[Action]
+    points: conlist(SweepPoint, min_items=1, max_items=MAX_SWEEP_POINTS)
+
+    def base_request(self) -> V1Request:
+        return V1Request(**self.dict(include=set(V1Request.__fields__)))
+
+
+class SweepResult(BaseModel):
+    index: int
+    damage: int | None = None
+    ticks: int | None = None
+    error: str | None = None
+
 
+class SweepResponse(BaseModel):
+    results: list[SweepResult]
+    timelines: int
+    vectorized: int
@@ -0,0 +1,159 @@
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_DICT, SHAPE_LIST, SHAPE_SINGLETON, ModelField
+from typing import Any, Callable, Type, TypeVar
+
+from src.server.models.dataenums import EffectProperties, Stat
+from src.server.models.effect import EFFECT_PROPERTIES_MAP, EffectComponent
+from src.server.models.item import NewItem
+from src.server.models.passive_effect import (
+    BUFF_ACTION_PROPERTIES_MAP,
+    PASSIVE_PROPERTIES_MAP,
+    BuffAction,
+    BuffActionProps,
+    BuffProperties,
+    PassiveEffect
+)
+
+
+
+
+T = TypeVar("T", bound=BaseModel)
+Decoder = Callable[[Any], Any]
+
+# Models whose `props` class depends on a discriminator field, mirroring their parse_obj overrides.
+POLYMORPHIC_PROPS: dict[type[BaseModel], tuple[str, dict, type[BaseModel]]] = {
+    EffectComponent: ("type_", EFFECT_PROPERTIES_MAP, EffectProperties),
+    BuffAction: ("type_", BUFF_ACTION_PROPERTIES_MAP, BuffActionProps),
+    PassiveEffect: ("buff", PASSIVE_PROPERTIES_MAP, BuffProperties)
+}
+
+# Dict fields whose keys the model's parse_obj resolves through an alias lookup instead of the enum itself.
+_stat_from_str = lru_cache(maxsize=None)(Stat.from_str)
+ALIASED_KEYS: dict[type[BaseModel], dict[str, Callable[[str], Any]]] = {
+    NewItem: {"stats": _stat_from_str, "masterwork": _stat_from_str}
+}
+
+
+class TrustedDecodeError(ValueError):
+    pass
+
+
+def _validate(field: ModelField) -> Decoder:
+    def decode(value: Any) -> Any:
+        value, errors = field.validate(value, {}, loc=field.name)
+        if errors:
+            raise TrustedDecodeError(f"{field.name}: {errors}")
+        return value
+    return decode
+
+
+def _float(value: Any) -> float:
+    return value if type(value) is float else float(value)
+
+
+def _int(value: Any) -> int:
+    return value if type(value) is int else int(value)
+
+
+def _enum(type_: type[Enum]) -> Decoder:
+    return lambda value: value if isinstance(value, type_) else type_(value)
+
+
+def _type_decoder(field: ModelField) -> Decoder:
+    type_ = field.type_
+    if field.sub_fields or not isinstance(type_, type):
+        return _validate(field)
+    if issubclass(type_, BaseModel):
+        return trusted_decoder(type_)
+    if hasattr(type_, "__get_validators__"):
+        return _validate(field)
+    if issubclass(type_, Enum):
+        return _enum(type_)
+    if type_ is float:
+        return _float
+    if type_ is bool:
+        return lambda value: value if type(value) is bool else _validate(field)(value)
+    if type_ is int:
+        return _int
+    if type_ is str:
+        return lambda value: value if type(value) is str else _validate(field)(value)
+    if type_ is datetime:
+        return lambda value: value if isinstance(value, datetime) else _validate(field)(value)
+    return _validate(field)
+
+
+def _field_decoder(field: ModelField, key_alias: Callable[[str], Any] | None = None) -> Decoder:
+    if field.shape == SHAPE_SINGLETON:
+        decode = _type_decoder(field)
+    elif field.shape == SHAPE_LIST and field.sub_fields:
+        item = _field_decoder(field.sub_fields[0])
+        decode = lambda value: [item(v) for v in value]
+    elif field.shape == SHAPE_DICT and field.key_field is not None and field.sub_fields:
+        key, item = key_alias or _field_decoder(field.key_field), _field_decoder(field.sub_fields[0])
+        decode = lambda value: {key(k): item(v) for k, v in value.items()}
+    else:
+        return _validate(field)
+    if field.allow_none:
+        return lambda value: None if value is None else decode(value)
+    return decode
+
+
+def _default(field: ModelField) -> Callable[[], Any] | None:
+    if field.required:
+        return None
+    if field.default_factory is None and (field.default is None or isinstance(field.default, (str, int, float, bool, Enum))):
+        default = field.default
+        return lambda: default
+    return field.get_default
+
+
+# Decodes documents we wrote ourselves after full validation. The decoder is compiled once per model
+# from its fields: values are only coerced to their declared types and the model is assembled the
+# way construct() does, skipping pydantic's validation.
+@lru_cache(maxsize=None)
+def trusted_decoder(model_cls: Type[T]) -> Callable[[dict], T]:
+    polymorphic = POLYMORPHIC_PROPS.get(model_cls)
+    aliased_keys = next((keys for base, keys in ALIASED_KEYS.items() if issubclass(model_cls, base)), {})
+    # A None decoder marks the polymorphic props field, whose class is picked from the decoded discriminator.
+    fields = [(name, field.alias, None if polymorphic and name == "props" else _field_decoder(field, aliased_keys.get(name)), _default(field))
+              for name, field in model_cls.__fields__.items()]
+    private = bool(model_cls.__private_attributes__)
+
+    def decode(obj: dict) -> T:
+        if isinstance(obj, model_cls):
+            return obj
+        values = {}
+        fields_set = set()
+        for name, alias, decode_value, default in fields:
+            key = alias if alias in obj else name
+            value = obj.get(key)
+            if value is None and key not in obj:
+                if default is None:
+                    raise TrustedDecodeError(f"{model_cls.__name__} is missing {name}")
+                values[name] = default()
+                continue
+            if decode_value is None:
+                discriminator, props_map, base = polymorphic
+                decode_value = trusted_decoder(props_map.get(values.get(discriminator), base))
+            values[name] = decode_value(value)
+            fields_set.add(name)
+        model = model_cls.__new__(model_cls)
+        object.__setattr__(model, "__dict__", values)
+        object.__setattr__(model, "__fields_set__", fields_set)
+        if private:
+            model._init_private_attributes()
+        return model
+
+    return decode
+
+
+def decode_document(model_cls: Type[T], document: dict) -> T:
+    if document.get("validated"):
+        try:
+            return trusted_decoder(model_cls)(document)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            pass
+    return model_cls.parse_obj(document)
@@ -1,22 +1,22 @@
 import logging
 
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, Response
 
 
 
 
 from src.server.database import (
     fetch_short_champions_by_patch,
+    fetch_champion_json_by_id,
+    fetch_champion_projection_by_id,
     fetch_champion_by_id,
     update_champion
 )
 from src.server.models.champion import ShortChampion, Champion
 from src.server.models.dataenums import RangeType, ResourceType
 
-from src.server.routes.helpers import get_required_champion, parse_from_request
+from src.server.routes.helpers import catalog_response, get_required_json, get_required_projection, parse_from_request
 
 debug_logger = logging.getLogger("liandrys.debug")
 
@@ -24,12 +24,11 @@ router = APIRouter()
 admin = APIRouter()
 
 
-@router.get("/all/{patch}")
-async def get_champions(patch: str, hotfix: datetime | None = None) -> list[ShortChampion]:
-    response = await fetch_short_champions_by_patch(patch, hotfix)
-    if not response:
-        raise HTTPException(status_code=404, detail=f"No champions found for patch. {patch} !")
-    return response
+@router.get("/all/{patch}", response_model=list[ShortChampion])
+async def get_champions(request: Request, patch: str, hotfix: datetime | None = None) -> Response:
+    return await catalog_response(request, "champion", patch, hotfix, None,
+                                  lambda: fetch_short_champions_by_patch(patch, hotfix),
+                                  f"No champions found for patch. {patch} !")
 
 
 @router.get("/rangetype/")
@@ -49,9 +48,10 @@ async def get_resourceType() -> list[str]:
 
 
 @router.get("/{id_}")
-async def get_champion_by_id(id_: str) -> JSONResponse:
-    champion = await get_required_champion(id_)
-    return JSONResponse(content=jsonable_encoder(champion))
+async def get_champion_by_id(request: Request, id_: str, fields: str | None = None) -> Response:
+    if fields:
+        return await get_required_projection(fetch_champion_projection_by_id, Champion, id_, fields, "Champion")
+    return await get_required_json(request, fetch_champion_json_by_id, id_, "Champion")
 
 
 @admin.put("/")
@@ -1,12 +1,16 @@
-from fastapi import HTTPException, Request
+from datetime import datetime
+from fastapi import HTTPException, Request, Response
 from pydantic import BaseModel, ValidationError
-from typing import Type, TypeVar
+from typing import Awaitable, Callable, Hashable, Sequence, Type, TypeVar
 
-from src.server.database import fetch_champion_by_id, fetch_item_by_id, fetch_rune_by_id, fetch_summonerspell_by_id
+from src.server.database import fetch_champion_by_id, fetch_data_version, fetch_champions_by_ids, fetch_item_by_id, fetch_items_by_ids, fetch_rune_by_id, fetch_summonerspell_by_id
 from src.server.models.champion import Champion
 from src.server.models.item import Item
 from src.server.models.rune import Rune
 from src.server.models.summonerspell import Summonerspell
+from src.server.utils.catalog import CATALOG_MAX_AGE, etag_matches, get_catalog_snapshot
+from src.server.utils.compression import EncodedBody
+from src.server.utils.projection import parse_fields
 
 
 
@@ -21,6 +25,41 @@ async def parse_from_request(request: Request, model_cls: Type[T]) -> T:
     
 
 
+async def catalog_response(request: Request, kind: str, patch: str, hotfix: datetime | None, filter_: Hashable,
+                           fetch: Callable[[], Awaitable[Sequence[BaseModel]]], detail: str) -> Response:
+    snapshot = await get_catalog_snapshot(kind, patch, hotfix, filter_, await fetch_data_version(), fetch)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=detail)
+    encoding = snapshot.body.negotiate(request.headers.get("accept-encoding"))
+    etag = snapshot.representation_etag(encoding)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={CATALOG_MAX_AGE}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return await snapshot.body.response(encoding, headers)
+
+
+
+async def get_required_json(request: Request, fetch: Callable[[str], Awaitable[EncodedBody | None]], id_: str, label: str) -> Response:
+    body = await fetch(id_)
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found: {id_}")
+    return await body.response(body.negotiate(request.headers.get("accept-encoding")))
+
+
+
+async def get_required_projection(fetch: Callable[[str, tuple[str, ...]], Awaitable[bytes | None]], model_cls: Type[BaseModel],
+                                  id_: str, fields: str, label: str) -> Response:
+    try:
+        names = parse_fields(model_cls, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    body = await fetch(id_, names)
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found: {id_}")
+    return Response(content=body, media_type="application/json")
+
+
+
 async def get_required_champion(id_: str) -> Champion:
     champion = await fetch_champion_by_id(id_)
     if not champion:
@@ -33,6 +72,20 @@ async def get_required_item(id_: str) -> Item:
         raise HTTPException(status_code=404, detail=f"Item not found: {id_}")
     return item
 
+async def get_required_champions(ids: list[str]) -> list[Champion]:
+    champions = await fetch_champions_by_ids(ids)
+    for id_, champion in zip(ids, champions):
+        if not champion:
+            raise HTTPException(status_code=404, detail=f"Champion not found: {id_}")
+    return champions
+
+async def get_required_items(ids: list[str]) -> list[Item]:
+    items = await fetch_items_by_ids(ids)
+    for id_, item in zip(ids, items):
+        if not item:
+            raise HTTPException(status_code=404, detail=f"Item not found: {id_}")
+    return items
+
 async def get_required_rune(id_: str) -> Rune:
     # Assuming a function fetch_rune_by_id exists
     rune = await fetch_rune_by_id(id_)
@@ -1,19 +1,19 @@
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, Response
 
 
 
 from src.server.database import (
     fetch_short_items_by_patch,
+    fetch_item_json_by_id,
+    fetch_item_projection_by_id,
     fetch_item_by_id,
     update_item
 )
 from src.server.models.item import ShortItem, Item
 from src.server.models.dataenums import ItemClass, Map
 
-from src.server.routes.helpers import parse_from_request, get_required_item
+from src.server.routes.helpers import catalog_response, get_required_json, get_required_projection, parse_from_request
 
 
 router = APIRouter()
@@ -21,12 +21,11 @@ admin = APIRouter()
 
 
 
-@router.get("/all/{patch}")
-async def get_items(patch: str, hotfix: datetime | None = None, map: Map | None = None) -> list[ShortItem]:
-    items = await fetch_short_items_by_patch(patch, hotfix, map)
-    if not items:
-        raise HTTPException(status_code=404, detail=f"No items found for patch: {patch} !")
-    return items
+@router.get("/all/{patch}", response_model=list[ShortItem])
+async def get_items(request: Request, patch: str, hotfix: datetime | None = None, map: Map | None = None) -> Response:
+    return await catalog_response(request, "item", patch, hotfix, map,
+                                  lambda: fetch_short_items_by_patch(patch, hotfix, map),
+                                  f"No items found for patch: {patch} !")
 
 
 @router.get("/itemclass/")
@@ -46,9 +45,10 @@ async def get_map() -> list[dict[str, str]]:
 
 
 @router.get("/{item_id}")
-async def get_item(item_id: str) -> JSONResponse:
-    item = await get_required_item(item_id)
-    return JSONResponse(content=jsonable_encoder(item))
+async def get_item(request: Request, item_id: str, fields: str | None = None) -> Response:
+    if fields:
+        return await get_required_projection(fetch_item_projection_by_id, Item, item_id, fields, "Item")
+    return await get_required_json(request, fetch_item_json_by_id, item_id, "Item")
 
 
 @admin.put("/")
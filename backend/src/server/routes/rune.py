@@ -1,30 +1,29 @@
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, Response
 
 
 
 from src.server.database import (
     fetch_short_runes_by_patch,
+    fetch_rune_json_by_id,
+    fetch_rune_projection_by_id,
     fetch_rune_by_id,
     update_rune
 )
 from src.server.models.rune import ShortRune, Rune, RUNE_TREES
 
-from src.server.routes.helpers import get_required_rune, parse_from_request
+from src.server.routes.helpers import catalog_response, get_required_json, get_required_projection, parse_from_request
 
 router = APIRouter()
 admin = APIRouter()
 
 
 
-@router.get("/all/{patch}")
-async def get_runes(patch: str, hotfix: datetime | None = None) -> list[ShortRune]:
-    runes = await fetch_short_runes_by_patch(patch, hotfix)
-    if not runes:
-        raise HTTPException(status_code=404, detail=f"No runes found for patch. {patch} !")
-    return runes
+@router.get("/all/{patch}", response_model=list[ShortRune])
+async def get_runes(request: Request, patch: str, hotfix: datetime | None = None) -> Response:
+    return await catalog_response(request, "rune", patch, hotfix, None,
+                                  lambda: fetch_short_runes_by_patch(patch, hotfix),
+                                  f"No runes found for patch. {patch} !")
 
 
 @router.get("/trees/")
@@ -33,9 +32,10 @@ async def get_trees() -> dict[int, dict[str, str]]:
 
 
 @router.get("/{rune_id}")
-async def get_rune(rune_id: str) -> JSONResponse:
-    rune = await get_required_rune(rune_id)
-    return JSONResponse(content=jsonable_encoder(rune))
+async def get_rune(request: Request, rune_id: str, fields: str | None = None) -> Response:
+    if fields:
+        return await get_required_projection(fetch_rune_projection_by_id, Rune, rune_id, fields, "Rune")
+    return await get_required_json(request, fetch_rune_json_by_id, rune_id, "Rune")
 
 
 @admin.put("/")
@@ -1,11 +1,26 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
 
-from src.server.database import fetch_champion_by_id, fetch_item_by_id
-from src.server.simulation.simulation import Simulation
-from src.server.simulation.character import Character
+from dataclasses import replace
+from typing import Iterator
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+
+from src.server.database import fetch_data_version, fetch_items_by_patch
 from src.server.simulation.exceptions import SimulationError
-from src.server.models.request import ItemRequest, V1Request, V1Response
-from src.server.routes.helpers import get_required_champion, get_required_item
+from src.server.simulation.combo import search_combo
+from src.server.simulation.executor import build_simulation, document_keys, get_executor
+from src.server.simulation.optimizer import BuildProblem, merge_results, prepare_problem, search_chunk, select_candidates, split_roots
+from src.server.simulation.simulation import Simulation
+from src.server.simulation.result_cache import document_ids, request_key, result_cache, state_cache
+from src.server.simulation.sweep import sweep_job
+from src.server.models.champion import Champion
+from src.server.models.item import Item
+from src.server.models.request import Action, BatchRequest, BatchResponse, BatchResult, BuildRequest, BuildResponse, BuildResult, ComboRequest, ComboResponse, ExtendRequest, SweepRequest, SweepResponse, V1Request, V1Response
+from src.server.routes.helpers import get_required_champions, get_required_items
 
 
 router = APIRouter()
@@ -13,23 +28,149 @@ router = APIRouter()
 
 
 
+async def _load_documents(v1_requests: list[V1Request]) -> tuple[dict[str, Champion], dict[str, Item]]:
+    champion_ids = list(dict.fromkeys(id_ for v1_request in v1_requests for id_ in (v1_request.id_attacker, v1_request.id_defender)))
+    item_ids = list(dict.fromkeys(id_ for v1_request in v1_requests for id_ in v1_request.items_attacker + v1_request.items_defender))
+    champions, items = await asyncio.gather(get_required_champions(champion_ids), get_required_items(item_ids))
+    return dict(zip(champion_ids, champions)), dict(zip(item_ids, items))
+
+
+async def _simulate(v1_requests: list[V1Request]) -> list[V1Response | BaseException]:
+    version = await fetch_data_version()
+    keys = [request_key(v1_request, version) for v1_request in v1_requests]
+    outcomes: list[V1Response | BaseException | None] = [result_cache.get(key) for key in keys]
+    pending = {}
+    for index, outcome in enumerate(outcomes):
+        if outcome is None:
+            pending.setdefault(keys[index], v1_requests[index])
+    if pending:
+        champions, items = await _load_documents(list(pending.values()))
+        executor = get_executor()
+        results = await executor.run_many(list(pending.values()), champions, items, version)
+        computed = dict(zip(pending, results))
+        for key, result in computed.items():
+            if isinstance(result, V1Response):
+                result_cache.set(key, result, tags=document_ids(pending[key]))
+        outcomes = [computed[key] if outcome is None else outcome for key, outcome in zip(keys, outcomes)]
+    return outcomes
+
+
+
 @router.post("/v1")
 async def v1_simulation(v1_request: V1Request) -> V1Response:
     try:
-        attacker = await get_required_champion(v1_request.id_attacker)
-        defender = await get_required_champion(v1_request.id_defender)
-        items_attacker = []
-        for item_id in v1_request.items_attacker:
-            item = await get_required_item(item_id)
-            items_attacker.append(item)
-        char_a = Character(attacker, v1_request.lvl_attacker, v1_request.ability_points_attacker, items_attacker)
-        items_defender = []
-        for item_id in v1_request.items_defender:
-            item = await get_required_item(item_id)
-            items_defender.append(item)
-        char_d = Character(defender, v1_request.lvl_defender, v1_request.ability_points_defender, items_defender)
-        sim = Simulation(char_a, char_d)
-        return sim.do_combo(v1_request.combo)
+        outcome = (await _simulate([v1_request]))[0]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+    except HTTPException:
+        raise
+    except SimulationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+def _stream_line(event: str, data: str, sse: bool) -> str:
+    return f"event: {event}\ndata: {data}\n\n" if sse else f"{data}\n"
+
+
+def _stream_events(sim: Simulation, combo: list[Action], sse: bool) -> Iterator[str]:
+    # Runs in the threadpool; a client that disconnects closes the generator and stops the simulation with it.
+    try:
+        for record in sim.stream_combo(combo):
+            yield _stream_line("tick", record.to_model().json(), sse)
+    except SimulationError as e:
+        yield _stream_line("error", json.dumps({"error": e.message}), sse)
+        return
+    except Exception as e:
+        yield _stream_line("error", json.dumps({"error": str(e)}), sse)
+        return
+    yield _stream_line("done", sim.response().json(), sse)
+
+
+
+# Streaming stays out of the process pool: ticks are handed to the client while the simulation runs, which a
+# worker could only do through an extra result channel. The generator runs in the threadpool instead.
+@router.post("/v1/stream")
+async def stream_simulation(v1_request: V1Request, accept: str | None = Header(None)) -> StreamingResponse:
+    try:
+        champions, items = await _load_documents([v1_request])
+        sim = build_simulation(v1_request, champions, items)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    sse = accept is not None and "text/event-stream" in accept
+    return StreamingResponse(_stream_events(sim, v1_request.combo, sse), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+
+
+def _run_base(base_request: V1Request, champions: dict[str, Champion], items: dict[str, Item]) -> Simulation:
+    base = build_simulation(base_request, champions, items)
+    base.do_combo(base_request.combo)
+    return base
+
+
+# Extending forks a live Simulation kept in this process; shipping that state to a worker would cost more than
+# the few extra actions, so the work runs in the threadpool rather than through the executor.
+@router.post("/v1/extend")
+async def extend_simulation(extend_request: ExtendRequest) -> V1Response:
+    try:
+        base_request = extend_request.base
+        key = request_key(base_request, await fetch_data_version())
+        base = state_cache.get(key)
+        if base is None:
+            champions, items = await _load_documents([base_request])
+            base = await run_in_threadpool(_run_base, base_request, champions, items)
+            state_cache.set(key, base, tags=document_ids(base_request))
+        return await run_in_threadpool(base.fork().do_combo, extend_request.actions)
+    except HTTPException:
+        raise
+    except SimulationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+@router.post("/batch")
+async def batch_simulation(batch_request: BatchRequest) -> BatchResponse:
+    try:
+        v1_requests = [batch_request.resolve(variant) for variant in batch_request.variants]
+        outcomes = await _simulate(v1_requests)
+        results = []
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, SimulationError):
+                results.append(BatchResult(index=index, error=outcome.message))
+            elif isinstance(outcome, NotImplementedError):
+                results.append(BatchResult(index=index, error=str(outcome)))
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results.append(BatchResult(index=index, result=outcome))
+        return BatchResponse(results=results)
+    except HTTPException:
+        raise
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+@router.post("/optimize-combo")
+async def optimize_combo(combo_request: ComboRequest) -> ComboResponse:
+    try:
+        version = await fetch_data_version()
+        champions, items = await _load_documents([combo_request.base_request()])
+        [response] = await get_executor().run_all(search_combo, [(combo_request, champions, items)], document_keys(version, champions, items))
+        return response
     except HTTPException:
         raise
     except SimulationError as e:
@@ -42,15 +183,77 @@ async def v1_simulation(v1_request: V1Request) -> V1Response:
 
 
 @router.post("/item")
-async def add_item(item_request: ItemRequest) -> bool:
-    items = []
-    for item_id in item_request.items:
-        item = await fetch_item_by_id(item_id)
-        items.append(item)
-    item = await fetch_item_by_id(item_request.new_item)
-
-    #TODO Add logic here
-    if True:
-        return True
-    else:
-        return False
+async def optimize_build(build_request: BuildRequest) -> BuildResponse:
+    try:
+        base_request = build_request.base_request()
+        version = await fetch_data_version()
+        (champions, items), patch_items = await asyncio.gather(
+            _load_documents([base_request]),
+            fetch_items_by_patch(build_request.patch, build_request.hotfix)
+        )
+        owned = [items[item_id] for item_id in base_request.items_attacker]
+        problem = BuildProblem(
+            request=base_request,
+            champions=champions,
+            items=items,
+            candidates=select_candidates(patch_items, owned, build_request.map, build_request.item_classes, build_request.objective, build_request.budget),
+            slots=build_request.slots - len(owned),
+            budget=build_request.budget,
+            objective=build_request.objective,
+            top_k=build_request.top_k,
+            max_evaluations=build_request.max_evaluations
+        )
+        executor = get_executor()
+        candidates = {str(item.id): item for item in problem.candidates}
+        documents = document_keys(version, champions, items, candidates)
+        [(prepared, evaluated)] = await executor.run_all(prepare_problem, [problem], documents)
+        # Put the loaded documents back in place of the copies a worker returned, so the search jobs reference them by key.
+        problem = replace(prepared, champions=champions, items=items, candidates=[candidates[str(item.id)] for item in prepared.candidates])
+        chunks = split_roots(len(problem.candidates), executor.parallelism)
+        chunk_problem = replace(problem, max_evaluations=max(problem.max_evaluations - evaluated, 0) // max(len(chunks), 1))
+        result = merge_results(await executor.run_all(search_chunk, [(chunk_problem, roots) for roots in chunks], documents), problem.top_k)
+
+        # Rerun the winners with the real items so the reported damage matches /simulation/v1.
+        build_items = [owned + [problem.candidates[index] for index in build.candidates] for build in result.builds]
+        all_items = items | {str(item.id): item for item in problem.candidates}
+        responses = await executor.run_many([base_request.copy(update={"items_attacker": [str(item.id) for item in build]}) for build in build_items],
+                                            champions, all_items, version)
+        for response in responses:
+            if isinstance(response, BaseException):
+                raise response
+        builds = [
+            BuildResult(
+                items=[str(item.id) for item in build],
+                gold=sum(item.gold for item in build),
+                damage=response.damage,
+                damage_per_gold=response.damage / max(sum(item.gold for item in build), 1)
+            )
+            for build, response in zip(build_items, responses)
+        ]
+        return BuildResponse(builds=builds, candidates=len(problem.candidates), evaluated=evaluated + result.evaluated, complete=result.complete)
+    except HTTPException:
+        raise
+    except SimulationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+@router.post("/sweep")
+async def sweep_simulation(sweep_request: SweepRequest) -> SweepResponse:
+    try:
+        version = await fetch_data_version()
+        champions, items = await _load_documents([sweep_request.base_request()])
+        [response] = await get_executor().run_all(sweep_job, [(sweep_request, champions, items)], document_keys(version, champions, items))
+        return response
+    except HTTPException:
+        raise
+    except SimulationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,36 +1,36 @@
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, Response
 
 
 
 from src.server.database import (
     fetch_short_summonerspells_by_patch,
+    fetch_summonerspell_json_by_id,
+    fetch_summonerspell_projection_by_id,
     update_summonerspell
 )
 from src.server.models.summonerspell import ShortSummonerspell, Summonerspell
 from src.server.models.dataenums import Map
 
-from src.server.routes.helpers import get_required_summonerspell, parse_from_request
+from src.server.routes.helpers import catalog_response, get_required_json, get_required_projection, parse_from_request
 
 router = APIRouter()
 admin = APIRouter()
 
 
 
-@router.get("/all/{patch}")
-async def get_summonerspells(patch: str, hotfix: datetime | None = None, map: Map | None = None) -> list[ShortSummonerspell]:
-    summonerspells = await fetch_short_summonerspells_by_patch(patch, hotfix, map)
-    if not summonerspells:
-        raise HTTPException(status_code=404, detail=f"No summonerspells found for patch. {patch} !")
-    return summonerspells
+@router.get("/all/{patch}", response_model=list[ShortSummonerspell])
+async def get_summonerspells(request: Request, patch: str, hotfix: datetime | None = None, map: Map | None = None) -> Response:
+    return await catalog_response(request, "summonerspell", patch, hotfix, map,
+                                  lambda: fetch_short_summonerspells_by_patch(patch, hotfix, map),
+                                  f"No summonerspells found for patch. {patch} !")
 
 
 @router.get("/{summoner_id}")
-async def get_summonerspell(summoner_id: str) -> JSONResponse:
-    summonerspell = await get_required_summonerspell(summoner_id)
-    return JSONResponse(content=jsonable_encoder(summonerspell))
+async def get_summonerspell(request: Request, summoner_id: str, fields: str | None = None) -> Response:
+    if fields:
+        return await get_required_projection(fetch_summonerspell_projection_by_id, Summonerspell, summoner_id, fields, "Summoner Spell")
+    return await get_required_json(request, fetch_summonerspell_json_by_id, summoner_id, "Summoner Spell")
 
 
 @admin.put("/")
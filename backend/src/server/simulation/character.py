@@ -1,9 +1,11 @@
 from collections import defaultdict
-from typing import cast
+from dataclasses import dataclass
+from typing import Mapping, cast
+import copy
 import math
 
 from src.server.models.ability import ChampionAbility
-from src.server.models.champion import Champion
+from src.server.models.champion import BaseStatTable, Champion, MAX_LEVEL
 from src.server.models.dataenums import (
     ActionEffect,
     ActionType,
@@ -16,7 +18,7 @@ from src.server.models.dataenums import (
     DamageType,
     EffectComp,
     EffectProperties,
-    EffectResult,
+    EffectRecord,
     EffectType,
     HealProperties,
     HpScaling,
@@ -39,9 +41,30 @@ from src.server.models.request import Rank, Action
 from src.server.models.rune import Rune
 from src.server.models.summonerspell import Summonerspell
 from src.server.simulation.exceptions import SimulationError
+from src.server.simulation.formula import FormulaVariables, compile_formula
+from src.server.simulation.summary import EffectSummary
+
+
+
+
+STAT_VARIABLES: dict[str, Stat] = {stat.value: stat for stat in Stat}
+STACK_VARIABLES: dict[str, ActionType] = {action_type.value: action_type for action_type in ActionType}
+
+
+
+@dataclass(slots=True)
+class CharacterState:
+    hp: float
+    damage_taken: float
+    healed: float
+    damage_shielded: float
+    shields: list[tuple[int, float, ActionType, Actor]]
+    status_effects: dict[StatusType, list[tuple[int, float]]]
+    stacks: dict[ActionType, int]
+    cooldowns: dict[ActionType, int]
+    bonus_stats: dict[Stat, float]
+    stat_cache: dict[Stat, float]
 
-                    
-    
 
 
 class Character():
@@ -55,6 +78,14 @@ class Character():
         self.stacks: dict[ActionType, int] = defaultdict(int)
 
         self.evaluating_stat: set = set()
+        self.stat_cache: dict[Stat, float] = {}
+        self.base_stat_table: BaseStatTable = self.champion.base_stat_table()
+        self.level_index: int = 0
+        self._set_base_stat_table()
+        self.bonus_stats: dict[Stat, float] = self._sum_item_stats()
+        self.buffed_stats: set[Stat] = set()
+        self.has_conditional_buffs: bool = False
+        self._on_buffs_changed()
 
         self.ability_dict: dict[ActionType, tuple[ChampionAbility, int]] = {
             ActionType.Q: (self.champion.q, rank.q),
@@ -73,6 +104,44 @@ class Character():
         self.damage_taken: float = 0
         self.healed: float = 0
         self.damage_shielded: float = 0
+        # Set by the simulation in summary mode; results are then aggregated instead of listed.
+        self.summary: EffectSummary | None = None
+
+
+    def snapshot(self) -> CharacterState:
+        return CharacterState(
+            hp=self.hp,
+            damage_taken=self.damage_taken,
+            healed=self.healed,
+            damage_shielded=self.damage_shielded,
+            shields=list(self.shields),
+            status_effects={status: list(effects) for status, effects in self.status_effects.items()},
+            stacks=dict(self.stacks),
+            cooldowns=dict(self.cooldowns),
+            bonus_stats=dict(self.bonus_stats),
+            stat_cache=dict(self.stat_cache)
+        )
+
+
+    def restore(self, state: CharacterState) -> None:
+        self.hp = state.hp
+        self.damage_taken = state.damage_taken
+        self.healed = state.healed
+        self.damage_shielded = state.damage_shielded
+        self.shields = list(state.shields)
+        self.status_effects = defaultdict(list, {status: list(effects) for status, effects in state.status_effects.items()})
+        self.stacks = defaultdict(int, state.stacks)
+        self.cooldowns = dict(state.cooldowns)
+        self.bonus_stats = dict(state.bonus_stats)
+        self.stat_cache = dict(state.stat_cache)
+
+
+    def fork(self) -> "Character":
+        # Champion, items, abilities and buffs are shared; only the mutable combat state is copied.
+        clone = copy.copy(self)
+        clone.evaluating_stat = set()
+        clone.restore(self.snapshot())
+        return clone
 
 
     def _initialize_buffs(self) -> dict[Buff, list[BuffProperties]]:
@@ -82,17 +151,89 @@ class Character():
         return buffs
 
 
+    def _set_base_stat_table(self) -> None:
+        if 1 <= self.level <= MAX_LEVEL:
+            self.base_stat_table = self.champion.base_stat_table()
+            self.level_index = self.level - 1
+        else:
+            self.base_stat_table = BaseStatTable.build(self.champion, (self.level,))
+            self.level_index = 0
+        self._invalidate_stats()
+
+
+    def set_level(self, lvl: int) -> None:
+        self.level = lvl
+        self._set_base_stat_table()
+
+
+    def add_buff(self, buff: Buff, props: BuffProperties) -> None:
+        # The buff lists are shared with forks, so they are replaced rather than mutated.
+        self.buffs = defaultdict(list, self.buffs)
+        self.buffs[buff] = [*self.buffs[buff], props]
+        self._on_buffs_changed()
+
+
+    def remove_buff(self, buff: Buff, props: BuffProperties) -> None:
+        self.buffs = defaultdict(list, self.buffs)
+        self.buffs[buff] = [existing for existing in self.buffs[buff] if existing is not props]
+        self._on_buffs_changed()
+
+
+    def _on_buffs_changed(self) -> None:
+        self.buffed_stats = {props.stat for props in self.buffs[Buff.STATS] if isinstance(props, StatProperties)}
+        self.has_conditional_buffs = any(props.condition is not None for props in self.buffs[Buff.STATS])
+        self._invalidate_stats()
+
+
+    def _sum_item_stats(self) -> dict[Stat, float]:
+        bonus_stats = defaultdict(float)
+        for item in self.items:
+            for stat, value in item.stats.items():
+                bonus_stats[stat] += value
+        return dict(bonus_stats)
+
+
+    def add_bonus_stats(self, stats: Mapping[Stat, float]) -> None:
+        for stat, value in stats.items():
+            self.bonus_stats[stat] = self.bonus_stats.get(stat, 0) + value
+        self._invalidate_stats()
+        self.hp = self._get_stat(Stat.HP)
+
+
+    def _invalidate_stats(self, *stats: Stat) -> None:
+        if not stats or self.buffed_stats:
+            self.stat_cache.clear()
+            return
+        for stat in stats:
+            self.stat_cache.pop(stat, None)
+
+
+    def _on_status_changed(self, status: StatusType) -> None:
+        if status == StatusType.SLOW:
+            self._invalidate_stats(Stat.MOVESPEED)
+        elif status == StatusType.CRIPPLE:
+            self._invalidate_stats(Stat.ATTACKSPEED_P)
+
+
+    def _on_hp_changed(self) -> None:
+        if self.has_conditional_buffs:
+            self._invalidate_stats()
+
+
+    def add_stacks(self, stack_key: ActionType, amount: int) -> None:
+        self.stacks[stack_key] += amount
+        if self.buffed_stats:
+            self._invalidate_stats()
+
+
     def _get_base_stat(self, stat: Stat) -> float:
-        stat_name = stat.value
-        base_value = getattr(self.champion, stat_name, None)
-        if base_value is None:
-            return 0    
-        scaling_attr = f"{stat_name}_per_lvl"
-        scaling_value = getattr(self.champion, scaling_attr, 0)
-        return base_value + scaling_value * (self.level - 1) * (0.7025 + 0.0175 * (self.level - 1))
+        values = self.base_stat_table.stats.get(stat)
+        if values is None:
+            return 0
+        return values[self.level_index]
 
     def _get_bonus_stat(self, stat: Stat) -> float:
-        return sum([item.stats[stat] for item in self.items if stat in item.stats])
+        return self.bonus_stats.get(stat, 0)
     
     def _get_buff_stat(self, stat: Stat) -> float:
         result = 0
@@ -100,13 +241,23 @@ class Character():
             return result
         for stat_property in self.buffs[Buff.STATS]:
             assert isinstance(stat_property, StatProperties)
-            if self._evaluate_condition(stat_property.condition):
+            if stat_property.stat == stat and self._evaluate_condition(stat_property.condition):
                 formula = stat_property.scaling
                 result += self._evaluate_formula(formula)
         return result
 
 
     def _get_stat(self, stat: Stat) -> float:
+        cached = self.stat_cache.get(stat)
+        if cached is not None:
+            return cached
+        result = self._compute_stat(stat)
+        if not self.evaluating_stat:
+            self.stat_cache[stat] = result
+        return result
+
+
+    def _compute_stat(self, stat: Stat) -> float:
         if stat.value.startswith("bonus "):
             return self._get_bonus_stat(Stat.from_str(stat.value.removeprefix("bonus ")))
         
@@ -120,7 +271,10 @@ class Character():
         buff_stat = 0
         if stat not in self.evaluating_stat:
             self.evaluating_stat.add(stat)
-            buff_stat = self._get_buff_stat(stat)
+            try:
+                buff_stat = self._get_buff_stat(stat)
+            finally:
+                self.evaluating_stat.discard(stat)
 
         result = base_stat + bonus_stat + buff_stat
 
@@ -129,8 +283,7 @@ class Character():
         return result
 
     def _get_attackspeed(self) -> float:
-        bonus = self.champion.attackspeed_per_lvl * (self.level - 1) * (0.7025 + 0.0175 * (self.level - 1))
-        bonus += self._get_bonus_stat(Stat.ATTACKSPEED_P)
+        bonus = self.base_stat_table.attackspeed_growth[self.level_index] + self._get_bonus_stat(Stat.ATTACKSPEED_P)
         result = self.champion.attackspeed + self.champion.attackspeed_ratio * bonus
         result *= self._get_cripple_value()
         return result
@@ -156,7 +309,11 @@ class Character():
             return 0
         
     def _get_tenacity(self) -> float:
-        return math.prod(1 - item.stats[Stat.TENACITY_P] for item in self.items if Stat.TENACITY_P in item.stats)
+        cached = self.stat_cache.get(Stat.TENACITY_P)
+        if cached is None:
+            cached = math.prod(1 - item.stats[Stat.TENACITY_P] for item in self.items if Stat.TENACITY_P in item.stats)
+            self.stat_cache[Stat.TENACITY_P] = cached
+        return cached
         
     def _get_slow_value(self) -> float:
         #self.remove_expired_status_effects()
@@ -174,20 +331,25 @@ class Character():
     def _remove_expired_status_effects(self, tick: int) -> None:
         for status, effects in list(self.status_effects.items()):
             self.status_effects[status] = [(exp, strength) for exp, strength in effects if exp > tick]
+            if len(self.status_effects[status]) != len(effects):
+                self._on_status_changed(status)
             if not self.status_effects[status]:
                 del self.status_effects[status]
 
 
         
+    def _get_variable(self, name: str) -> float:
+        if name in STAT_VARIABLES:
+            return self._get_stat(STAT_VARIABLES[name])
+        if name in STACK_VARIABLES:
+            return self.stacks[STACK_VARIABLES[name]]
+        if name == "level":
+            return self.level
+        raise KeyError(name)
+
+
     def _evaluate_formula(self, formula: str, additional_keywords: dict = {}) -> float:
-        variables = {
-            stat.value: self._get_stat(stat) for stat in Stat
-        } | {
-            "level": self.level
-        } | {
-            stack_key: self.stacks[stack_key] for stack_key in ActionType
-        } | additional_keywords
-        return eval(formula, {}, variables)
+        return compile_formula(formula).evaluate(FormulaVariables(self._get_variable, additional_keywords))
     
 
     def _calculate_hp_scaling(self, value: float, hp_scaling: HpScaling) -> float:
@@ -215,7 +377,7 @@ class Character():
         match action.type_:
             case BuffActionType.STACK:
                 assert isinstance(action.props, StackProps)
-                self.stacks[action.props.stack_key] += int(self._evaluate_formula(action.props.amount))
+                self.add_stacks(action.props.stack_key, int(self._evaluate_formula(action.props.amount)))
             case BuffActionType.EFFECT:
                 assert isinstance(action.props, EffectProps)
                 return action.props.effect
@@ -246,26 +408,29 @@ class Character():
 
     
 
-    def _use_shields(self, damage: float, target: Actor) -> tuple[float, list[EffectResult]]:
+    def _use_shields(self, damage: float, target: Actor) -> tuple[float, list[EffectRecord]]:
         results = []
         for i, (exp, shield_val, source, actor) in enumerate(self.shields):
             absorbed = min(damage, shield_val)
             self.damage_shielded += absorbed
             damage -= absorbed
             self.shields[i] = (exp, shield_val-absorbed, source, actor)
-            results.append(EffectResult(
-                source=source,
-                actor=actor,
-                target=target,
-                type_=EffectType.SHIELD,
-                value=absorbed
-            ))
+            if self.summary is None:
+                results.append(EffectRecord(
+                    source=source,
+                    actor=actor,
+                    target=target,
+                    type_=EffectType.SHIELD,
+                    value=absorbed
+                ))
+            else:
+                self.summary.add(source, actor, target, EffectType.SHIELD, absorbed)
             if damage <= 0:
                 break
         return damage, results
 
 
-    def _apply_heals(self, components: list[QueueComponent]) -> list[EffectResult]:
+    def _apply_heals(self, components: list[QueueComponent]) -> list[EffectRecord]:
         total_heal = 0
         max_hp = self._get_stat(Stat.HP)
         results = []
@@ -275,15 +440,18 @@ class Character():
                 raw_heal = self._calculate_hp_scaling(component.props.value, component.props.hp_scaling)
                 total_heal += raw_heal
                 heal = max(raw_heal, min(total_heal, max_hp - self.hp))
-                results.append(EffectResult(
-                    source=component.source,
-                    actor=component.actor,
-                    target=component.target,
-                    type_=EffectType.HEAL,
-                    value=heal,
-                    raw=raw_heal,
-                    overheal=raw_heal - heal
-                ))
+                if self.summary is None:
+                    results.append(EffectRecord(
+                        source=component.source,
+                        actor=component.actor,
+                        target=component.target,
+                        type_=EffectType.HEAL,
+                        value=heal,
+                        raw=raw_heal,
+                        overheal=raw_heal - heal
+                    ))
+                else:
+                    self.summary.add(component.source, component.actor, component.target, EffectType.HEAL, heal, raw=raw_heal, overheal=raw_heal - heal)
             except Exception as e:
                 raise SimulationError(
                     message=str(e),
@@ -294,6 +462,8 @@ class Character():
         total_heal = min(total_heal, max_hp - self.hp)
         self.healed += total_heal
         self.hp += total_heal
+        if total_heal:
+            self._on_hp_changed()
         return results
     
 
@@ -314,7 +484,7 @@ class Character():
         self.shields.sort()
     
 
-    def _apply_damages(self, components: list[QueueComponent]) -> tuple[list[QueueComponent], list[EffectResult]]:
+    def _apply_damages(self, components: list[QueueComponent]) -> tuple[list[QueueComponent], list[EffectRecord]]:
         if not components:
             return [], []
         total_damage = 0
@@ -325,16 +495,19 @@ class Character():
                 assert isinstance(component.props, ProcessedDamageProperties), "Damage component must have ProcessedDamageProperties"
                 damage, raw_dmg, mitigated = self._calculate_damage(component.props)
                 total_damage += damage
-                results.append(EffectResult(
-                    source=component.source,
-                    actor=component.actor,
-                    target=component.target,
-                    type_=EffectType.DAMAGE,
-                    value=damage,
-                    raw=raw_dmg,
-                    mitigated=mitigated,
-                    damage_sub_type=component.props.dmg_sub_type
-                ))
+                if self.summary is None:
+                    results.append(EffectRecord(
+                        source=component.source,
+                        actor=component.actor,
+                        target=component.target,
+                        type_=EffectType.DAMAGE,
+                        value=damage,
+                        raw=raw_dmg,
+                        mitigated=mitigated,
+                        damage_sub_type=component.props.dmg_sub_type
+                    ))
+                else:
+                    self.summary.add(component.source, component.actor, component.target, EffectType.DAMAGE, damage, raw=raw_dmg, mitigated=mitigated)
                 if component.props.vamp > 0:
                     vamp = damage * component.props.vamp
                     vamps.append(QueueComponent(
@@ -356,6 +529,7 @@ class Character():
         results.extend(shield_results)
         if total_damage > 0:
             self.hp -= total_damage
+            self._on_hp_changed()
         return vamps, results
 
 
@@ -367,10 +541,12 @@ class Character():
         for component in components:
             try:
                 assert isinstance(component.props, ProcessedStatusProperties), "Status component must have ProcessedStatusProperties"
+                duration = component.props.duration
                 if component.props.type_ in tenacity_affected:
-                    component.props.duration = math.ceil(max(0.3, self._get_tenacity() * component.props.duration))
-                expiration = tick + component.props.duration
+                    duration = math.ceil(max(0.3, self._get_tenacity() * duration))
+                expiration = tick + duration
                 self.status_effects[component.props.type_].append((expiration, component.props.strength))
+                self._on_status_changed(component.props.type_)
             except Exception as e:
                 raise SimulationError(
                     message=str(e),
@@ -422,7 +598,7 @@ class Character():
 
 
     def _basic_attack(self, target: Actor, tick: int) -> ActionEffect:
-        attack_time = 1 / self._get_attackspeed()
+        attack_time = 1 / self._get_stat(Stat.ATTACKSPEED_P)
         attack_ticks = math.ceil(attack_time * TICKRATE)
         self.cooldowns[ActionType.AA] = tick + attack_ticks
         tick += math.ceil(attack_time * self.champion.attack_windup * TICKRATE)
@@ -524,25 +700,20 @@ class Character():
 
         
 
-    def take_effects(self, component_list: list[QueueComponent], tick: int) -> tuple[list[QueueComponent], list[EffectResult]]:
-        damages = []
-        heals = []
-        shields = []
-        stati = []
+    def take_effects(self, component_list: list[QueueComponent], tick: int) -> tuple[list[QueueComponent], list[EffectRecord]]:
+        components = defaultdict(list)
         for component in component_list:
-            match component.type_:
-                case EffectType.DAMAGE:
-                    damages.append(component)
-                case EffectType.HEAL:
-                    heals.append(component)
-                case EffectType.SHIELD:
-                    shields.append(component)
-                case EffectType.STATUS:
-                    stati.append(component)
-                case _:
-                    pass
-        self._apply_shields(shields, tick)
-        vamps, results = self._apply_damages(damages)
-        results.extend(self._apply_heals(heals))
-        self._apply_status_effects(stati, tick)
+            components[component.type_].append(component)
+        return self.take_sorted_effects(components, tick)
+
+
+    def take_sorted_effects(self, components: Mapping[EffectType, list[QueueComponent]], tick: int) -> tuple[list[QueueComponent], list[EffectRecord]]:
+        self._apply_shields(components.get(EffectType.SHIELD, []), tick)
+        vamps, results = self._apply_damages(components.get(EffectType.DAMAGE, []))
+        heals = components.get(EffectType.HEAL)
+        if heals:
+            results.extend(self._apply_heals(heals))
+        stati = components.get(EffectType.STATUS)
+        if stati:
+            self._apply_status_effects(stati, tick)
         return vamps, results
\ No newline at end of file
@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from typing import Sequence
+
+from src.server.models.champion import Champion
+from src.server.models.dataenums import ActionType, Actor
+from src.server.models.item import Item
+from src.server.models.request import COMBO_BEAM_WIDTH, COMBO_MAX_ACTIONS, Action, ComboRequest, ComboResponse, V1Response
+from src.server.simulation.exceptions import SimulationError
+from src.server.simulation.executor import build_simulation
+from src.server.simulation.simulation import Simulation
+
+
+
+
+COMBO_ACTION_TYPES = (ActionType.AA, ActionType.Q, ActionType.W, ActionType.E, ActionType.R)
+
+
+@dataclass(slots=True)
+class ComboNode:
+    damage: float
+    actions: tuple[ActionType, ...]
+    sim: Simulation
+
+
+@dataclass(slots=True)
+class ComboResult:
+    combo: list[Action]
+    response: V1Response
+    evaluated: int
+
+
+
+def _signature(node: ComboNode) -> tuple:
+    # Orderings that end in the same observable state are interchangeable for everything that follows.
+    sim = node.sim
+    queued = tuple(
+        (tick, tuple((component.source, component.actor, component.target, component.type_) for component in components))
+        for tick, components in sim.queue.to_dict().items()
+    )
+    characters = tuple(
+        (
+            tuple(character.cooldowns.values()),
+            tuple(sorted(character.stacks.items())),
+            tuple(sorted((status, tuple(effects)) for status, effects in character.status_effects.items())),
+            tuple(character.shields),
+            round(character.hp, 6)
+        )
+        for character in sim.actors.values()
+    )
+    dots = tuple(sorted((key, dot.start, dot.last_regular, dot.end) for key, dot in sim.dots.items()))
+    return (sim.tick, round(node.damage, 6), queued, dots, characters)
+
+
+def _extend(node: ComboNode, action_type: ActionType, tick_budget: int) -> ComboNode | None:
+    sim = node.sim.fork()
+    if sim.actors[Actor.BLUE].check_action_delay(action_type, sim.tick) > tick_budget:
+        return None
+    try:
+        sim.step(Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type), len(node.actions))
+    except SimulationError:
+        return None
+    sim._process_queue()
+    return ComboNode(damage=sim.actors[Actor.RED].damage_taken, actions=node.actions + (action_type,), sim=sim)
+
+
+def optimize_combo(sim: Simulation, tick_budget: int, max_actions: int = COMBO_MAX_ACTIONS, beam_width: int = COMBO_BEAM_WIDTH, action_types: Sequence[ActionType] = COMBO_ACTION_TYPES) -> ComboResult:
+    attacker = sim.actors[Actor.BLUE]
+    action_types = [
+        action_type for action_type in action_types
+        if action_type == ActionType.AA or (action_type in attacker.ability_dict and attacker.ability_dict[action_type][1] > 0)
+    ]
+    root = ComboNode(damage=sim.actors[Actor.RED].damage_taken, actions=(), sim=sim)
+    best = root
+    beam = [root]
+    evaluated = 0
+    for _ in range(max_actions):
+        children: dict[tuple, ComboNode] = {}
+        for node in beam:
+            for action_type in action_types:
+                child = _extend(node, action_type, tick_budget)
+                if child is None:
+                    continue
+                evaluated += 1
+                signature = _signature(child)
+                if signature not in children or child.damage > children[signature].damage:
+                    children[signature] = child
+        if not children:
+            break
+        beam = sorted(children.values(), key=lambda child: (-child.damage, child.sim.tick))[:beam_width]
+        if beam[0].damage > best.damage or (beam[0].damage == best.damage and beam[0].sim.tick < best.sim.tick):
+            best = beam[0]
+    combo = [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in best.actions]
+    return ComboResult(combo=combo, response=best.sim.response(), evaluated=evaluated)
+
+
+def search_combo(job: tuple[ComboRequest, dict[str, Champion], dict[str, Item]]) -> ComboResponse:
+    combo_request, champions, items = job
+    sim = build_simulation(combo_request.base_request(), champions, items)
+    result = optimize_combo(sim, combo_request.tick_budget, combo_request.max_actions, combo_request.beam_width, combo_request.action_types)
+    return ComboResponse(combo=result.combo, result=result.response, evaluated=result.evaluated)
@@ -17,6 +17,9 @@ class SimulationError(Exception):
         self.phase = phase
         super().__init__(self.__str__())
 
+    def __reduce__(self):
+        return (self.__class__, (self.message, self.action_index, self.action_type, self.actor, self.phase))
+
     def __str__(self):
         details = f"SimulationError"
         if self.phase:
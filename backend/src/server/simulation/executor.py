@@ -0,0 +1,233 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import pickle
+
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Mapping, TypeVar
+
+from pydantic import BaseModel
+
+from src.server.models.champion import Champion
+from src.server.models.item import Item
+from src.server.models.request import V1Request, V1Response
+from src.server.simulation.character import Character
+from src.server.simulation.simulation import Simulation
+
+
+
+
+SIM_EXECUTOR = os.getenv("SIM_EXECUTOR", "process")  # "process", "thread" or "inline"
+SIM_WORKERS = int(os.getenv("SIM_WORKERS", "0")) or None
+SIM_INLINE_MAX_ACTIONS = int(os.getenv("SIM_INLINE_MAX_ACTIONS", "8"))
+SIM_WORKER_CACHE_SIZE = int(os.getenv("SIM_WORKER_CACHE_SIZE", "512"))
+
+J = TypeVar("J")
+R = TypeVar("R")
+
+
+def build_simulation(v1_request: V1Request, champions: dict[str, Champion], items: dict[str, Item]) -> Simulation:
+    char_a = Character(champions[v1_request.id_attacker], v1_request.lvl_attacker, v1_request.ability_points_attacker,
+                       [items[item_id] for item_id in v1_request.items_attacker])
+    char_d = Character(champions[v1_request.id_defender], v1_request.lvl_defender, v1_request.ability_points_defender,
+                       [items[item_id] for item_id in v1_request.items_defender])
+    return Simulation(char_a, char_d, summary=v1_request.summary)
+
+
+def run_simulation(v1_request: V1Request, champions: dict[str, Champion], items: dict[str, Item]) -> V1Response:
+    return build_simulation(v1_request, champions, items).do_combo(v1_request.combo)
+
+
+
+# Documents are identified by (model, id, data version): ids are unique per patch/hotfix and the data version
+# moves on every write, so a key never names two different contents and the worker cache needs no invalidation.
+DocumentKey = tuple[str, str, int]
+
+
+def document_keys(version: int, *documents: Mapping[str, BaseModel]) -> dict[DocumentKey, BaseModel]:
+    return {(type(document).__name__, id_, version): document for mapping in documents for id_, document in mapping.items()}
+
+
+class _DocumentPickler(pickle.Pickler):
+    def __init__(self, file: io.BytesIO, keys: dict[int, DocumentKey]) -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.keys = keys
+
+    def persistent_id(self, obj: object) -> DocumentKey | None:
+        return self.keys.get(id(obj))
+
+
+class _DocumentUnpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO, shipped: dict[DocumentKey, BaseModel]) -> None:
+        super().__init__(file)
+        self.shipped = shipped
+        self.missing: set[DocumentKey] = set()
+
+    def persistent_load(self, key: DocumentKey) -> BaseModel | None:
+        document = self.shipped.get(key)
+        if document is None:
+            document = _worker_document(key)
+        if document is None:
+            self.missing.add(key)
+        return document
+
+
+def dumps_call(fn: Callable[..., R], args: tuple, documents: Mapping[DocumentKey, BaseModel]) -> bytes:
+    # Known documents are written as their key, so the call itself stays small no matter how many it references.
+    file = io.BytesIO()
+    _DocumentPickler(file, {id(document): key for key, document in documents.items()}).dump((fn, args))
+    return file.getvalue()
+
+
+@dataclass(slots=True)
+class DocumentJob:
+    call: bytes
+    payloads: dict[DocumentKey, bytes] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
+class MissingDocuments:
+    keys: frozenset[DocumentKey]
+
+
+
+# Lives in each worker process; documents are shipped once and looked up by key afterwards.
+_worker_documents: OrderedDict[DocumentKey, BaseModel] = OrderedDict()
+
+
+def _worker_document(key: DocumentKey) -> BaseModel | None:
+    document = _worker_documents.get(key)
+    if document is not None:
+        _worker_documents.move_to_end(key)
+    return document
+
+
+def run_job(job: DocumentJob) -> object:
+    shipped = {key: pickle.loads(payload) for key, payload in job.payloads.items()}
+    for key, document in shipped.items():
+        _worker_documents[key] = document
+        _worker_documents.move_to_end(key)
+    while len(_worker_documents) > SIM_WORKER_CACHE_SIZE:
+        _worker_documents.popitem(last=False)
+
+    unpickler = _DocumentUnpickler(io.BytesIO(job.call), shipped)
+    fn, args = unpickler.load()
+    if unpickler.missing:
+        return MissingDocuments(frozenset(unpickler.missing))
+    return fn(*args)
+
+
+def clear_worker_documents() -> None:
+    _worker_documents.clear()
+
+
+
+class SimulationExecutor():
+    def __init__(self, mode: str = SIM_EXECUTOR, workers: int | None = SIM_WORKERS, inline_max_actions: int = SIM_INLINE_MAX_ACTIONS) -> None:
+        if mode not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown simulation executor mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.inline_max_actions = inline_max_actions
+        self._pool: Executor | None = None
+
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                # The pool is created lazily inside the running server, which already has motor and threadpool
+                # threads; forking that process could leave a worker holding a lock no thread will release.
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver"))
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="simulation")
+        return self._pool
+
+
+    @property
+    def parallelism(self) -> int:
+        if self.mode == "inline":
+            return 1
+        return self.workers or os.cpu_count() or 1
+
+
+    def is_inline(self, *v1_requests: V1Request) -> bool:
+        # Decided on the total work of one call, so a batch of many short combos does not run on the event loop.
+        return self.mode == "inline" or sum(len(v1_request.combo) for v1_request in v1_requests) <= self.inline_max_actions
+
+
+    async def run(self, v1_request: V1Request, champions: dict[str, Champion], items: dict[str, Item], version: int = 0) -> V1Response:
+        if self.is_inline(v1_request):
+            return run_simulation(v1_request, champions, items)
+        return await self._offload(v1_request, champions, items, version)
+
+
+    async def run_many(self, v1_requests: list[V1Request], champions: dict[str, Champion], items: dict[str, Item],
+                       version: int = 0) -> list[V1Response | BaseException]:
+        if self.is_inline(*v1_requests):
+            results: list[V1Response | BaseException] = []
+            for v1_request in v1_requests:
+                try:
+                    results.append(run_simulation(v1_request, champions, items))
+                except Exception as e:
+                    results.append(e)
+            return results
+        return list(await asyncio.gather(*(self._offload(v1_request, champions, items, version) for v1_request in v1_requests), return_exceptions=True))
+
+
+    async def _offload(self, v1_request: V1Request, champions: dict[str, Champion], items: dict[str, Item], version: int) -> V1Response:
+        loop = asyncio.get_running_loop()
+        if self.mode == "thread":
+            return await loop.run_in_executor(self._get_pool(), partial(run_simulation, v1_request, champions, items))
+        champions = {id_: champions[id_] for id_ in (v1_request.id_attacker, v1_request.id_defender)}
+        items = {id_: items[id_] for id_ in v1_request.items_attacker + v1_request.items_defender}
+        return await self._run_in_process(loop, run_simulation, (v1_request, champions, items), document_keys(version, champions, items))
+
+
+    async def _run_in_process(self, loop: asyncio.AbstractEventLoop, fn: Callable[..., R], args: tuple, documents: Mapping[DocumentKey, BaseModel]) -> R:
+        job = DocumentJob(call=dumps_call(fn, args, documents))
+        result = await loop.run_in_executor(self._get_pool(), run_job, job)
+        if isinstance(result, MissingDocuments):
+            # Documents are only pickled on a worker cache miss. The retry may land on another worker,
+            # so it ships every document the call references rather than just the missing ones.
+            job.payloads = {key: pickle.dumps(document, pickle.HIGHEST_PROTOCOL) for key, document in documents.items()}
+            result = await loop.run_in_executor(self._get_pool(), run_job, job)
+        assert not isinstance(result, MissingDocuments), "Worker did not receive the shipped documents"
+        return result
+
+
+    async def run_all(self, fn: Callable[[J], R], jobs: list[J], documents: Mapping[DocumentKey, BaseModel] = {}) -> list[R]:
+        if self.mode == "inline":
+            return [fn(job) for job in jobs]
+        loop = asyncio.get_running_loop()
+        if self.mode == "thread":
+            pool = self._get_pool()
+            return list(await asyncio.gather(*(loop.run_in_executor(pool, fn, job) for job in jobs)))
+        return list(await asyncio.gather(*(self._run_in_process(loop, fn, (job,), documents) for job in jobs)))
+
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+
+_executor: SimulationExecutor | None = None
+
+
+def get_executor() -> SimulationExecutor:
+    global _executor
+    if _executor is None:
+        _executor = SimulationExecutor()
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
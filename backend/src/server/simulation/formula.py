@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+from types import CodeType
+from typing import Callable, Iterator, Mapping
+
+
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledFormula:
+    text: str
+    code: CodeType
+    names: frozenset[str]
+    constant: float | None = None
+
+    def evaluate(self, variables: Mapping[str, float]) -> float:
+        if self.constant is not None:
+            return self.constant
+        return eval(self.code, {}, variables)
+
+
+
+class FormulaVariables(Mapping[str, float]):
+    __slots__ = ("_resolve", "_extra")
+
+    def __init__(self, resolve: Callable[[str], float], extra: Mapping[str, float]) -> None:
+        self._resolve = resolve
+        self._extra = extra
+
+    def __getitem__(self, name: str) -> float:
+        if name in self._extra:
+            return self._extra[name]
+        return self._resolve(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._extra)
+
+    def __len__(self) -> int:
+        return len(self._extra)
+
+
+
+_formula_cache: dict[str, CompiledFormula] = {}
+
+
+def compile_formula(formula: str) -> CompiledFormula:
+    compiled = _formula_cache.get(formula)
+    if compiled is not None:
+        return compiled
+    code = compile(formula, f"<formula {formula!r}>", "eval")
+    names = frozenset(code.co_names)
+    constant = eval(code, {}, {}) if not names else None
+    compiled = CompiledFormula(text=formula, code=code, names=names, constant=constant)
+    _formula_cache[formula] = compiled
+    return compiled
+
+
+def clear_formula_cache() -> None:
+    _formula_cache.clear()
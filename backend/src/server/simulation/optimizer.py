@@ -0,0 +1,257 @@
+import heapq
+import math
+
+from dataclasses import dataclass, field, replace
+from typing import Sequence
+
+from src.server.models.champion import Champion
+from src.server.models.dataenums import BuildObjective, ItemClass, Map, Stat
+from src.server.models.item import Item
+from src.server.models.request import V1Request
+from src.server.simulation.character import Character
+from src.server.simulation.simulation import Simulation
+
+
+
+
+StatVector = dict[Stat, float]
+
+
+@dataclass(slots=True)
+class BuildProblem:
+    request: V1Request
+    champions: dict[str, Champion]
+    items: dict[str, Item]
+    candidates: list[Item]
+    slots: int
+    budget: int | None = None
+    objective: BuildObjective = BuildObjective.DAMAGE
+    top_k: int = 5
+    max_evaluations: int = 5000
+    vectors: list[StatVector] = field(default_factory=list)
+
+
+@dataclass(order=True, slots=True)
+class Build:
+    score: float
+    damage: float = field(compare=False)
+    gold: int = field(compare=False)
+    candidates: tuple[int, ...] = field(compare=False)
+
+
+@dataclass(slots=True)
+class SearchResult:
+    builds: list[Build]
+    evaluated: int
+    complete: bool
+
+
+
+def select_candidates(items: list[Item], owned: list[Item], map_: Map, item_classes: Sequence[ItemClass], objective: BuildObjective,
+                      budget: int | None = None) -> list[Item]:
+    owned_ids = {item.item_id for item in owned}
+    candidates = [
+        item for item in items
+        if item.stats and item.class_ in item_classes and map_ in item.maps and item.item_id not in owned_ids
+    ]
+    if objective == BuildObjective.DAMAGE and budget is None:
+        # Without a gold cap, a component never beats the finished item it builds into once every slot is filled.
+        # Under a budget the component may be what fits, so it stays.
+        candidate_ids = {item.item_id for item in candidates}
+        candidates = [item for item in candidates if not candidate_ids.intersection(item.into)]
+    return candidates
+
+
+
+class BuildEvaluator():
+    def __init__(self, problem: BuildProblem) -> None:
+        self.problem = problem
+        self.evaluated: int = 0
+        self._memo: dict[tuple[tuple[Stat, float], ...], float] = {}
+
+
+    def damage(self, stats: StatVector) -> float:
+        key = tuple(sorted((stat, value) for stat, value in stats.items() if value))
+        damage = self._memo.get(key)
+        if damage is None:
+            self.evaluated += 1
+            request, champions, items = self.problem.request, self.problem.champions, self.problem.items
+            char_a = Character(champions[request.id_attacker], request.lvl_attacker, request.ability_points_attacker,
+                               [items[item_id] for item_id in request.items_attacker])
+            # Character reads tenacity from its items only, so tenacity added here has no effect: it never probes as
+            # relevant and the search ignores it. The reported builds are rerun with their real items.
+            char_a.add_bonus_stats(dict(key))
+            char_d = Character(champions[request.id_defender], request.lvl_defender, request.ability_points_defender,
+                               [items[item_id] for item_id in request.items_defender])
+            Simulation(char_a, char_d).do_combo(request.combo)
+            damage = self._memo[key] = char_d.damage_taken
+        return damage
+
+
+
+def _add_stats(stats: StatVector, delta: StatVector) -> StatVector:
+    merged = dict(stats)
+    for stat, value in delta.items():
+        merged[stat] = merged.get(stat, 0) + value
+    return merged
+
+
+def _conflicts(problem: BuildProblem) -> list[frozenset[str]]:
+    # Item ids each candidate can never share a build with, because one of the two builds into the other.
+    owned = [problem.items[item_id] for item_id in problem.request.items_attacker]
+    return [
+        frozenset(other.item_id for other in owned + problem.candidates if other.item_id in item.from_ or item.item_id in other.from_)
+        for item in problem.candidates
+    ]
+
+
+def _dominates(problem: BuildProblem, conflicts: list[frozenset[str]], i: int, j: int) -> bool:
+    # i can take j's place in any build that j fits into, and the build gets no worse.
+    a, b = problem.vectors[i], problem.vectors[j]
+    if problem.candidates[i].gold > problem.candidates[j].gold:
+        return False
+    if problem.candidates[i].class_ == ItemClass.BOOTS and problem.candidates[j].class_ != ItemClass.BOOTS:
+        return False
+    if not conflicts[i] <= conflicts[j] | {problem.candidates[j].item_id}:
+        return False
+    if any(a.get(stat, 0) < value for stat, value in b.items()):
+        return False
+    strictly = problem.candidates[i].gold < problem.candidates[j].gold or any(value > b.get(stat, 0) for stat, value in a.items())
+    return strictly or i < j
+
+
+def _prune_dominated(problem: BuildProblem, keep: list[int]) -> list[int]:
+    # A build holding j can swap it for any dominator it doesn't hold yet. It holds at most slots - 1 other
+    # items, so j can only be dropped once slots + top_k - 1 kept dominators leave top_k builds at least as
+    # good without it. Candidates are visited with the least dominated first, so dominators are decided before
+    # the items they dominate.
+    conflicts = _conflicts(problem)
+    dominators = {j: [i for i in keep if i != j and _dominates(problem, conflicts, i, j)] for j in keep}
+    threshold = problem.slots + problem.top_k - 1
+    kept: set[int] = set()
+    for j in sorted(keep, key=lambda j: len(dominators[j])):
+        if sum(i in kept for i in dominators[j]) < threshold:
+            kept.add(j)
+    return [j for j in keep if j in kept]
+
+
+def prepare_problem(problem: BuildProblem) -> tuple[BuildProblem, int]:
+    evaluator = BuildEvaluator(problem)
+    baseline = evaluator.damage({})
+    probes: StatVector = {}
+    for item in problem.candidates:
+        for stat, value in item.stats.items():
+            probes[stat] = max(probes.get(stat, 0), value)
+    relevant = {stat for stat, value in probes.items() if value > 0 and evaluator.damage({stat: value * problem.slots}) > baseline}
+
+    prepared = replace(problem, vectors=[{stat: value for stat, value in item.stats.items() if stat in relevant} for item in problem.candidates])
+    keep = _prune_dominated(prepared, [i for i, vector in enumerate(prepared.vectors) if vector])
+
+    def priority(i: int) -> float:
+        gain = evaluator.damage(prepared.vectors[i]) - baseline
+        if problem.objective == BuildObjective.DAMAGE_PER_GOLD:
+            return gain / max(prepared.candidates[i].gold, 1)
+        return gain
+
+    keep.sort(key=priority, reverse=True)
+    prepared.candidates = [prepared.candidates[i] for i in keep]
+    prepared.vectors = [prepared.vectors[i] for i in keep]
+    return prepared, evaluator.evaluated
+
+
+
+class _BranchAndBound():
+    def __init__(self, problem: BuildProblem) -> None:
+        self.problem = problem
+        self.evaluator = BuildEvaluator(problem)
+        self.top: list[Build] = []
+        self.complete: bool = True
+        self.owned: list[Item] = [problem.items[item_id] for item_id in problem.request.items_attacker]
+        self.owned_gold: int = sum(item.gold for item in self.owned)
+
+
+    def _score(self, damage: float, gold: int) -> float:
+        if self.problem.objective == BuildObjective.DAMAGE_PER_GOLD:
+            return damage / gold if gold else 0
+        return damage
+
+
+    def _threshold(self) -> float:
+        return self.top[0].score if len(self.top) >= self.problem.top_k else -math.inf
+
+
+    def _offer(self, build: Build) -> None:
+        if len(self.top) < self.problem.top_k:
+            heapq.heappush(self.top, build)
+        elif build.score > self.top[0].score:
+            heapq.heapreplace(self.top, build)
+
+
+    def _fits(self, index: int, chosen: tuple[int, ...], gold: int) -> bool:
+        item = self.problem.candidates[index]
+        if self.problem.budget is not None and gold + item.gold > self.problem.budget:
+            return False
+        build = self.owned + [self.problem.candidates[i] for i in chosen]
+        if item.class_ == ItemClass.BOOTS and any(other.class_ == ItemClass.BOOTS for other in build):
+            return False
+        return not any(other.item_id in item.from_ or item.item_id in other.from_ for other in build)
+
+
+    def _bound(self, stats: StatVector, gold: int, feasible: list[int], free: int) -> float:
+        # Optimistic: the best `free` values of every stat, as if one item could carry them all.
+        columns: dict[Stat, list[float]] = {}
+        for index in feasible:
+            for stat, value in self.problem.vectors[index].items():
+                columns.setdefault(stat, []).append(value)
+        optimistic = _add_stats(stats, {stat: sum(heapq.nlargest(free, values)) for stat, values in columns.items()})
+        damage = self.evaluator.damage(optimistic)
+        if self.problem.objective == BuildObjective.DAMAGE_PER_GOLD:
+            cheapest = min(self.problem.candidates[index].gold for index in feasible)
+            total_gold = self.owned_gold + gold + cheapest
+            return damage / total_gold if total_gold else math.inf
+        return damage
+
+
+    def expand(self, chosen: tuple[int, ...], stats: StatVector, gold: int, indices: Sequence[int]) -> None:
+        if self.evaluator.evaluated >= self.problem.max_evaluations:
+            self.complete = False
+            return
+        free = self.problem.slots - len(chosen)
+        feasible = [index for index in indices if self._fits(index, chosen, gold)] if free > 0 else []
+        if chosen and (not feasible or self.problem.objective == BuildObjective.DAMAGE_PER_GOLD):
+            damage = self.evaluator.damage(stats)
+            self._offer(Build(self._score(damage, self.owned_gold + gold), damage, self.owned_gold + gold, chosen))
+        if not feasible:
+            return
+        if len(self.top) >= self.problem.top_k and self._bound(stats, gold, feasible, free) <= self._threshold():
+            return
+        count = len(self.problem.candidates)
+        for index in feasible:
+            item = self.problem.candidates[index]
+            self.expand(chosen + (index,), _add_stats(stats, self.problem.vectors[index]), gold + item.gold, range(index + 1, count))
+
+
+
+def search_builds(problem: BuildProblem, roots: Sequence[int] | None = None) -> SearchResult:
+    search = _BranchAndBound(problem)
+    search.expand((), {}, 0, range(len(problem.candidates)) if roots is None else roots)
+    return SearchResult(builds=sorted(search.top, reverse=True), evaluated=search.evaluator.evaluated, complete=search.complete)
+
+
+def search_chunk(job: tuple[BuildProblem, list[int]]) -> SearchResult:
+    problem, roots = job
+    return search_builds(problem, roots)
+
+
+def split_roots(count: int, chunks: int) -> list[list[int]]:
+    # Round-robin, because the subtrees under the first candidates are the largest.
+    return [roots for roots in (list(range(start, count, chunks)) for start in range(max(chunks, 1))) if roots]
+
+
+def merge_results(results: Sequence[SearchResult], top_k: int) -> SearchResult:
+    builds = heapq.nlargest(top_k, (build for result in results for build in result.builds))
+    return SearchResult(
+        builds=builds,
+        evaluated=sum(result.evaluated for result in results),
+        complete=all(result.complete for result in results)
+    )
@@ -0,0 +1,27 @@
+import hashlib
+import os
+
+from src.server.models.request import V1Request, V1Response
+from src.server.simulation.simulation import Simulation
+from src.server.utils.cache import TTLCache, register_document_cache
+
+
+
+
+SIM_RESULT_CACHE_SIZE = int(os.getenv("SIM_RESULT_CACHE_SIZE", "2048"))
+SIM_RESULT_CACHE_TTL = float(os.getenv("SIM_RESULT_CACHE_TTL", "600"))
+SIM_STATE_CACHE_SIZE = int(os.getenv("SIM_STATE_CACHE_SIZE", "256"))
+
+# Keyed by the request and the data version it was run against, so writes made by the admin process retire
+# entries here too. Writes in this process additionally drop them right away through the database update hooks.
+result_cache: TTLCache[str, V1Response] = register_document_cache(TTLCache(SIM_RESULT_CACHE_SIZE, SIM_RESULT_CACHE_TTL))
+# Finished simulations kept around so that extending their combo only costs the extra actions. Entries are only ever forked.
+state_cache: TTLCache[str, Simulation] = register_document_cache(TTLCache(SIM_STATE_CACHE_SIZE, SIM_RESULT_CACHE_TTL))
+
+
+def request_key(v1_request: V1Request, version: int) -> str:
+    return f"{version}:{hashlib.blake2b(v1_request.json().encode(), digest_size=16).hexdigest()}"
+
+
+def document_ids(v1_request: V1Request) -> set[str]:
+    return {v1_request.id_attacker, v1_request.id_defender, *v1_request.items_attacker, *v1_request.items_defender}
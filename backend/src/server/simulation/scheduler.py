@@ -0,0 +1,100 @@
+import heapq
+
+from typing import Mapping
+
+from src.server.models.dataenums import EventHandle, QueueComponent
+
+
+
+
+class EventQueue():
+    def __init__(self) -> None:
+        self._ticks: list[int] = []
+        self._buckets: dict[int, list[tuple[int, QueueComponent]]] = {}
+        self._cancelled: set[int] = set()
+        self._seq: int = 0
+
+
+    @classmethod
+    def from_dict(cls, entries: Mapping[int, list[QueueComponent]]) -> "EventQueue":
+        queue = cls()
+        for tick, components in entries.items():
+            for component in components:
+                queue.push(tick, component)
+        return queue
+
+
+    def copy(self) -> "EventQueue":
+        queue = EventQueue()
+        queue._ticks = list(self._ticks)
+        queue._buckets = {tick: list(bucket) for tick, bucket in self._buckets.items()}
+        queue._cancelled = set(self._cancelled)
+        queue._seq = self._seq
+        return queue
+
+
+    def push(self, tick: int, component: QueueComponent) -> EventHandle:
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            bucket = self._buckets[tick] = []
+            heapq.heappush(self._ticks, tick)
+        seq = self._seq
+        self._seq += 1
+        bucket.append((seq, component))
+        return EventHandle(tick=tick, seq=seq)
+
+
+    def cancel(self, handle: EventHandle) -> None:
+        bucket = self._buckets.get(handle.tick)
+        if bucket and bucket[0][0] <= handle.seq:
+            self._cancelled.add(handle.seq)
+
+
+    def peek_tick(self) -> int | None:
+        while self._ticks:
+            tick = self._ticks[0]
+            bucket = self._buckets[tick]
+            if not self._cancelled or any(seq not in self._cancelled for seq, _ in bucket):
+                return tick
+            heapq.heappop(self._ticks)
+            self._discard(self._buckets.pop(tick))
+        return None
+
+
+    def pop(self) -> tuple[int, list[QueueComponent]]:
+        tick = heapq.heappop(self._ticks)
+        bucket = self._buckets.pop(tick)
+        if not self._cancelled:
+            return tick, [component for _, component in bucket]
+        components = [component for seq, component in bucket if seq not in self._cancelled]
+        self._discard(bucket)
+        return tick, components
+
+
+    def pop_due(self, tick: int) -> tuple[int, list[QueueComponent]] | None:
+        next_tick = self.peek_tick()
+        if next_tick is None or next_tick > tick:
+            return None
+        return self.pop()
+
+
+    def to_dict(self) -> dict[int, list[QueueComponent]]:
+        entries = {}
+        for tick in sorted(self._buckets):
+            components = [component for seq, component in self._buckets[tick] if seq not in self._cancelled]
+            if components:
+                entries[tick] = components
+        return entries
+
+
+    def _discard(self, bucket: list[tuple[int, QueueComponent]]) -> None:
+        if self._cancelled:
+            self._cancelled.difference_update(seq for seq, _ in bucket)
+
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets.values()) - len(self._cancelled)
+
+
+    def __bool__(self) -> bool:
+        return self.peek_tick() is not None
@@ -1,37 +1,176 @@
-from collections import defaultdict
+import copy
+import dataclasses
+import heapq
+import itertools
 import math
 
+from dataclasses import dataclass
+from typing import Iterator
 
-from src.server.models.dataenums import DotState, EffectComp, QueueComponent, EffectType, Actor, ActionType, TickEvent, TICKRATE
+from src.server.models.dataenums import DotState, EffectComp, EffectRecord, QueueComponent, EffectType, Actor, ActionType, ProcessedDamageProperties, TickRecord, TICKRATE
 from src.server.models.request import V1Response, Action
-from src.server.simulation.character import Character
+from src.server.simulation.character import Character, CharacterState
 from src.server.simulation.exceptions import SimulationError
+from src.server.simulation.scheduler import EventQueue
+from src.server.simulation.summary import EffectSummary
 
 
 
 
+EVALUATION_TYPES = frozenset({EffectType.DAMAGE, EffectType.HEAL, EffectType.SHIELD})
+
+
+
+
+@dataclass(slots=True)
+class SimulationState:
+    tick: int
+    queue: EventQueue
+    dots: dict[tuple[ActionType, Actor], DotState]
+    effect_list: list[TickRecord]
+    actors: dict[Actor, CharacterState]
+    summary: EffectSummary | None = None
+
+
+
 class Simulation():
-    def __init__(self, blue: Character, red: Character, distance: int = 0):
+    def __init__(self, blue: Character, red: Character, distance: int = 0, summary: bool = False):
         self.tick: int = 0
         self.distance: int = distance
-        self.queue: dict[int, list[QueueComponent]] = defaultdict(list)
+        self.queue: EventQueue = EventQueue()
         self.dots: dict[tuple[ActionType, Actor], DotState] = {}
-        self.effect_list: list[TickEvent] = []
+        self.effect_list: list[TickRecord] = []
         self.actors: dict[Actor, Character] = {
             Actor.BLUE: blue,
             Actor.RED: red
         }
+        # Summary mode aggregates results per source and type instead of keeping a TickRecord per tick.
+        self.summary: EffectSummary | None = EffectSummary() if summary else None
+        self._attach_summary()
+
+
+    def _attach_summary(self) -> None:
+        for character in self.actors.values():
+            character.summary = self.summary
+
+
+
+    def snapshot(self) -> SimulationState:
+        return SimulationState(
+            tick=self.tick,
+            queue=self.queue.copy(),
+            dots={key: dataclasses.replace(dot) for key, dot in self.dots.items()},
+            effect_list=list(self.effect_list),
+            actors={actor: character.snapshot() for actor, character in self.actors.items()},
+            summary=self.summary.copy() if self.summary is not None else None
+        )
+
+
+    def restore(self, state: SimulationState) -> None:
+        self.tick = state.tick
+        self.queue = state.queue.copy()
+        self.dots = {key: dataclasses.replace(dot) for key, dot in state.dots.items()}
+        self.effect_list = list(state.effect_list)
+        for actor, character_state in state.actors.items():
+            self.actors[actor].restore(character_state)
+        self.summary = state.summary.copy() if state.summary is not None else None
+        self._attach_summary()
+
+
+    def fork(self) -> "Simulation":
+        clone = copy.copy(self)
+        clone.actors = {actor: character.fork() for actor, character in self.actors.items()}
+        clone.queue = self.queue.copy()
+        clone.dots = {key: dataclasses.replace(dot) for key, dot in self.dots.items()}
+        clone.effect_list = list(self.effect_list)
+        clone.summary = self.summary.copy() if self.summary is not None else None
+        clone._attach_summary()
+        return clone
+
+
+    def do_combo(self, combo: list[Action], fast_path: bool = True) -> V1Response:
+        if fast_path and self._is_pure_damage(combo):
+            return self._do_pure_damage_combo(combo)
+        for i, action in enumerate(combo):
+            self.step(action, i)
+        self._process_queue()
+        return self.response()
+
+
+    def stream_combo(self, combo: list[Action]) -> Iterator[TickRecord]:
+        # Hands every tick out as soon as it is settled and keeps none of them, so long fights stay flat in memory.
+        for i, action in enumerate(combo):
+            self._advance_to(action)
+            yield from self._drain_events()
+            self._cast(action, i)
+        self._process_queue()
+        yield from self._drain_events()
+
+
+    def _drain_events(self) -> list[TickRecord]:
+        events, self.effect_list = self.effect_list, []
+        return events
+
+
+    def step(self, action: Action, index: int = 0) -> None:
+        self._advance_to(action)
+        self._cast(action, index)
+
+
+    def _advance_to(self, action: Action) -> None:
+        delay = self.actors[action.actor].check_action_delay(action.action_type, self.tick)
+        if delay:
+            self.tick = delay
+        self._process_queue()
+
+
+    def _cast(self, action: Action, index: int) -> None:
+        try:
+            self._do_action(action)
+        except Exception as e:
+            raise SimulationError(
+                message=str(e),
+                action_index=index,
+                action_type=action.action_type,
+                actor=action.actor,
+                phase="cast"
+            ) from e
 
 
+    def _is_pure_damage(self, combo: list[Action]) -> bool:
+        # Nothing here can change a stat or a timing mid-combo, so every hit is a fixed value at a fixed tick.
+        blue, red = self.actors[Actor.BLUE], self.actors[Actor.RED]
+        if self.queue or self.dots or red.shields or blue.has_conditional_buffs or red.has_conditional_buffs:
+            return False
+        if any(blue.status_effects.values()) or any(red.status_effects.values()):
+            return False
+        for action in combo:
+            if action.actor != Actor.BLUE or action.target != Actor.RED:
+                return False
+            if action.action_type == ActionType.AA:
+                continue
+            if action.action_type not in blue.ability_dict or not blue.ability_dict[action.action_type][0].validated:
+                return False
+            for effect in blue.ability_dict[action.action_type][0].effects:
+                for component in effect.effect_components:
+                    if component.type_ != EffectType.DAMAGE or math.ceil(component.duration * TICKRATE) > 0 or component.props.vamp:
+                        return False
+        return True
 
-    def do_combo(self, combo: list[Action]) -> V1Response:
+
+    def _do_pure_damage_combo(self, combo: list[Action]) -> V1Response:
+        # Same schedule as step()/_process_queue(), minus the event queue and with one evaluation per distinct hit.
+        blue = self.actors[Actor.BLUE]
+        pending: list[tuple[int, int, EffectComp]] = []
+        values: dict[tuple, ProcessedDamageProperties] = {}
+        order = itertools.count()
         for i, action in enumerate(combo):
-            delay = self.actors[action.actor].check_action_delay(action.action_type, self.tick)
+            delay = blue.check_action_delay(action.action_type, self.tick)
             if delay:
                 self.tick = delay
-            self._process_queue()
+            self._settle_hits(pending, values)
             try:
-                self._do_action(action)
+                action_effect = blue.do_action(action, self.tick)
             except Exception as e:
                 raise SimulationError(
                     message=str(e),
@@ -40,8 +179,61 @@ class Simulation():
                     actor=action.actor,
                     phase="cast"
                 ) from e
-        self._process_queue()
-        return V1Response(tick_rate=TICKRATE, damage=round(self.actors[Actor.RED].damage_taken), ticks=self.tick, effect_list=self.effect_list)
+            self.tick = action_effect.tick
+            for effect_comp in action_effect.effect_comps:
+                heapq.heappush(pending, (self.tick + self._calculate_delay(effect_comp), next(order), effect_comp))
+        self._settle_hits(pending, values)
+        for tick, _, effect_comp in sorted(pending, key=lambda hit: hit[:2]):
+            self.queue.push(tick, QueueComponent(source=effect_comp.source, actor=Actor.BLUE, target=effect_comp.target, type_=effect_comp.type_, props=effect_comp.props))
+        return self.response()
+
+
+    def _settle_hits(self, pending: list[tuple[int, int, EffectComp]], values: dict[tuple, ProcessedDamageProperties]) -> None:
+        blue, red = self.actors[Actor.BLUE], self.actors[Actor.RED]
+        while pending and pending[0][0] <= self.tick:
+            tick = pending[0][0]
+            total_damage = 0
+            results = []
+            while pending and pending[0][0] == tick:
+                effect_comp = heapq.heappop(pending)[2]
+                props = effect_comp.props
+                key = (effect_comp.source, props.scaling, props.dmg_type, props.dmg_sub_type, props.hp_scaling)
+                processed = values.get(key)
+                if processed is None:
+                    [component] = blue.evaluate([QueueComponent(source=effect_comp.source, actor=Actor.BLUE, target=Actor.RED, type_=EffectType.DAMAGE, props=props)])
+                    processed = values[key] = component.props
+                damage, raw_dmg, mitigated = red._calculate_damage(processed)
+                total_damage += damage
+                if self.summary is None:
+                    results.append(EffectRecord(
+                        source=effect_comp.source,
+                        actor=Actor.BLUE,
+                        target=Actor.RED,
+                        type_=EffectType.DAMAGE,
+                        value=damage,
+                        raw=raw_dmg,
+                        mitigated=mitigated,
+                        damage_sub_type=processed.dmg_sub_type
+                    ))
+                else:
+                    self.summary.add(effect_comp.source, Actor.BLUE, Actor.RED, EffectType.DAMAGE, damage, raw=raw_dmg, mitigated=mitigated)
+            red.damage_taken += total_damage
+            if total_damage > 0:
+                red.hp -= total_damage
+                red._on_hp_changed()
+            if self.summary is None:
+                self.effect_list.append(TickRecord(tick=tick, result=results))
+
+
+    def response(self) -> V1Response:
+        # The API boundary: everything below was produced by the engine, so the models are built without revalidation.
+        return V1Response.construct(
+            tick_rate=TICKRATE,
+            damage=round(self.actors[Actor.RED].damage_taken),
+            ticks=self.tick,
+            effect_list=[event.to_model() for event in self.effect_list],
+            totals=self.summary.to_models() if self.summary is not None else None
+        )
     
 
     def _do_action(self, action: Action) -> None:
@@ -56,7 +248,7 @@ class Simulation():
                 self._apply_dot(effect_component, actor)
             else:
                 status_time = self.tick + self._calculate_delay(effect_component) + effect_component.duration
-                self.queue.setdefault(status_time, []).append(QueueComponent(
+                self.queue.push(status_time, QueueComponent(
                     source=effect_component.source,
                     actor=actor,
                     target=effect_component.target,
@@ -66,34 +258,38 @@ class Simulation():
 
 
     def _process_queue(self) -> None:
-        q_ticks = sorted(self.queue.keys())
-        for q_tick in q_ticks:
-            if q_tick > self.tick:
-                break
-            queue_entries = self.queue.pop(q_tick)
-
-            evaluation_types = [EffectType.DAMAGE, EffectType.HEAL, EffectType.SHIELD]
-            evaluation_entries = [entry for entry in queue_entries if entry.type_ in evaluation_types]
-            evaluated_entries = [entry for entry in queue_entries if entry.type_ not in evaluation_types]
-            evaluation_blue = [entry for entry in evaluation_entries if entry.actor == Actor.BLUE]
-            evaluation_red = [entry for entry in evaluation_entries if entry.actor == Actor.RED]
-            evaluated_entries.extend(self.actors[Actor.BLUE].evaluate(evaluation_blue))
-            evaluated_entries.extend(self.actors[Actor.RED].evaluate(evaluation_red))
+        while (due := self.queue.pop_due(self.tick)) is not None:
+            q_tick, queue_entries = due
+
+            to_evaluate: dict[Actor, list[QueueComponent]] = {Actor.BLUE: [], Actor.RED: []}
+            effects: dict[Actor, dict[EffectType, list[QueueComponent]]] = {Actor.BLUE: {}, Actor.RED: {}}
+            for entry in queue_entries:
+                if entry.type_ in EVALUATION_TYPES:
+                    to_evaluate[entry.actor].append(entry)
+                else:
+                    effects[entry.target].setdefault(entry.type_, []).append(entry)
+            for actor, entries in to_evaluate.items():
+                if entries:
+                    for entry in self.actors[actor].evaluate(entries):
+                        effects[entry.target].setdefault(entry.type_, []).append(entry)
 
             effect_results = []
-            while evaluated_entries:
-                blue_list = [entry for entry in evaluated_entries if entry.target == Actor.BLUE]
-                red_list = [entry for entry in evaluated_entries if entry.target == Actor.RED]
-
-                evaluated_entries, effect_results = self.actors[Actor.BLUE].take_effects(blue_list, q_tick)
-                evaluated_entries_b, effect_results_b = self.actors[Actor.RED].take_effects(red_list, q_tick)
-                evaluated_entries.extend(evaluated_entries_b)
-                effect_results.extend(effect_results_b)
-                
-            self.effect_list.append(TickEvent(
-                tick=q_tick,
-                result=effect_results
-            ))
+            while effects[Actor.BLUE] or effects[Actor.RED]:
+                follow_ups: dict[Actor, dict[EffectType, list[QueueComponent]]] = {Actor.BLUE: {}, Actor.RED: {}}
+                for target, buckets in effects.items():
+                    if not buckets:
+                        continue
+                    new_entries, results = self.actors[target].take_sorted_effects(buckets, q_tick)
+                    effect_results.extend(results)
+                    for entry in new_entries:
+                        follow_ups[entry.target].setdefault(entry.type_, []).append(entry)
+                effects = follow_ups
+
+            if self.summary is None:
+                self.effect_list.append(TickRecord(
+                    tick=q_tick,
+                    result=effect_results
+                ))
             
 
     def _apply_dot(self, effect_comp: EffectComp, actor: Actor) -> None:
@@ -108,7 +304,7 @@ class Simulation():
         while existing_dot.start + math.ceil(i * interval_ticks - 1e-9) <= existing_dot.end:
             existing_dot.last_regular = existing_dot.start + math.ceil(i * interval_ticks - 1e-9)
             
-            self.queue.setdefault(existing_dot.last_regular, []).append(QueueComponent(
+            self.queue.push(existing_dot.last_regular, QueueComponent(
                 source=effect_comp.source,
                 actor=actor,
                 target=effect_comp.target,
@@ -117,7 +313,7 @@ class Simulation():
             ))
             i += 1
         if existing_dot.last_regular != existing_dot.end:
-            self.queue.setdefault(existing_dot.end, []).append(QueueComponent(
+            existing_dot.end_handle = self.queue.push(existing_dot.end, QueueComponent(
                 source=effect_comp.source,
                 actor=actor,
                 target=effect_comp.target,
@@ -130,7 +326,7 @@ class Simulation():
         existing_dot = self.dots.get((effect_comp.source, effect_comp.target))
         if existing_dot and existing_dot.end > self.tick:
             if existing_dot.end != existing_dot.last_regular:
-                self._remove_dot_end(effect_comp.source, effect_comp.target, existing_dot.end)
+                self._remove_dot_end(existing_dot)
             existing_dot.end = self.tick + self._calculate_delay(effect_comp) + effect_comp.duration
         else:
             existing_dot = DotState(
@@ -142,12 +338,10 @@ class Simulation():
         return existing_dot
 
 
-    def _remove_dot_end(self, source: ActionType, target: Actor, tick: int) -> None:
-        if tick not in self.queue:
-            return
-        self.queue[tick] = [qc for qc in self.queue[tick] if not (qc.source == source and qc.target == target)]
-        if not self.queue[tick]:
-            del self.queue[tick]
+    def _remove_dot_end(self, dot: DotState) -> None:
+        if dot.end_handle is not None:
+            self.queue.cancel(dot.end_handle)
+            dot.end_handle = None
 
 
     def _calculate_delay(self, effect_comp: EffectComp) -> int:
@@ -0,0 +1,36 @@
+from src.server.models.dataenums import ActionType, Actor, EffectTotal, EffectType
+
+
+
+
+SummaryKey = tuple[ActionType, Actor, Actor, EffectType]
+
+
+class EffectSummary():
+    __slots__ = ("totals",)
+
+    def __init__(self, totals: dict[SummaryKey, list[float]] | None = None) -> None:
+        # value, raw, mitigated, overheal, count
+        self.totals: dict[SummaryKey, list[float]] = totals if totals is not None else {}
+
+
+    def add(self, source: ActionType, actor: Actor, target: Actor, type_: EffectType, value: float, raw: float = 0, mitigated: float = 0, overheal: float = 0) -> None:
+        total = self.totals.get((source, actor, target, type_))
+        if total is None:
+            total = self.totals[(source, actor, target, type_)] = [0, 0, 0, 0, 0]
+        total[0] += value
+        total[1] += raw
+        total[2] += mitigated
+        total[3] += overheal
+        total[4] += 1
+
+
+    def copy(self) -> "EffectSummary":
+        return EffectSummary({key: list(total) for key, total in self.totals.items()})
+
+
+    def to_models(self) -> list[EffectTotal]:
+        return [
+            EffectTotal(source=source, actor=actor, target=target, type_=type_, value=value, raw=raw, mitigated=mitigated, overheal=overheal, count=int(count))
+            for (source, actor, target, type_), (value, raw, mitigated, overheal, count) in self.totals.items()
+        ]
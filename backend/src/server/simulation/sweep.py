@@ -0,0 +1,327 @@
+import math
+
+from dataclasses import dataclass
+from typing import Mapping
+
+import numpy as np
+
+from src.server.models.champion import Champion, stat_growth
+from src.server.models.dataenums import ActionType, Actor, Buff, DamageProperties, DamageSubType, EffectType, HpScaling, QueueComponent, Stat, TICKRATE
+from src.server.models.item import Item
+from src.server.models.request import SweepPoint, SweepRequest, SweepResponse, SweepResult, V1Request
+from src.server.simulation.character import STACK_VARIABLES, STAT_VARIABLES, Character
+from src.server.simulation.exceptions import SimulationError
+from src.server.simulation.formula import FormulaVariables, compile_formula
+from src.server.simulation.simulation import Simulation
+
+
+
+
+ABILITY_TYPES = (ActionType.Q, ActionType.W, ActionType.E, ActionType.R)
+
+
+@dataclass(slots=True)
+class SweepOutcome:
+    results: list[SweepResult]
+    timelines: int
+    vectorized: int
+
+
+
+class _TracingCharacter(Character):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.trace: list[list[QueueComponent]] = []
+
+
+    def evaluate(self, queue_comps: list[QueueComponent]) -> list[QueueComponent]:
+        # One call per due tick, in timeline order.
+        self.trace.append(list(queue_comps))
+        return super().evaluate(queue_comps)
+
+
+
+# NumPy counterpart of the stat lookups in Character, one entry per sweep point.
+class _StatColumns():
+    def __init__(self, champion: Champion, levels: np.ndarray, bonus_stats: dict[Stat, np.ndarray], items: list[Item]) -> None:
+        self.champion = champion
+        self.levels = levels
+        self.size = len(levels)
+        self.growth = stat_growth(levels)
+        self.bonus_stats = bonus_stats
+        self.items = items
+        self.stat_cache: dict[Stat, np.ndarray] = {}
+
+
+    def _column(self, value: float | np.ndarray) -> np.ndarray:
+        return np.broadcast_to(np.asarray(value, dtype=float), (self.size,))
+
+
+    def _get_base_stat(self, stat: Stat) -> np.ndarray:
+        base_value = getattr(self.champion, stat.value, None)
+        if not isinstance(base_value, (int, float)):
+            return self._column(0)
+        per_level = getattr(self.champion, f"{stat.value}_per_lvl", 0)
+        return base_value + per_level * self.growth
+
+
+    def _get_bonus_stat(self, stat: Stat) -> np.ndarray:
+        return self.bonus_stats.get(stat, self._column(0))
+
+
+    def _get_stat(self, stat: Stat) -> np.ndarray:
+        cached = self.stat_cache.get(stat)
+        if cached is None:
+            cached = self.stat_cache[stat] = self._compute_stat(stat)
+        return cached
+
+
+    def _compute_stat(self, stat: Stat) -> np.ndarray:
+        # Stat buffs, slows and cripples are excluded before a sweep gets here.
+        if stat.value.startswith("bonus "):
+            return self._get_bonus_stat(Stat.from_str(stat.value.removeprefix("bonus ")))
+        if stat == Stat.ATTACKSPEED_P:
+            bonus = self.champion.attackspeed_per_lvl * self.growth + self._get_bonus_stat(Stat.ATTACKSPEED_P)
+            return self.champion.attackspeed + self.champion.attackspeed_ratio * bonus
+        if stat == Stat.TENACITY_P:
+            return self._column(math.prod(1 - item.stats[Stat.TENACITY_P] for item in self.items if Stat.TENACITY_P in item.stats))
+        return self._get_base_stat(stat) + self._get_bonus_stat(stat)
+
+
+    def _get_penetration(self, dmg_sub_type: DamageSubType) -> tuple[np.ndarray, np.ndarray]:
+        if dmg_sub_type == DamageSubType.PHYSIC:
+            return self._get_bonus_stat(Stat.LETHALITY), self._get_bonus_stat(Stat.ARMOR_PEN_P)
+        if dmg_sub_type == DamageSubType.MAGIC:
+            return self._get_bonus_stat(Stat.MAGIC_PEN), self._get_bonus_stat(Stat.MAGIC_PEN_P)
+        return self._column(0), self._column(0)
+
+
+    def _get_resistance(self, dmg_sub_type: DamageSubType) -> np.ndarray:
+        if dmg_sub_type == DamageSubType.PHYSIC:
+            return self._get_stat(Stat.ARMOR)
+        if dmg_sub_type == DamageSubType.MAGIC:
+            return self._get_stat(Stat.MR)
+        return self._column(0)
+
+
+    def _get_variable(self, name: str) -> np.ndarray:
+        if name in STAT_VARIABLES:
+            return self._get_stat(STAT_VARIABLES[name])
+        if name == "level":
+            return self.levels
+        raise KeyError(name)
+
+
+    def _calculate_damage(self, value: np.ndarray, props: DamageProperties, target: "_StatColumns", hp: np.ndarray) -> np.ndarray:
+        match props.hp_scaling:
+            case HpScaling.MAX_HP:
+                value = value * target._get_stat(Stat.HP)
+            case HpScaling.CURRENT_HP:
+                value = value * hp
+            case HpScaling.MISSING_HP:
+                value = value * (target._get_stat(Stat.HP) - hp)
+        flat_pen, percent_pen = self._get_penetration(props.dmg_sub_type)
+        resistance = target._get_resistance(props.dmg_sub_type)
+        resistance = resistance - resistance * percent_pen
+        resistance = resistance - flat_pen
+        resistance = np.maximum(resistance, 0)
+        return value * (100 / (resistance + 100))
+
+
+
+def _evaluate(formula: str, variables: Mapping[str, np.ndarray], size: int) -> np.ndarray:
+    compiled = compile_formula(formula)
+    if compiled.constant is not None:
+        return np.full(size, compiled.constant, dtype=float)
+    try:
+        return np.broadcast_to(np.asarray(compiled.evaluate(variables), dtype=float), (size,))
+    except Exception:
+        # Formulas that branch or index on a variable are evaluated point by point.
+        columns = {}
+        for name in compiled.names:
+            try:
+                columns[name] = variables[name]
+            except KeyError:
+                pass
+        return np.array([compiled.evaluate({name: column[i].item() for name, column in columns.items()}) for i in range(size)], dtype=float)
+
+
+
+def _point_request(base: V1Request, point: SweepPoint) -> V1Request:
+    overrides = {field: getattr(point, field) for field in ("lvl_attacker", "ability_points_attacker", "lvl_defender")}
+    return base.copy(update={field: value for field, value in overrides.items() if value is not None})
+
+
+def _build(base: V1Request, point: SweepPoint, champions: dict[str, Champion], items: dict[str, Item], attacker_cls: type[Character] = Character) -> Simulation:
+    v1_request = _point_request(base, point)
+    char_a = attacker_cls(champions[v1_request.id_attacker], v1_request.lvl_attacker, v1_request.ability_points_attacker,
+                          [items[item_id] for item_id in v1_request.items_attacker])
+    if point.bonus_stats_attacker:
+        char_a.add_bonus_stats(point.bonus_stats_attacker)
+    char_d = Character(champions[v1_request.id_defender], v1_request.lvl_defender, v1_request.ability_points_defender,
+                       [items[item_id] for item_id in v1_request.items_defender])
+    return Simulation(char_a, char_d)
+
+
+def _simulate_point(index: int, base: V1Request, point: SweepPoint, champions: dict[str, Champion], items: dict[str, Item]) -> SweepResult:
+    try:
+        response = _build(base, point, champions, items).do_combo(base.combo)
+    except SimulationError as e:
+        return SweepResult(index=index, error=e.message)
+    except NotImplementedError as e:
+        return SweepResult(index=index, error=str(e))
+    return SweepResult(index=index, damage=response.damage, ticks=response.ticks)
+
+
+
+class _Sweep():
+    def __init__(self, base: V1Request, points: list[SweepPoint], champions: dict[str, Champion], items: dict[str, Item]) -> None:
+        self.base = base
+        self.points = points
+        self.champions = champions
+        self.items = items
+        self.attacker = champions[base.id_attacker]
+        self.defender = champions[base.id_defender]
+        self.items_attacker = [items[item_id] for item_id in base.items_attacker]
+        self.items_defender = [items[item_id] for item_id in base.items_defender]
+
+        self.levels_attacker = np.array([base.lvl_attacker if point.lvl_attacker is None else point.lvl_attacker for point in points])
+        self.levels_defender = np.array([base.lvl_defender if point.lvl_defender is None else point.lvl_defender for point in points])
+        ranks = [point.ability_points_attacker or base.ability_points_attacker for point in points]
+        self.ranks = {action_type: np.array([getattr(rank, action_type.value) for rank in ranks]) for action_type in ABILITY_TYPES}
+
+        item_stats = self._sum_item_stats(self.items_attacker)
+        swept = set(item_stats).union(*(point.bonus_stats_attacker for point in points))
+        self.bonus_attacker = {
+            stat: np.array([item_stats.get(stat, 0) + point.bonus_stats_attacker.get(stat, 0) for point in points], dtype=float)
+            for stat in swept
+        }
+        self.bonus_defender = {stat: np.full(len(points), value) for stat, value in self._sum_item_stats(self.items_defender).items()}
+
+
+    @staticmethod
+    def _sum_item_stats(items: list[Item]) -> dict[Stat, float]:
+        stats: dict[Stat, float] = {}
+        for item in items:
+            for stat, value in item.stats.items():
+                stats[stat] = stats.get(stat, 0.0) + value
+        return stats
+
+
+    def _columns(self, indices: np.ndarray) -> tuple[_StatColumns, _StatColumns]:
+        attacker = _StatColumns(self.attacker, self.levels_attacker[indices], {stat: column[indices] for stat, column in self.bonus_attacker.items()}, self.items_attacker)
+        defender = _StatColumns(self.defender, self.levels_defender[indices], {stat: column[indices] for stat, column in self.bonus_defender.items()}, self.items_defender)
+        return attacker, defender
+
+
+    def vectorizable(self) -> bool:
+        # Stat buffs and anything the defender does feed back into the timeline or the stats mid-combo.
+        if any(action.actor != Actor.BLUE for action in self.base.combo):
+            return False
+        return not any(effect.buff == Buff.STATS for champion in (self.attacker, self.defender) for effect in champion.passive.effects)
+
+
+    def timelines(self) -> dict[tuple, np.ndarray]:
+        indices = np.arange(len(self.points))
+        try:
+            keys = self._timeline_keys(indices)
+        except Exception:
+            keys = [(index,) for index in indices]
+        groups: dict[tuple, list[int]] = {}
+        for index, key in zip(indices, keys):
+            groups.setdefault(key, []).append(index)
+        return {key: np.array(group) for key, group in groups.items()}
+
+
+    def _timeline_keys(self, indices: np.ndarray) -> list[tuple]:
+        # Everything Character uses to place actions on the tick grid; equal keys mean equal event timelines.
+        attacker, _ = self._columns(indices)
+        action_types = {action.action_type for action in self.base.combo}
+        columns = []
+        if ActionType.AA in action_types:
+            attack_time = 1 / attacker._get_stat(Stat.ATTACKSPEED_P)
+            columns.append(np.ceil(attack_time * TICKRATE))
+            columns.append(np.ceil(attack_time * self.attacker.attack_windup * TICKRATE))
+        for action_type in ABILITY_TYPES:
+            if action_type not in action_types:
+                continue
+            ability = getattr(self.attacker, action_type.value)
+            variables = FormulaVariables(attacker._get_variable, {"rank": self.ranks[action_type][indices]})
+            cooldown = _evaluate(ability.cooldown, variables, len(indices))
+            cooldown = cooldown * (100 / (100 + attacker._get_bonus_stat(Stat.ABILITY_HASTE)))
+            cast_time = _evaluate(ability.cast_time, variables, len(indices))
+            columns.append(np.ceil(cooldown * TICKRATE))
+            columns.append(np.ceil(cast_time * TICKRATE))
+        if not columns:
+            return [() for _ in indices]
+        return [tuple(row) for row in np.stack(columns, axis=1).tolist()]
+
+
+    def trace(self, index: int) -> tuple[Simulation, list[list[QueueComponent]]] | None:
+        try:
+            sim = _build(self.base, self.points[index], self.champions, self.items, _TracingCharacter)
+            sim.do_combo(self.base.combo, fast_path=False)
+        except Exception:
+            # Let the per-point simulations report it the way /simulation/v1 would.
+            return None
+        attacker = sim.actors[Actor.BLUE]
+        assert isinstance(attacker, _TracingCharacter)
+        for components in attacker.trace:
+            for component in components:
+                # Heals and shields on the target change how later damage lands.
+                if component.type_ != EffectType.DAMAGE or component.target != Actor.RED:
+                    return None
+                if compile_formula(component.props.scaling).names & STACK_VARIABLES.keys():
+                    return None
+        return sim, attacker.trace
+
+
+    def damage(self, indices: np.ndarray, trace: list[list[QueueComponent]]) -> np.ndarray:
+        attacker, defender = self._columns(indices)
+        ranks = {action_type: column[indices] for action_type, column in self.ranks.items()}
+        hp = defender._get_stat(Stat.HP)
+        damage_taken = np.zeros(len(indices))
+        for components in trace:
+            total = np.zeros(len(indices))
+            for component in components:
+                assert isinstance(component.props, DamageProperties)
+                variables = FormulaVariables(attacker._get_variable, {"rank": ranks[component.source]} if component.source in ranks else {})
+                value = _evaluate(component.props.scaling, variables, len(indices))
+                total = total + attacker._calculate_damage(value, component.props, defender, hp)
+            damage_taken = damage_taken + total
+            hp = hp - np.where(total > 0, total, 0)
+        return damage_taken
+
+
+
+def run_sweep(base: V1Request, points: list[SweepPoint], champions: dict[str, Champion], items: dict[str, Item]) -> SweepOutcome:
+    sweep = _Sweep(base, points, champions, items)
+    if not sweep.vectorizable():
+        return SweepOutcome(results=[_simulate_point(index, base, point, champions, items) for index, point in enumerate(points)], timelines=0, vectorized=0)
+
+    results: list[SweepResult | None] = [None] * len(points)
+    groups = sweep.timelines()
+    vectorized = 0
+    for indices in groups.values():
+        traced = sweep.trace(int(indices[0]))
+        damage = None
+        if traced is not None:
+            try:
+                damage = sweep.damage(indices, traced[1])
+            except Exception:
+                damage = None
+        if damage is None:
+            for index in indices:
+                results[index] = _simulate_point(int(index), base, points[index], champions, items)
+            continue
+        vectorized += len(indices)
+        ticks = traced[0].tick
+        for index, value in zip(indices, damage.tolist()):
+            results[index] = SweepResult(index=int(index), damage=round(value), ticks=ticks)
+    return SweepOutcome(results=[result for result in results if result is not None], timelines=len(groups), vectorized=vectorized)
+
+
+def sweep_job(job: tuple[SweepRequest, dict[str, Champion], dict[str, Item]]) -> SweepResponse:
+    sweep_request, champions, items = job
+    outcome = run_sweep(sweep_request.base_request(), sweep_request.points, champions, items)
+    return SweepResponse(results=outcome.results, timelines=outcome.timelines, vectorized=outcome.vectorized)
@@ -0,0 +1,102 @@
+import time
+
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Iterable, TypeVar
+
+
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+# LRU cache whose entries also expire after `ttl` seconds and can be dropped by tag.
+class TTLCache(Generic[K, V]):
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[K, tuple[float, V, frozenset[str]]] = OrderedDict()
+        self._tags: dict[str, set[K]] = {}
+
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, value, _ = entry
+        if expires <= self.timer():
+            self.invalidate(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+
+    def set(self, key: K, value: V, tags: Iterable[str] = ()) -> None:
+        self.invalidate(key)
+        tags = frozenset(tags)
+        self._entries[key] = (self.timer() + self.ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self.invalidate(next(iter(self._entries)))
+
+
+    def invalidate(self, key: K) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+    def invalidate_tag(self, tag: str) -> None:
+        for key in list(self._tags.get(tag, ())):
+            self.invalidate(key)
+
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+
+
+# Caches that hold data derived from database documents register here, so that
+# database writes can drop affected entries without knowing who cached what.
+_document_caches: list[TTLCache] = []
+
+
+def register_document_cache(cache: TTLCache) -> TTLCache:
+    _document_caches.append(cache)
+    return cache
+
+
+def invalidate_document(id_: str) -> None:
+    for cache in _document_caches:
+        cache.invalidate_tag(id_)
+
+
+def clear_document_caches() -> None:
+    for cache in _document_caches:
+        cache.clear()
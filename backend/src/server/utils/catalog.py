@@ -0,0 +1,62 @@
+import hashlib
+import os
+
+from dataclasses import dataclass
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Awaitable, Callable, Hashable, Sequence
+
+from src.server.utils.cache import TTLCache, register_document_cache
+from src.server.utils.compression import EncodedBody
+
+
+
+
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "256"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "600"))
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogSnapshot:
+    body: EncodedBody
+    etag: str
+
+
+    def representation_etag(self, encoding: str | None) -> str:
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+
+# Pre-serialized /all/{patch} lists keyed by (kind, patch, hotfix, filter, data version). The data version lives in
+# the database and moves on every write from any process, so a snapshot built before a write is never served again
+# once the version is re-read. The ETag hashes the body read under that version, so processes on the same data
+# agree on it and it changes exactly when the list does.
+catalog_cache: TTLCache[tuple, CatalogSnapshot] = register_document_cache(TTLCache(CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL))
+
+
+def build_snapshot(models: Sequence[BaseModel]) -> CatalogSnapshot:
+    body = JSONResponse(content=jsonable_encoder(models)).body
+    return CatalogSnapshot(body=EncodedBody(body), etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+async def get_catalog_snapshot(kind: str, patch: str, hotfix: datetime | None, filter_: Hashable, version: int,
+                               fetch: Callable[[], Awaitable[Sequence[BaseModel]]]) -> CatalogSnapshot | None:
+    key = (kind, patch, hotfix, filter_, version)
+    snapshot = catalog_cache.get(key)
+    if snapshot is None:
+        models = await fetch()
+        if not models:
+            return None
+        # The version was read before fetching, so the list is at least as new as the version it is stored under.
+        snapshot = build_snapshot(models)
+        catalog_cache.set(key, snapshot)
+    return snapshot
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
@@ -0,0 +1,128 @@
+import gzip
+import os
+
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Bodies from this size up are compressed in the threadpool; below it the hand-off costs more than the compression.
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", "65536"))
+# Dynamic responses are compressed per request, so they use fast settings. Cached bodies are
+# compressed once and served many times, so they get the smallest output instead.
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+
+
+def accepted_encoding(accept_encoding: str | None) -> str | None:
+    if not accept_encoding:
+        return None
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            qualities[coding.strip().lower()] = float(quality) if params else 1.0
+        except ValueError:
+            continue
+    # A coding listed by name keeps its own quality, so "gzip;q=0, *" still refuses gzip.
+    wildcard = qualities.get("*", 0)
+    if brotli is not None and qualities.get("br", wildcard) > 0:
+        return "br"
+    if qualities.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=PRECOMPRESS_BROTLI_QUALITY if precompress else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=PRECOMPRESS_GZIP_LEVEL if precompress else GZIP_LEVEL, mtime=0)
+
+
+# A cached response body together with its compressed variants, which are built on first use.
+class EncodedBody():
+    __slots__ = ("identity", "_encoded")
+
+    def __init__(self, identity: bytes) -> None:
+        self.identity = identity
+        self._encoded: dict[str, bytes] = {}
+
+
+    def negotiate(self, accept_encoding: str | None) -> str | None:
+        if len(self.identity) < COMPRESSION_MIN_SIZE:
+            return None
+        return accepted_encoding(accept_encoding)
+
+
+    async def encode(self, encoding: str | None) -> bytes:
+        if encoding is None:
+            return self.identity
+        body = self._encoded.get(encoding)
+        if body is None:
+            # Compressing a catalog-sized body at the highest settings takes long enough to stall the event loop.
+            body = self._encoded[encoding] = await run_in_threadpool(compress, self.identity, encoding, precompress=True)
+        return body
+
+
+    async def response(self, encoding: str | None, headers: dict[str, str] | None = None) -> Response:
+        headers = dict(headers or {})
+        if len(self.identity) >= COMPRESSION_MIN_SIZE:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=await self.encode(encoding), media_type="application/json", headers=headers)
+
+
+
+# Compresses complete responses above `minimum_size` on the fly. Responses that already carry a
+# Content-Encoding (the precompressed cached bodies) and streamed responses pass through untouched,
+# so NDJSON/SSE ticks are not held back by a compressor's buffer.
+class CompressionMiddleware():
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE, offload_size: int = COMPRESSION_OFFLOAD_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding")) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if not message.get("more_body", False) and "content-encoding" not in headers and len(body) >= self.minimum_size:
+                # Large simulation effect lists would stall the event loop while they compress.
+                body = await run_in_threadpool(compress, body, encoding) if len(body) >= self.offload_size else compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                message = {"type": "http.response.body", "body": body}
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
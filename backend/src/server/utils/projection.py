@@ -0,0 +1,36 @@
+from functools import lru_cache
+from pydantic import BaseModel, create_model
+from typing import Any, Type
+
+
+
+
+# Top-level fields only: nested documents are parsed by their parent's parse_obj, which needs them whole.
+def parse_fields(model_cls: Type[BaseModel], fields: str) -> tuple[str, ...]:
+    by_alias = {field.alias: name for name, field in model_cls.__fields__.items()}
+    names = set()
+    for part in fields.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name = by_alias.get(part, part)
+        if name not in model_cls.__fields__:
+            raise ValueError(f"Unknown field for {model_cls.__name__}: {part}")
+        names.add(name)
+    if not names:
+        raise ValueError("No fields requested")
+    return tuple(sorted(names))
+
+
+def mongo_projection(model_cls: Type[BaseModel], names: tuple[str, ...]) -> dict[str, int]:
+    projection = {model_cls.__fields__[name].alias: 1 for name in names}
+    projection.setdefault("_id", 0)
+    return projection
+
+
+# Subclass of `model_cls` where every field outside `names` is optional, so a projected document
+# parses through the model's own parse_obj without touching the nested models it left out.
+@lru_cache(maxsize=256)
+def partial_model(model_cls: Type[BaseModel], names: tuple[str, ...]) -> Type[BaseModel]:
+    overrides: dict[str, Any] = {name: (Any, None) for name in model_cls.__fields__ if name not in names}
+    return create_model(f"Partial{model_cls.__name__}", __base__=model_cls, **overrides)
@@ -0,0 +1,10 @@
+import orjson
+
+from pydantic import BaseModel
+
+
+
+
+# Same JSON as JSONResponse(jsonable_encoder(model)) for our document models, without the jsonable_encoder walk.
+def dumps_model(model: BaseModel, include: set[str] | None = None) -> bytes:
+    return orjson.dumps(model.dict(by_alias=True, include=include), option=orjson.OPT_NON_STR_KEYS)
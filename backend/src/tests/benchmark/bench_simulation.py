@@ -0,0 +1,158 @@
+import copy
+import pytest
+import time
+
+from src.server.models.dataenums import ActionType, Actor, DamageSubType, EffectRecord, EffectResult, EffectType, QueueComponent, TickRecord
+from src.server.models.request import Action, Rank, SweepPoint, V1Request
+from src.server.simulation.character import Character
+from src.server.simulation.simulation import Simulation
+from src.server.simulation.sweep import _simulate_point, run_sweep
+
+
+# Benchmarks are not collected by the normal test run.
+# Run them explicitly: pytest src/tests/benchmark/bench_simulation.py -s
+
+ROUNDS = 60
+
+
+def _combo(*action_types: ActionType, repeat: int = 1) -> list[Action]:
+    return [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in action_types] * repeat
+
+
+def _measure(sim: Simulation, combo: list[Action]) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        run = copy.deepcopy(sim)
+        start = time.perf_counter()
+        run.do_combo(combo)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _legacy_take_effects(character: Character, component_list: list[QueueComponent], tick: int) -> tuple[list[QueueComponent], list[EffectRecord]]:
+    damages = [component for component in component_list if component.type_ == EffectType.DAMAGE]
+    heals = [component for component in component_list if component.type_ == EffectType.HEAL]
+    shields = [component for component in component_list if component.type_ == EffectType.SHIELD]
+    stati = [component for component in component_list if component.type_ == EffectType.STATUS]
+    character._apply_shields(shields, tick)
+    vamps, results = character._apply_damages(damages)
+    results.extend(character._apply_heals(heals))
+    character._apply_status_effects(stati, tick)
+    return vamps, results
+
+
+class LegacyBucketingSimulation(Simulation):
+    # The per-tick filtering _process_queue did before entries were partitioned in one pass, kept as the
+    # baseline for the bucketing benchmark. Results of follow-up rounds are appended like the current code.
+    def _process_queue(self) -> None:
+        evaluation_types = [EffectType.DAMAGE, EffectType.HEAL, EffectType.SHIELD]
+        while (due := self.queue.pop_due(self.tick)) is not None:
+            q_tick, queue_entries = due
+            evaluation_entries = [entry for entry in queue_entries if entry.type_ in evaluation_types]
+            evaluated_entries = [entry for entry in queue_entries if entry.type_ not in evaluation_types]
+            evaluation_blue = [entry for entry in evaluation_entries if entry.actor == Actor.BLUE]
+            evaluation_red = [entry for entry in evaluation_entries if entry.actor == Actor.RED]
+            evaluated_entries.extend(self.actors[Actor.BLUE].evaluate(evaluation_blue))
+            evaluated_entries.extend(self.actors[Actor.RED].evaluate(evaluation_red))
+
+            effect_results = []
+            while evaluated_entries:
+                blue_list = [entry for entry in evaluated_entries if entry.target == Actor.BLUE]
+                red_list = [entry for entry in evaluated_entries if entry.target == Actor.RED]
+                evaluated_entries, results = _legacy_take_effects(self.actors[Actor.BLUE], blue_list, q_tick)
+                evaluated_entries_b, results_b = _legacy_take_effects(self.actors[Actor.RED], red_list, q_tick)
+                evaluated_entries.extend(evaluated_entries_b)
+                effect_results.extend(results)
+                effect_results.extend(results_b)
+            self.effect_list.append(TickRecord(tick=q_tick, result=effect_results))
+
+
+def test_bench_dot_heavy_combo(dot_sim):
+    combo = _combo(ActionType.W, ActionType.E, ActionType.AA, ActionType.AA, repeat=50)
+    legacy_sim = copy.deepcopy(dot_sim)
+    legacy_sim.__class__ = LegacyBucketingSimulation
+    assert copy.deepcopy(legacy_sim).do_combo(combo) == copy.deepcopy(dot_sim).do_combo(combo)
+    legacy = _measure(legacy_sim, combo)
+    best = _measure(dot_sim, combo)
+    print(f"\ndot heavy combo ({len(combo)} actions): per-type filtering {legacy * 1000:.2f} ms, single-pass buckets {best * 1000:.2f} ms")
+
+
+# Build and sweep searches call do_combo once per candidate without serializing, so the simulation time alone is what they pay.
+@pytest.mark.parametrize("repeat", [1, 2, 4, 10, 40])
+def test_bench_pure_damage_fast_path(sim, repeat):
+    combo = _combo(ActionType.Q, ActionType.AA, ActionType.AA, repeat=repeat)
+    timings = {}
+    for fast_path in (False, True):
+        runs = []
+        for _ in range(ROUNDS * 8):
+            run = copy.deepcopy(sim)
+            start = time.perf_counter()
+            run.do_combo(combo, fast_path=fast_path)
+            runs.append(time.perf_counter() - start)
+        timings[fast_path] = min(runs)
+    print(f"\npure damage combo ({len(combo)} actions): event engine {timings[False] * 1000:.3f} ms, fast path {timings[True] * 1000:.3f} ms")
+
+
+def test_bench_summary_mode(dot_sim):
+    combo = _combo(ActionType.W, ActionType.E, ActionType.AA, ActionType.AA, repeat=50)
+    timings = {}
+    for summary in (False, True):
+        runs = []
+        for _ in range(ROUNDS):
+            run = copy.deepcopy(dot_sim)
+            run = Simulation(run.actors[Actor.BLUE], run.actors[Actor.RED], summary=summary)
+            start = time.perf_counter()
+            body = run.do_combo(combo).json()
+            runs.append(time.perf_counter() - start)
+        timings[summary] = (min(runs), len(body))
+    print(f"\nsimulate + encode ({len(combo)} actions): effect_list {timings[False][0] * 1000:.2f} ms / {timings[False][1]} bytes,"
+          f" summary {timings[True][0] * 1000:.2f} ms / {timings[True][1]} bytes")
+
+
+def test_bench_per_hit_cost(aatrox_with_items):
+    blue, red = aatrox_with_items, copy.deepcopy(aatrox_with_items)
+    props = blue.champion.q.effects[0].effect_components[0].props
+    components = [QueueComponent(source=ActionType.Q, actor=Actor.BLUE, target=Actor.RED, type_=EffectType.DAMAGE, props=props)] * 1000
+    fields = dict(source=ActionType.Q, actor=Actor.BLUE, target=Actor.RED, type_=EffectType.DAMAGE, value=61.2, raw=80.0, mitigated=18.8, damage_sub_type=DamageSubType.PHYSIC)
+    timings = {"evaluate + apply": [], "EffectResult": [], "EffectRecord": []}
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        red.take_effects(blue.evaluate(components), 0)
+        timings["evaluate + apply"].append(time.perf_counter() - start)
+        for name, record in (("EffectResult", EffectResult), ("EffectRecord", EffectRecord)):
+            start = time.perf_counter()
+            for _ in components:
+                record(**fields)
+            timings[name].append(time.perf_counter() - start)
+    print("\nper hit: " + ", ".join(f"{name} {min(runs) / len(components) * 1e6:.2f} us" for name, runs in timings.items()))
+
+
+def test_bench_fork_vs_replay(dot_sim):
+    prefix = _combo(ActionType.W, ActionType.E, ActionType.AA, ActionType.AA, repeat=10)
+    extra = _combo(ActionType.AA)
+    replay = _measure(dot_sim, prefix + extra)
+    base = dot_sim.fork()
+    base.do_combo(prefix)
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        base.fork().do_combo(extra)
+        timings.append(time.perf_counter() - start)
+    print(f"\nreplay {len(prefix) + 1} actions: {replay * 1000:.2f} ms, fork + 1 action: {min(timings) * 1000:.3f} ms")
+
+
+def test_bench_sweep_vs_per_point(aatrox_dot):
+    aatrox_dot.passive.effects = []
+    rank = Rank(q=3, w=1, e=1, r=0)
+    base = V1Request(id_attacker="aatrox", lvl_attacker=9, ability_points_attacker=rank, items_attacker=[], id_defender="aatrox",
+                     lvl_defender=9, ability_points_defender=rank, items_defender=[], combo=_combo(ActionType.Q, ActionType.AA, repeat=10))
+    points = [SweepPoint(lvl_attacker=level, ability_points_attacker=Rank(q=q, w=1, e=1, r=0)) for level in range(1, 19) for q in range(1, 6)]
+    champions = {"aatrox": aatrox_dot}
+    start = time.perf_counter()
+    for index, point in enumerate(points):
+        _simulate_point(index, base, point, champions, {})
+    per_point = time.perf_counter() - start
+    start = time.perf_counter()
+    outcome = run_sweep(base, points, champions, {})
+    sweep = time.perf_counter() - start
+    print(f"\n{len(points)} points: per point {per_point * 1000:.1f} ms, sweep {sweep * 1000:.1f} ms ({outcome.timelines} timelines)")
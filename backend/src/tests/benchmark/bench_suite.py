@@ -0,0 +1,132 @@
+import copy
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import pytest
+
+from src.server.models.dataenums import ActionType, Actor, DamageProperties, DamageSubType, DamageType, EffectType, HealProperties, ShieldProperties, Stat
+from src.server.models.effect import Effect, EffectComponent
+from src.server.models.request import Action, Rank
+from src.server.simulation.character import Character
+from src.server.simulation.simulation import Simulation
+
+
+# Fixed scenarios for comparing commits. Not collected by the normal test run:
+#   BENCH_OUTPUT=bench.json pytest src/tests/benchmark/bench_suite.py -s
+#   python -m src.tests.benchmark.compare base.json bench.json
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "30"))
+SCENARIOS = ["short_burst", "aa_fight_60s", "dot_heavy", "sustain_heavy", "six_item_build"]
+
+
+def _combo(*action_types: ActionType, repeat: int = 1) -> list[Action]:
+    return [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in action_types] * repeat
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@pytest.fixture(scope="module")
+def bench_results():
+    results: dict[str, dict] = {}
+    yield results
+    output = os.getenv("BENCH_OUTPUT")
+    if output:
+        report = {
+            "commit": _commit(),
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "rounds": ROUNDS,
+            "scenarios": results
+        }
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+@pytest.fixture
+def short_burst(sim) -> tuple[Simulation, list[Action]]:
+    return sim, _combo(ActionType.Q, ActionType.AA, ActionType.AA, ActionType.Q)
+
+
+@pytest.fixture
+def aa_fight_60s(sim) -> tuple[Simulation, list[Action]]:
+    attacks = math.ceil(60 * sim.actors[Actor.BLUE]._get_stat(Stat.ATTACKSPEED_P))
+    return sim, _combo(ActionType.AA, repeat=attacks)
+
+
+@pytest.fixture
+def dot_heavy(dot_sim) -> tuple[Simulation, list[Action]]:
+    return dot_sim, _combo(ActionType.W, ActionType.E, ActionType.AA, ActionType.AA, repeat=25)
+
+
+@pytest.fixture
+def sustain_heavy(aatrox_dot) -> tuple[Simulation, list[Action]]:
+    aatrox_dot.q.effects[0].effect_components[0].props.vamp = 0.25
+    aatrox_dot.w.effects = [Effect(
+        text="Shield and heal.",
+        effect_components=[
+            EffectComponent(type_=EffectType.SHIELD, props=ShieldProperties(scaling="40 + 0.2 * ad", duration=2)),
+            EffectComponent(type_=EffectType.HEAL, props=HealProperties(scaling="30 + 0.1 * ad")),
+            EffectComponent(type_=EffectType.DAMAGE, props=DamageProperties(scaling="20 + 0.3 * ad", dmg_type=DamageType.DEFAULT, dmg_sub_type=DamageSubType.MAGIC))
+        ]
+    )]
+    rank = Rank(q=3, w=1, e=1, r=0)
+    sim = Simulation(Character(aatrox_dot, 9, rank, []), Character(copy.deepcopy(aatrox_dot), 9, rank, []))
+    return sim, _combo(ActionType.W, ActionType.Q, ActionType.AA, ActionType.AA, repeat=25)
+
+
+@pytest.fixture
+def six_item_build(aatrox_with_items, make_item) -> tuple[Simulation, list[Action]]:
+    items = [make_item(1, {"attack damage": 60}, 3000), make_item(2, {"attack damage": 40, "lethality": 12}, 3100),
+             make_item(3, {"attack damage": 30, "attack speed percent": 0.3}, 2800), make_item(4, {"ability haste": 20, "health": 400}, 3200)]
+    blue = aatrox_with_items
+    blue.items = blue.items + items
+    blue.bonus_stats = blue._sum_item_stats()
+    blue._invalidate_stats()
+    return Simulation(blue, copy.deepcopy(blue)), _combo(ActionType.Q, ActionType.AA, ActionType.AA, ActionType.Q, repeat=10)
+
+
+def _measure(sim: Simulation, combo: list[Action]) -> dict:
+    timings = []
+    for _ in range(ROUNDS):
+        run = copy.deepcopy(sim)
+        start = time.perf_counter()
+        response = run.do_combo(combo)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    events = max(len(response.effect_list), 1)
+
+    run = copy.deepcopy(sim)
+    tracemalloc.start()
+    run.do_combo(combo)
+    _, peak = tracemalloc.get_traced_memory()
+    retained = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return {
+        "actions": len(combo),
+        "events": len(response.effect_list),
+        "ticks": response.ticks,
+        "best_ms": best * 1000,
+        "median_ms": sorted(timings)[len(timings) // 2] * 1000,
+        "ops_per_sec": 1 / best,
+        "us_per_event": best / events * 1e6,
+        "alloc_peak_kib": peak / 1024,
+        "alloc_retained_blocks": retained
+    }
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_bench_scenario(request, bench_results, scenario):
+    sim, combo = request.getfixturevalue(scenario)
+    result = bench_results[scenario] = _measure(sim, combo)
+    print(f"\n{scenario:>15}: {result['ops_per_sec']:9.1f} ops/s  {result['us_per_event']:7.1f} us/event"
+          f"  peak {result['alloc_peak_kib']:7.1f} KiB  {result['alloc_retained_blocks']:6d} blocks")
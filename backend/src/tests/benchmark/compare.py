@@ -0,0 +1,46 @@
+import argparse
+import json
+import sys
+
+
+
+
+METRICS = (("best_ms", "ms"), ("us_per_event", "us/event"), ("alloc_peak_kib", "KiB peak"))
+
+
+def compare(base: dict, head: dict, threshold: float) -> list[str]:
+    regressions = []
+    print(f"base {base.get('commit')} -> head {head.get('commit')}")
+    for scenario, result in head["scenarios"].items():
+        previous = base["scenarios"].get(scenario)
+        if previous is None:
+            print(f"{scenario:>15}: new")
+            continue
+        columns = []
+        for metric, unit in METRICS:
+            ratio = result[metric] / previous[metric] if previous[metric] else 1.0
+            columns.append(f"{previous[metric]:9.2f} -> {result[metric]:9.2f} {unit} ({ratio:5.2f}x)")
+            if metric == "best_ms" and ratio > 1 + threshold:
+                regressions.append(scenario)
+        print(f"{scenario:>15}: " + "  ".join(columns))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare two bench_suite JSON reports.")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown of best_ms before failing")
+    args = parser.parse_args()
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+    regressions = compare(base, head, args.threshold)
+    if regressions:
+        print(f"regressed: {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from src.server.utils.cache import TTLCache
+
+
+
+
+class FakeTimer():
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+
+class TestTTLCache():
+
+    def test_get_counts_hits_and_misses(self):
+        cache = TTLCache(maxsize=4, ttl=10)
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+
+    def test_entries_expire(self):
+        timer = FakeTimer()
+        cache = TTLCache(maxsize=4, ttl=10, timer=timer)
+        cache.set("a", 1)
+        timer.now = 9.9
+        assert cache.get("a") == 1
+        timer.now = 10
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+    def test_invalidate_tag(self):
+        cache = TTLCache(maxsize=4, ttl=10)
+        cache.set("a", 1, tags=["champion", "item"])
+        cache.set("b", 2, tags=["item"])
+        cache.set("c", 3)
+        cache.invalidate_tag("champion")
+        assert "a" not in cache
+        assert "b" in cache
+        cache.invalidate_tag("item")
+        assert len(cache) == 1
+        assert cache._tags == {}
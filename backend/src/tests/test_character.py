@@ -1,8 +1,13 @@
 import pytest
 from collections import defaultdict
 
-from src.server.models.dataenums import Stat, ActionType, Actor, DamageSubType, DamageType, HpScaling, StatusType
+from src.server.models.dataenums import (
+    Stat, ActionType, Actor, DamageSubType, DamageType, EffectType, HpScaling, StatusType,
+    ProcessedStatusProperties, QueueComponent, Buff
+)
+from src.server.models.passive_effect import StatProperties
 from src.server.models.request import Action
+from src.server.simulation.formula import compile_formula
 
 
 
@@ -17,6 +22,19 @@ class TestCharacter():
         result = aatrox_with_items._get_base_stat(stat)
         assert round(result, 3) == output
 
+    @pytest.mark.parametrize("lvl", [1, 5, 18, 20])
+    def test_base_stat_table(self, aatrox_with_items, lvl):
+        champion = aatrox_with_items.champion
+        aatrox_with_items.level = lvl
+        aatrox_with_items._set_base_stat_table()
+        growth = (lvl - 1) * (0.7025 + 0.0175 * (lvl - 1))
+        assert round(aatrox_with_items._get_base_stat(Stat.AD), 6) == round(champion.ad + champion.ad_per_lvl * growth, 6)
+        assert round(aatrox_with_items._get_base_stat(Stat.HP), 6) == round(champion.hp + champion.hp_per_lvl * growth, 6)
+        assert aatrox_with_items._get_base_stat(Stat.AP) == 0
+
+    def test_base_stat_table_shared(self, aatrox_with_items):
+        assert aatrox_with_items.champion.base_stat_table() is aatrox_with_items.base_stat_table
+
     @pytest.mark.parametrize("stat, output", [
         (Stat.AD, 45),
         (Stat.ARMOR, 65)
@@ -104,6 +122,100 @@ class TestCharacter():
         assert round(result, 3) == output
 
 
+    def test_evaluate_formula_resolves_lazily(self, aatrox_with_items, mocker):
+        spy = mocker.spy(aatrox_with_items, "_get_stat")
+        aatrox_with_items._evaluate_formula("20")
+        assert spy.call_count == 0
+        aatrox_with_items._evaluate_formula("400 + 0.3 * ad")
+        assert spy.call_args_list == [mocker.call(Stat.AD)]
+
+
+    @pytest.mark.parametrize("formula, variables", [
+        ("20", {}),
+        ("400 + 0.3 * ad", {}),
+        ("0.1 * hp + 2 * passive + level", {}),
+        ("-5 + rank * 15 + (0.525 + rank * 0.075) * ad", {"rank": 3}),
+        ("ad if rank > 2 else armor", {"rank": 1}),
+    ])
+    def test_evaluate_formula_matches_eager(self, aatrox_with_items, formula, variables):
+        # The eager namespace the lazy mapping replaced: every referenced stat, stack and level computed up front.
+        compiled = compile_formula(formula)
+        eager = {name: aatrox_with_items._get_variable(name) for name in compiled.names if name not in variables} | variables
+        assert aatrox_with_items._evaluate_formula(formula, variables) == eval(compiled.code, {}, eager)
+
+
+    def test_buff_applies_only_to_declared_stat(self, aatrox_with_items):
+        unbuffed = {stat: aatrox_with_items._get_stat(stat) for stat in Stat if stat != Stat.AD}
+        aatrox_with_items.add_stacks(ActionType.PASSIVE, 2)
+        assert {stat: aatrox_with_items._get_stat(stat) for stat in unbuffed} == unbuffed
+
+
+    def test_buff_reapplied_after_invalidation(self, aatrox_with_items):
+        aatrox_with_items.add_stacks(ActionType.PASSIVE, 2)
+        for _ in range(3):
+            assert round(aatrox_with_items._get_stat(Stat.AD), 3) == 124.45
+            aatrox_with_items._invalidate_stats()
+        assert aatrox_with_items.evaluating_stat == set()
+
+
+    def test_evaluating_stat_reset_on_error(self, aatrox_with_items, mocker):
+        mocker.patch.object(aatrox_with_items, "_evaluate_formula", side_effect=ZeroDivisionError)
+        with pytest.raises(ZeroDivisionError):
+            aatrox_with_items._get_stat(Stat.AD)
+        assert aatrox_with_items.evaluating_stat == set()
+
+
+    @pytest.mark.parametrize("stat, stacks, output", [
+        (Stat.AD, 0, 120.45),
+        (Stat.AD, 2, 124.45),
+        (Stat.ARMOR, 2, 117.832),
+    ])
+    def test_get_stat_with_buff(self, aatrox_with_items, stat, stacks, output):
+        aatrox_with_items.add_stacks(ActionType.PASSIVE, stacks)
+        result = aatrox_with_items._get_stat(stat)
+        assert round(result, 3) == output
+
+
+    def test_stat_cache_invalidated_by_stacks(self, aatrox_with_items):
+        assert round(aatrox_with_items._get_stat(Stat.AD), 3) == 120.45
+        assert Stat.AD in aatrox_with_items.stat_cache
+        aatrox_with_items.add_stacks(ActionType.PASSIVE, 1)
+        assert round(aatrox_with_items._get_stat(Stat.AD), 3) == 122.45
+
+
+    def test_stat_cache_invalidated_by_status(self, aatrox_with_items):
+        slow = QueueComponent(
+            source=ActionType.W,
+            actor=Actor.BLUE,
+            target=Actor.RED,
+            type_=EffectType.STATUS,
+            props=ProcessedStatusProperties(type_=StatusType.SLOW, duration=30, strength=0.3)
+        )
+        movespeed = aatrox_with_items._get_stat(Stat.MOVESPEED)
+        aatrox_with_items._apply_status_effects([slow], 0)
+        assert aatrox_with_items._get_stat(Stat.MOVESPEED) == movespeed * 0.7
+        aatrox_with_items._remove_expired_status_effects(60)
+        assert aatrox_with_items._get_stat(Stat.MOVESPEED) == movespeed
+
+
+    def test_stat_cache_invalidated_by_level(self, aatrox_with_items):
+        ad, base_ad = aatrox_with_items._get_stat(Stat.AD), aatrox_with_items._get_base_stat(Stat.AD)
+        aatrox_with_items.set_level(aatrox_with_items.level + 1)
+        assert aatrox_with_items._get_base_stat(Stat.AD) > base_ad
+        assert aatrox_with_items._get_stat(Stat.AD) == pytest.approx(ad - base_ad + aatrox_with_items._get_base_stat(Stat.AD))
+
+
+    def test_stat_cache_invalidated_by_buffs(self, aatrox_with_items):
+        armor = aatrox_with_items._get_stat(Stat.ARMOR)
+        buff = StatProperties(stat=Stat.ARMOR, scaling="10")
+        fork = aatrox_with_items.fork()
+        aatrox_with_items.add_buff(Buff.STATS, buff)
+        assert aatrox_with_items._get_stat(Stat.ARMOR) == armor + 10
+        assert fork._get_stat(Stat.ARMOR) == armor
+        aatrox_with_items.remove_buff(Buff.STATS, buff)
+        assert aatrox_with_items._get_stat(Stat.ARMOR) == armor
+
+
     @pytest.mark.parametrize("value, dmg_calc, output", [
         (100, HpScaling.FLAT , 100),
         (0.1, HpScaling.MAX_HP , 130.226),
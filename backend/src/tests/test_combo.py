@@ -0,0 +1,63 @@
+import copy
+import itertools
+import pytest
+
+from src.server.models.dataenums import ActionType, Actor
+from src.server.models.request import Action, Rank
+from src.server.simulation.character import Character
+from src.server.simulation.combo import optimize_combo
+from src.server.simulation.exceptions import SimulationError
+from src.server.simulation.simulation import Simulation
+
+
+
+
+@pytest.fixture
+def combo_sim(aatrox_dot) -> Simulation:
+    ap = Rank(q=3, w=1, e=1, r=0)
+    return Simulation(Character(aatrox_dot, 9, ap, []), Character(copy.deepcopy(aatrox_dot), 9, ap, []))
+
+
+def _actions(*action_types: ActionType) -> list[Action]:
+    return [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in action_types]
+
+
+def _damage(sim: Simulation, combo: list[Action]) -> int | None:
+    try:
+        return copy.deepcopy(sim).do_combo(combo).damage
+    except SimulationError:
+        return None
+
+
+
+class TestComboOptimizer():
+
+    def test_result_matches_do_combo(self, combo_sim):
+        reference = copy.deepcopy(combo_sim)
+        result = optimize_combo(combo_sim, tick_budget=120, beam_width=8)
+        assert result.combo
+        assert result.response == reference.do_combo(result.combo)
+        assert combo_sim.tick == 0
+
+
+    def test_respects_tick_budget(self, combo_sim):
+        result = optimize_combo(combo_sim, tick_budget=60, beam_width=8)
+        sim = copy.deepcopy(combo_sim)
+        for action in result.combo:
+            assert sim.actors[Actor.BLUE].check_action_delay(action.action_type, sim.tick) <= 60
+            sim.step(action)
+
+
+    def test_finds_exhaustive_best(self, combo_sim):
+        action_types = [ActionType.AA, ActionType.Q, ActionType.W, ActionType.E]
+        result = optimize_combo(combo_sim, tick_budget=10_000, max_actions=3, beam_width=100, action_types=action_types)
+        best = max(
+            damage for length in range(1, 4) for sequence in itertools.product(action_types, repeat=length)
+            if (damage := _damage(combo_sim, _actions(*sequence))) is not None
+        )
+        assert result.response.damage == best
+
+
+    def test_skips_unlearned_abilities(self, combo_sim):
+        result = optimize_combo(combo_sim, tick_budget=300, beam_width=4, action_types=[ActionType.R, ActionType.AA])
+        assert {action.action_type for action in result.combo} == {ActionType.AA}
@@ -0,0 +1,143 @@
+import gzip
+import httpx
+import pytest
+import threading
+
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+from src.server.utils import compression
+from src.server.utils.compression import CompressionMiddleware, EncodedBody, accepted_encoding
+
+
+
+
+BODY = b'{"effect_list": [' + b'{"tick": 1, "value": 12.5},' * 200 + b'{}]}'
+
+
+@pytest.fixture
+async def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=512)
+
+    @app.get("/large")
+    async def large() -> Response:
+        return Response(content=BODY, media_type="application/json")
+
+    @app.get("/small")
+    async def small() -> Response:
+        return Response(content=b'{"damage": 1}', media_type="application/json")
+
+    @app.get("/encoded")
+    async def encoded() -> Response:
+        return Response(content=gzip.compress(BODY), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/stream")
+    async def stream() -> StreamingResponse:
+        return StreamingResponse(iter([BODY, BODY]), media_type="application/x-ndjson")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+
+class TestAcceptedEncoding():
+
+    @pytest.mark.parametrize("header, expected", [
+        (None, None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("deflate, gzip;q=0", None),
+        ("GZIP;q=0.5", "gzip"),
+        ("*", "gzip"),
+        ("gzip;q=0, *", None),
+        ("*;q=0, gzip", "gzip"),
+        ("br, *;q=0", None)
+    ])
+    def test_gzip(self, mocker, header, expected):
+        mocker.patch.object(compression, "brotli", None)
+        assert accepted_encoding(header) == expected
+
+
+    def test_prefers_brotli_when_available(self, mocker):
+        mocker.patch.object(compression, "brotli", mocker.Mock())
+        assert accepted_encoding("gzip, br") == "br"
+        assert accepted_encoding("gzip, br;q=0") == "gzip"
+        assert accepted_encoding("br;q=0, *") == "gzip"
+
+
+
+class TestEncodedBody():
+
+    @pytest.mark.asyncio
+    async def test_compressed_once(self, mocker):
+        body = EncodedBody(BODY)
+        spy = mocker.spy(compression, "compress")
+        first = await body.encode("gzip")
+        assert await body.encode("gzip") is first
+        assert gzip.decompress(first) == BODY
+        spy.assert_called_once_with(BODY, "gzip", precompress=True)
+
+
+    @pytest.mark.asyncio
+    async def test_compressed_off_the_event_loop(self, mocker):
+        threads = []
+        compress = compression.compress
+        mocker.patch.object(compression, "compress", side_effect=lambda *args, **kwargs: threads.append(threading.get_ident()) or compress(*args, **kwargs))
+        await EncodedBody(BODY).encode("gzip")
+        assert threads and threads[0] != threading.get_ident()
+
+
+    def test_small_bodies_stay_identity(self):
+        assert EncodedBody(b"{}").negotiate("gzip") is None
+        assert EncodedBody(BODY).negotiate("gzip") == "gzip"
+
+
+
+class TestCompressionMiddleware():
+
+    @pytest.mark.asyncio
+    async def test_compresses_large_responses(self, client):
+        response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert int(response.headers["content-length"]) < len(BODY)
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.content == BODY
+
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("offload_size, offloaded", [(len(BODY), True), (len(BODY) + 1, False)])
+    async def test_large_bodies_compressed_off_the_event_loop(self, mocker, offload_size, offloaded):
+        threads = []
+        compress = compression.compress
+        mocker.patch.object(compression, "compress", side_effect=lambda *args, **kwargs: threads.append(threading.get_ident()) or compress(*args, **kwargs))
+        app = FastAPI()
+        app.add_middleware(CompressionMiddleware, minimum_size=512, offload_size=offload_size)
+
+        @app.get("/large")
+        async def large() -> Response:
+            return Response(content=BODY, media_type="application/json")
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.content == BODY
+        assert (threads[0] != threading.get_ident()) == offloaded
+
+
+    @pytest.mark.asyncio
+    async def test_skips_small_and_unaccepted(self, client):
+        assert "content-encoding" not in (await client.get("/small", headers={"Accept-Encoding": "gzip"})).headers
+        assert "content-encoding" not in (await client.get("/large", headers={"Accept-Encoding": "identity"})).headers
+
+
+    @pytest.mark.asyncio
+    async def test_does_not_recompress(self, client):
+        response = await client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+        assert response.content == BODY
+
+
+    @pytest.mark.asyncio
+    async def test_streams_pass_through(self, client):
+        response = await client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.content == BODY * 2
@@ -0,0 +1,217 @@
+import copy
+import json
+import pytest
+
+from fastapi.encoders import jsonable_encoder
+from src.server import database
+from src.server.database import (document_cache, document_json_cache, fetch_champion_by_id, fetch_champion_json_by_id, fetch_champion_projection_by_id,
+                                 fetch_champions_by_ids, stat_table_cache, update_champion)
+from src.server.models.champion import BaseStatTable, Champion
+from src.server.models.request import Rank
+from src.server.simulation.character import Character
+from src.server.utils.projection import parse_fields
+
+
+
+
+class AsyncCursor():
+    def __init__(self, documents: list[dict]) -> None:
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+
+@pytest.fixture
+def aatrox_document() -> dict:
+    with open("src/tests/static/json/aatrox.json", encoding='UTF-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def mock_champion_collection(mocker, aatrox_document):
+    document_cache.clear()
+    document_json_cache.clear()
+    stat_table_cache.clear()
+    collection = mocker.patch.object(database, "champion_collection")
+    collection.find_one = mocker.AsyncMock(return_value=aatrox_document)
+    collection.update_one = mocker.AsyncMock()
+    collection.find = mocker.Mock(side_effect=lambda query: AsyncCursor([aatrox_document]))
+    yield collection
+    document_cache.clear()
+    document_json_cache.clear()
+    stat_table_cache.clear()
+
+
+
+class TestDocumentCache():
+
+    @pytest.mark.asyncio
+    async def test_fetch_by_id_is_cached(self, mock_champion_collection, aatrox_document):
+        first = await fetch_champion_by_id(aatrox_document["_id"])
+        second = await fetch_champion_by_id(aatrox_document["_id"])
+        assert first == second
+        assert mock_champion_collection.find_one.await_count == 1
+        assert document_cache.hits == 1
+
+
+    @pytest.mark.asyncio
+    async def test_hits_are_private_copies(self, mock_champion_collection, aatrox_document):
+        first = await fetch_champion_by_id(aatrox_document["_id"])
+        first.q.effects[0].effect_components[0].duration = 99
+        first.passive.effects.clear()
+        second = await fetch_champion_by_id(aatrox_document["_id"])
+        third = await fetch_champion_by_id(aatrox_document["_id"])
+        assert second is not third
+        assert second.q.effects[0].effect_components[0].duration != 99
+        assert second.passive.effects
+        assert mock_champion_collection.find_one.await_count == 1
+
+
+    @pytest.mark.asyncio
+    async def test_copies_share_one_stat_table(self, mocker, mock_champion_collection, aatrox_document):
+        build = mocker.spy(BaseStatTable, "build")
+        rank = Rank(q=1, w=1, e=1, r=0)
+        copies = [await fetch_champion_by_id(aatrox_document["_id"]) for _ in range(3)]
+        copies += await fetch_champions_by_ids([aatrox_document["_id"]])
+        characters = [Character(champion, 9, rank, []) for champion in copies]
+        assert all(character.base_stat_table is characters[0].base_stat_table for character in characters)
+        assert build.call_count == 1
+        await database.bump_data_version()
+        assert (await fetch_champion_by_id(aatrox_document["_id"])).base_stat_table() is not characters[0].base_stat_table
+        assert build.call_count == 2
+
+
+    @pytest.mark.asyncio
+    async def test_write_from_another_process_invalidates(self, mock_champion_collection, aatrox_document, version_collection):
+        await fetch_champion_by_id(aatrox_document["_id"])
+        # Another process bumps the shared version; this one picks it up once its DATA_VERSION_TTL has passed.
+        await version_collection.find_one_and_update({"_id": database.DATA_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True)
+        await fetch_champion_by_id(aatrox_document["_id"])
+        assert mock_champion_collection.find_one.await_count == 1
+        database.data_version_cache.clear()
+        await fetch_champion_by_id(aatrox_document["_id"])
+        assert mock_champion_collection.find_one.await_count == 2
+
+
+    @pytest.mark.asyncio
+    async def test_missing_document_not_cached(self, mock_champion_collection, aatrox_document):
+        mock_champion_collection.find_one.return_value = None
+        assert await fetch_champion_by_id(aatrox_document["_id"]) is None
+        assert len(document_cache) == 0
+
+
+    @pytest.mark.asyncio
+    async def test_update_invalidates(self, mock_champion_collection, aatrox_document):
+        champion = await fetch_champion_by_id(aatrox_document["_id"])
+        await update_champion(champion)
+        assert await fetch_champion_by_id(aatrox_document["_id"]) is not champion
+        assert mock_champion_collection.find_one.await_count == 2
+
+
+    @pytest.mark.asyncio
+    async def test_update_bumps_data_version(self, mock_champion_collection, aatrox_document, version_collection):
+        champion = await fetch_champion_by_id(aatrox_document["_id"])
+        version = await database.fetch_data_version()
+        await update_champion(champion)
+        assert version_collection.documents[database.DATA_VERSION_ID]["version"] == version + 1
+        assert await database.fetch_data_version() == version + 1
+
+
+    @pytest.mark.asyncio
+    async def test_fetch_by_ids_preserves_order_and_duplicates(self, mock_champion_collection, aatrox_document):
+        unknown = "0" * 24
+        champions = await fetch_champions_by_ids([aatrox_document["_id"], unknown, aatrox_document["_id"]])
+        assert champions[0] is champions[2]
+        assert champions[1] is None
+        query = mock_champion_collection.find.call_args.args[0]
+        assert len(query["_id"]["$in"]) == 2
+
+
+    @pytest.mark.asyncio
+    async def test_fetch_by_ids_uses_cache(self, mock_champion_collection, aatrox_document):
+        cached = await fetch_champion_by_id(aatrox_document["_id"])
+        assert await fetch_champions_by_ids([aatrox_document["_id"]]) == [cached]
+        mock_champion_collection.find.assert_not_called()
+
+
+
+class TestDocumentJsonCache():
+
+    @pytest.mark.asyncio
+    async def test_matches_jsonable_encoder(self, mock_champion_collection, aatrox_document):
+        body = await fetch_champion_json_by_id(aatrox_document["_id"])
+        champion = await fetch_champion_by_id(aatrox_document["_id"])
+        assert json.loads(body.identity) == jsonable_encoder(champion)
+
+
+    @pytest.mark.asyncio
+    async def test_hit_skips_parse(self, mocker, mock_champion_collection, aatrox_document):
+        first = await fetch_champion_json_by_id(aatrox_document["_id"])
+        document_cache.clear()
+        parse = mocker.patch.object(database.Champion, "parse_obj")
+        assert await fetch_champion_json_by_id(aatrox_document["_id"]) is first
+        parse.assert_not_called()
+        assert mock_champion_collection.find_one.await_count == 1
+
+
+    @pytest.mark.asyncio
+    async def test_update_invalidates(self, mock_champion_collection, aatrox_document):
+        first = await fetch_champion_json_by_id(aatrox_document["_id"])
+        await update_champion(await fetch_champion_by_id(aatrox_document["_id"]))
+        assert await fetch_champion_json_by_id(aatrox_document["_id"]) is not first
+        assert mock_champion_collection.find_one.await_count == 2
+
+
+    @pytest.mark.asyncio
+    async def test_write_from_another_process_invalidates(self, mock_champion_collection, aatrox_document, version_collection):
+        first = await fetch_champion_json_by_id(aatrox_document["_id"])
+        await version_collection.find_one_and_update({"_id": database.DATA_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True)
+        mock_champion_collection.find_one.return_value = aatrox_document | {"name": "Renamed"}
+        assert await fetch_champion_json_by_id(aatrox_document["_id"]) is first
+        database.data_version_cache.clear()
+        body = await fetch_champion_json_by_id(aatrox_document["_id"])
+        assert json.loads(body.identity)["name"] == "Renamed"
+        assert mock_champion_collection.find_one.await_count == 2
+
+
+
+def project(document: dict, projection: dict[str, int]) -> dict:
+    fields = {key for key, value in projection.items() if value}
+    return {key: value for key, value in document.items() if key in fields}
+
+
+
+class TestDocumentProjection():
+
+    def test_parse_fields(self):
+        assert parse_fields(Champion, "hp, ad,_id,hp") == ("ad", "hp", "id")
+        with pytest.raises(ValueError):
+            parse_fields(Champion, "hp,q.name")
+        with pytest.raises(ValueError):
+            parse_fields(Champion, " , ")
+
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("fields", ["hp,ad,attackspeed", "_id,name,q", "passive,changes,image,hotfix"])
+    async def test_matches_full_document(self, mock_champion_collection, aatrox_document, fields):
+        mock_champion_collection.find_one.side_effect = lambda query, projection=None: project(copy.deepcopy(aatrox_document), projection)
+        names = parse_fields(Champion, fields)
+        body = await fetch_champion_projection_by_id(aatrox_document["_id"], names)
+        projection = mock_champion_collection.find_one.call_args.args[1]
+        assert set(projection) - {"_id"} == set(names) - {"id"}
+        full = jsonable_encoder(Champion.parse_obj(copy.deepcopy(aatrox_document)))
+        assert json.loads(body) == {key: value for key, value in full.items() if key in fields.split(",")}
+
+
+    @pytest.mark.asyncio
+    async def test_uses_cached_document(self, mock_champion_collection, aatrox_document):
+        await fetch_champion_by_id(aatrox_document["_id"])
+        body = await fetch_champion_projection_by_id(aatrox_document["_id"], ("ad", "hp"))
+        assert set(json.loads(body)) == {"ad", "hp"}
+        assert mock_champion_collection.find_one.await_count == 1
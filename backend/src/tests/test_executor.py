@@ -0,0 +1,122 @@
+import pickle
+import pytest
+
+from operator import attrgetter
+
+from src.server.models.dataenums import ActionType, Actor
+from src.server.models.request import Action, Rank, V1Request
+from src.server.simulation.exceptions import SimulationError
+from src.server.simulation import executor as executor_module
+from src.server.simulation.executor import DocumentJob, MissingDocuments, SimulationExecutor, clear_worker_documents, document_keys, dumps_call, run_job, run_simulation
+
+
+
+
+@pytest.fixture
+def long_request() -> V1Request:
+    return V1Request(
+        id_attacker="aatrox",
+        lvl_attacker=9,
+        ability_points_attacker=Rank(q=3, w=1, e=1, r=0),
+        items_attacker=[],
+        id_defender="aatrox",
+        lvl_defender=9,
+        ability_points_defender=Rank(q=3, w=1, e=1, r=0),
+        items_defender=[],
+        combo=[Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in (ActionType.W, ActionType.E, ActionType.AA)] * 4
+    )
+
+
+@pytest.fixture
+def worker_documents():
+    clear_worker_documents()
+    yield
+    clear_worker_documents()
+
+
+
+class TestSimulationExecutor():
+
+    def test_run_job_requests_missing_documents(self, worker_documents, long_request, aatrox_dot):
+        documents = document_keys(3, {"aatrox": aatrox_dot})
+        assert list(documents) == [("Champion", "aatrox", 3)]
+        job = DocumentJob(call=dumps_call(run_simulation, (long_request, {"aatrox": aatrox_dot}, {}), documents))
+        assert len(job.call) < len(pickle.dumps(aatrox_dot))
+        assert run_job(job) == MissingDocuments(frozenset(documents))
+        job.payloads = {key: pickle.dumps(document) for key, document in documents.items()}
+        assert run_job(job) == run_simulation(long_request, {"aatrox": aatrox_dot}, {})
+        job.payloads = {}
+        assert run_job(job) == run_simulation(long_request, {"aatrox": aatrox_dot}, {})
+
+
+    def test_new_data_version_misses_worker_cache(self, worker_documents, aatrox_dot):
+        job = DocumentJob(call=dumps_call(attrgetter("name"), (aatrox_dot,), document_keys(1, {"aatrox": aatrox_dot})),
+                          payloads={("Champion", "aatrox", 1): pickle.dumps(aatrox_dot)})
+        assert run_job(job) == aatrox_dot.name
+        job = DocumentJob(call=dumps_call(attrgetter("name"), (aatrox_dot,), document_keys(2, {"aatrox": aatrox_dot})))
+        assert run_job(job) == MissingDocuments(frozenset({("Champion", "aatrox", 2)}))
+
+
+    def test_is_inline(self, long_request):
+        assert SimulationExecutor(mode="process", inline_max_actions=len(long_request.combo)).is_inline(long_request)
+        assert not SimulationExecutor(mode="process", inline_max_actions=4).is_inline(long_request)
+        assert SimulationExecutor(mode="inline", inline_max_actions=0).is_inline(long_request)
+        short = long_request.copy(update={"combo": long_request.combo[:3]})
+        assert SimulationExecutor(mode="process", inline_max_actions=8).is_inline(short, short)
+        assert not SimulationExecutor(mode="process", inline_max_actions=8).is_inline(short, short, short)
+
+
+    @pytest.mark.asyncio
+    async def test_batch_of_short_combos_is_offloaded(self, mocker, long_request, aatrox_dot):
+        short = long_request.copy(update={"combo": long_request.combo[:3]})
+        failing = short.copy(update={"id_attacker": "unknown"})
+        executor = SimulationExecutor(mode="thread", workers=2, inline_max_actions=8)
+        offload = mocker.spy(executor, "_offload")
+        try:
+            results = await executor.run_many([short, short, failing], {"aatrox": aatrox_dot}, {})
+        finally:
+            executor.shutdown()
+        assert offload.call_count == 3
+        assert results[:2] == [run_simulation(short, {"aatrox": aatrox_dot}, {})] * 2
+        assert isinstance(results[2], KeyError)
+        inline = await executor.run_many([short, failing], {"aatrox": aatrox_dot}, {})
+        assert offload.call_count == 3
+        assert inline[0] == results[0] and isinstance(inline[1], KeyError)
+
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", ["thread", "process"])
+    async def test_offloaded_matches_inline(self, mode, long_request, aatrox_dot):
+        executor = SimulationExecutor(mode=mode, workers=1, inline_max_actions=0)
+        try:
+            first = await executor.run(long_request, {"aatrox": aatrox_dot}, {})
+            second = await executor.run(long_request, {"aatrox": aatrox_dot}, {})
+        finally:
+            executor.shutdown()
+        expected = run_simulation(long_request, {"aatrox": aatrox_dot}, {})
+        assert first == expected
+        assert second == expected
+
+
+    @pytest.mark.asyncio
+    async def test_documents_pickled_only_on_worker_miss(self, mocker, long_request, aatrox_dot):
+        executor = SimulationExecutor(mode="process", workers=1, inline_max_actions=0)
+        dumps = mocker.spy(executor_module.pickle, "dumps")
+        documents = document_keys(0, {"aatrox": aatrox_dot})
+        try:
+            assert await executor.run_all(attrgetter("name"), [aatrox_dot], documents) == [aatrox_dot.name]
+            assert dumps.call_count == 1
+            assert await executor.run_all(attrgetter("name"), [aatrox_dot, aatrox_dot], documents) == [aatrox_dot.name] * 2
+            await executor.run(long_request, {"aatrox": aatrox_dot}, {}, version=0)
+            assert dumps.call_count == 1
+            await executor.run(long_request, {"aatrox": aatrox_dot}, {}, version=1)
+            assert dumps.call_count == 2
+        finally:
+            executor.shutdown()
+
+
+    def test_simulation_error_pickles(self):
+        error = SimulationError("boom", action_index=2, action_type=ActionType.Q, actor=Actor.BLUE, phase="cast")
+        restored = pickle.loads(pickle.dumps(error))
+        assert restored.message == "boom"
+        assert str(restored) == str(error)
@@ -0,0 +1,39 @@
+import pytest
+
+from src.server.simulation.formula import compile_formula
+
+
+
+
+class TestFormula():
+
+    @pytest.mark.parametrize("formula, names, constant", [
+        ("20", frozenset(), 20),
+        ("0.25", frozenset(), 0.25),
+        ("400 + 0.3 * ad", frozenset({"ad"}), None),
+        ("-5 + rank * 15 + (0.525 + rank * 0.075) * ad", frozenset({"rank", "ad"}), None),
+        ("2 * passive", frozenset({"passive"}), None),
+    ])
+    def test_compile_formula(self, formula, names, constant):
+        result = compile_formula(formula)
+        assert result.names == names
+        assert result.constant == constant
+
+
+    def test_compile_formula_cached(self):
+        assert compile_formula("20 + 0.3 * ap") is compile_formula("20 + 0.3 * ap")
+
+
+    @pytest.mark.parametrize("formula, variables, output", [
+        ("20", {}, 20),
+        ("400 + 0.3 * ad", {"ad": 100}, 430),
+        ("-5 + rank * 15 + (0.525 + rank * 0.075) * ad", {"rank": 3, "ad": 100}, 115),
+    ])
+    def test_evaluate(self, formula, variables, output):
+        result = compile_formula(formula).evaluate(variables)
+        assert round(result, 3) == output
+
+
+    def test_evaluate_missing_variable(self):
+        with pytest.raises(NameError):
+            compile_formula("ad * 2").evaluate({})
@@ -0,0 +1,172 @@
+import itertools
+import pytest
+
+from dataclasses import replace
+
+from src.server.models.dataenums import ActionType, Actor, BuildObjective, ItemClass, Map, Stat
+from src.server.models.item import Item
+from src.server.models.request import Action, Rank, V1Request
+from src.server.simulation.optimizer import BuildEvaluator, BuildProblem, merge_results, prepare_problem, search_builds, search_chunk, select_candidates, split_roots
+
+
+
+
+@pytest.fixture
+def item_pool(make_item) -> list[Item]:
+    return [
+        make_item(1, {"attack damage": 60}, 3000),
+        make_item(2, {"attack damage": 40, "lethality": 12}, 3100),
+        make_item(3, {"attack damage": 30, "attack speed percent": 0.3}, 2800),
+        make_item(4, {"attack damage": 25}, 3200),
+        make_item(5, {"ability power": 120}, 3000),
+        make_item(6, {"attack damage": 20, "lethality": 10}, 2600),
+        make_item(7, {"lethality": 18}, 1100, class_=ItemClass.BOOTS),
+        make_item(8, {"lethality": 10}, 1200, class_=ItemClass.BOOTS),
+    ]
+
+
+@pytest.fixture
+def build_problem(aatrox_dot, item_pool) -> BuildProblem:
+    request = V1Request(
+        id_attacker="aatrox",
+        lvl_attacker=9,
+        ability_points_attacker=Rank(q=3, w=1, e=1, r=0),
+        items_attacker=[],
+        id_defender="aatrox",
+        lvl_defender=9,
+        ability_points_defender=Rank(q=3, w=1, e=1, r=0),
+        items_defender=[],
+        combo=[Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in (ActionType.W, ActionType.AA, ActionType.E, ActionType.AA)]
+    )
+    return BuildProblem(request=request, champions={"aatrox": aatrox_dot}, items={}, candidates=item_pool, slots=3, top_k=3)
+
+
+def brute_force(problem: BuildProblem) -> list[float]:
+    evaluator = BuildEvaluator(problem)
+    scores = []
+    for size in range(1, problem.slots + 1):
+        for combination in itertools.combinations(range(len(problem.candidates)), size):
+            items = [problem.candidates[index] for index in combination]
+            if sum(item.class_ == ItemClass.BOOTS for item in items) > 1:
+                continue
+            stats = {}
+            for index in combination:
+                for stat, value in problem.vectors[index].items():
+                    stats[stat] = stats.get(stat, 0) + value
+            damage = evaluator.damage(stats)
+            gold = sum(item.gold for item in items)
+            scores.append(damage / gold if problem.objective == BuildObjective.DAMAGE_PER_GOLD else damage)
+    return sorted(scores, reverse=True)[:problem.top_k]
+
+
+
+class TestBuildOptimizer():
+
+    def test_select_candidates(self, item_pool, make_item):
+        component = make_item(9, {"attack damage": 10}, 400, into=[item_pool[0].item_id])
+        other_map = make_item(10, {"attack damage": 80}, 3000)
+        other_map.maps = [Map.HA]
+        starter = make_item(11, {"attack damage": 8}, 450, class_=ItemClass.STARTER)
+        items = item_pool + [component, other_map, starter]
+        candidates = select_candidates(items, [item_pool[1]], Map.SR, [ItemClass.LEGENDARY, ItemClass.BOOTS], BuildObjective.DAMAGE)
+        assert candidates == [item for item in item_pool if item is not item_pool[1]]
+        candidates = select_candidates(items, [], Map.SR, [ItemClass.LEGENDARY], BuildObjective.DAMAGE_PER_GOLD)
+        assert component in candidates
+
+
+    def test_budget_keeps_components(self, build_problem, make_item):
+        upgrade = make_item(1, {"attack damage": 70}, 3000)
+        component = make_item(2, {"attack damage": 25}, 900, into=[upgrade.item_id])
+        upgrade.from_ = [component.item_id]
+        candidates = select_candidates([upgrade, component], [], Map.SR, [ItemClass.LEGENDARY], BuildObjective.DAMAGE, budget=1000)
+        assert candidates == [upgrade, component]
+        build_problem.candidates, build_problem.budget = candidates, 1000
+        prepared, _ = prepare_problem(build_problem)
+        [best] = search_builds(prepared).builds
+        assert [prepared.candidates[index] for index in best.candidates] == [component]
+
+
+    def test_prepare_drops_irrelevant(self, build_problem, item_pool):
+        prepared, evaluated = prepare_problem(build_problem)
+        assert evaluated > 0
+        assert item_pool[4] not in prepared.candidates
+        assert all(Stat.AP not in vector for vector in prepared.vectors)
+
+
+    @pytest.mark.parametrize("slots, top_k, dropped", [(1, 1, True), (3, 3, False)])
+    def test_prepare_drops_dominated(self, build_problem, item_pool, slots, top_k, dropped):
+        # Item 4 has three dominators and the second boots one, which only prunes them while that leaves top_k builds as good.
+        build_problem.slots, build_problem.top_k = slots, top_k
+        prepared, _ = prepare_problem(build_problem)
+        assert (item_pool[3] not in prepared.candidates) == dropped
+        assert (item_pool[7] not in prepared.candidates) == dropped
+
+
+    def test_prepare_keeps_duplicates(self, build_problem, make_item):
+        build_problem.candidates = [make_item(1, {"attack damage": 60}, 3000), make_item(2, {"attack damage": 60}, 3000)]
+        build_problem.slots, build_problem.top_k = 2, 1
+        prepared, _ = prepare_problem(build_problem)
+        assert len(prepared.candidates) == 2
+        [best] = search_builds(prepared).builds
+        assert len(best.candidates) == 2
+
+
+    def test_prepare_ignores_dominators_that_cannot_fit(self, build_problem, make_item):
+        owned = make_item(4, {"attack damage": 10}, 500)
+        upgrade = make_item(5, {"attack damage": 90}, 2000, from_=[owned.item_id])
+        plain = make_item(6, {"attack damage": 50}, 2500)
+        build_problem.items = {str(owned.id): owned}
+        build_problem.request.items_attacker = [str(owned.id)]
+        build_problem.candidates = [upgrade, plain]
+        build_problem.slots, build_problem.top_k = 1, 1
+        prepared, _ = prepare_problem(build_problem)
+        assert plain in prepared.candidates
+        [best] = search_builds(prepared).builds
+        assert [prepared.candidates[index] for index in best.candidates] == [plain]
+
+
+    @pytest.mark.parametrize("objective", [BuildObjective.DAMAGE, BuildObjective.DAMAGE_PER_GOLD])
+    def test_pruning_matches_unpruned_brute_force(self, build_problem, item_pool, objective, make_item):
+        # Brute force over every candidate with its full stats, so unsound pruning in prepare_problem shows up.
+        build_problem.candidates = item_pool + [make_item(9, {"attack damage": 60}, 3000), make_item(10, {"attack damage": 35}, 2900)]
+        build_problem.slots, build_problem.top_k, build_problem.objective = 2, 3, objective
+        prepared, _ = prepare_problem(build_problem)
+        result = search_builds(prepared)
+        assert result.complete
+        unpruned = replace(build_problem, vectors=[dict(item.stats) for item in build_problem.candidates])
+        assert [build.score for build in result.builds] == pytest.approx(brute_force(unpruned))
+
+
+    @pytest.mark.parametrize("objective", [BuildObjective.DAMAGE, BuildObjective.DAMAGE_PER_GOLD])
+    def test_matches_brute_force(self, build_problem, objective):
+        build_problem.objective = objective
+        prepared, _ = prepare_problem(build_problem)
+        result = search_builds(prepared)
+        assert result.complete
+        assert [build.score for build in result.builds] == pytest.approx(brute_force(prepared))
+
+
+    def test_budget_and_single_boots(self, build_problem):
+        build_problem.budget = 6000
+        prepared, _ = prepare_problem(build_problem)
+        result = search_builds(prepared)
+        for build in result.builds:
+            items = [prepared.candidates[index] for index in build.candidates]
+            assert build.gold <= 6000
+            assert sum(item.class_ == ItemClass.BOOTS for item in items) <= 1
+
+
+    def test_chunks_match_serial(self, build_problem):
+        prepared, _ = prepare_problem(build_problem)
+        serial = search_builds(prepared)
+        chunks = split_roots(len(prepared.candidates), 3)
+        assert sorted(itertools.chain.from_iterable(chunks)) == list(range(len(prepared.candidates)))
+        merged = merge_results([search_chunk((prepared, roots)) for roots in chunks], prepared.top_k)
+        assert [build.score for build in merged.builds] == pytest.approx([build.score for build in serial.builds])
+
+
+    def test_evaluation_limit(self, build_problem):
+        build_problem.max_evaluations = 3
+        prepared, _ = prepare_problem(build_problem)
+        result = search_builds(prepared)
+        assert not result.complete
@@ -0,0 +1,117 @@
+import httpx
+import json
+import pytest
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+
+from src.server.models.champion import ShortChampion
+from src.server import database
+from src.server.routes.champion import router as championsRouter
+from src.server.utils import compression
+from src.server.utils.catalog import catalog_cache
+
+
+
+
+@pytest.fixture(autouse=True)
+def clear_catalog_cache():
+    catalog_cache.clear()
+    yield
+    catalog_cache.clear()
+
+
+@pytest.fixture
+def short_champions() -> list[ShortChampion]:
+    with open("src/tests/static/json/aatrox.json", encoding='UTF-8') as f:
+        document = json.load(f)
+    for ability in ("q", "w", "e", "r"):
+        document[ability].setdefault("validated", True)
+    return [ShortChampion(**document, validated=True)]
+
+
+@pytest.fixture
+async def client():
+    app = FastAPI()
+    app.include_router(championsRouter, prefix="/champion")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def mock_fetch(mocker, short_champions):
+    return mocker.patch("src.server.routes.champion.fetch_short_champions_by_patch", return_value=short_champions)
+
+
+
+class TestCatalogSnapshot():
+
+    @pytest.mark.asyncio
+    async def test_snapshot_served_from_memory(self, client, mock_fetch, short_champions):
+        first = await client.get("/champion/all/14.1")
+        second = await client.get("/champion/all/14.1")
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        assert first.json() == jsonable_encoder(short_champions)
+        assert first.headers["etag"] == second.headers["etag"]
+        assert "max-age" in first.headers["cache-control"]
+        mock_fetch.assert_awaited_once()
+
+
+    @pytest.mark.asyncio
+    async def test_if_none_match(self, client, mock_fetch):
+        etag = (await client.get("/champion/all/14.1")).headers["etag"]
+        response = await client.get("/champion/all/14.1", headers={"If-None-Match": f'"other", W/{etag}'})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert (await client.get("/champion/all/14.1", headers={"If-None-Match": '"other"'})).status_code == 200
+
+
+    @pytest.mark.asyncio
+    async def test_write_from_another_process_rebuilds(self, client, mock_fetch, short_champions, version_collection):
+        first = await client.get("/champion/all/14.1")
+        # Another process writes: it bumps the shared data version, which this process has cached for DATA_VERSION_TTL.
+        await version_collection.find_one_and_update({"_id": database.DATA_VERSION_ID}, {"$inc": {"version": 1}})
+        short_champions[0].name = "Renamed"
+        assert (await client.get("/champion/all/14.1")).content == first.content
+        assert mock_fetch.await_count == 1
+        database.data_version_cache.clear()
+        response = await client.get("/champion/all/14.1", headers={"If-None-Match": first.headers["etag"]})
+        assert response.status_code == 200
+        assert response.json()[0]["name"] == "Renamed"
+        assert response.headers["etag"] != first.headers["etag"]
+        assert mock_fetch.await_count == 2
+
+
+    @pytest.mark.asyncio
+    async def test_unchanged_list_keeps_etag(self, client, mock_fetch):
+        etag = (await client.get("/champion/all/14.1")).headers["etag"]
+        await database.bump_data_version()
+        response = await client.get("/champion/all/14.1", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert mock_fetch.await_count == 2
+
+
+    @pytest.mark.asyncio
+    async def test_empty_patch_not_cached(self, client, mock_fetch):
+        mock_fetch.return_value = []
+        assert (await client.get("/champion/all/14.1")).status_code == 404
+        assert (await client.get("/champion/all/14.1")).status_code == 404
+        assert mock_fetch.await_count == 2
+        assert len(catalog_cache) == 0
+
+
+    @pytest.mark.asyncio
+    async def test_precompressed_representation(self, client, mock_fetch, mocker):
+        mocker.patch.object(compression, "COMPRESSION_MIN_SIZE", 0)
+        spy = mocker.spy(compression, "compress")
+        plain = await client.get("/champion/all/14.1", headers={"Accept-Encoding": "identity"})
+        first = await client.get("/champion/all/14.1", headers={"Accept-Encoding": "gzip"})
+        second = await client.get("/champion/all/14.1", headers={"Accept-Encoding": "gzip"})
+        assert first.headers["content-encoding"] == second.headers["content-encoding"] == "gzip"
+        assert first.content == second.content == plain.content
+        assert first.headers["etag"] != plain.headers["etag"]
+        assert spy.call_count == 1
+        response = await client.get("/champion/all/14.1", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+        assert response.status_code == 304
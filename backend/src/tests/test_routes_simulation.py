@@ -0,0 +1,264 @@
+import httpx
+import json
+import pytest
+
+from fastapi import FastAPI
+from pydantic import ValidationError
+from pymongo.results import UpdateResult
+
+from src.server import database
+from src.server.models.champion import MAX_LEVEL
+from src.server.models.dataenums import ActionType, Actor
+from src.server.models.request import (MAX_BATCH_VARIANTS, MAX_BUILD_EVALUATIONS, MAX_BUILD_SLOTS, MAX_BUILD_TOP_K, MAX_COMBO_ACTIONS, MAX_COMBO_BEAM_WIDTH,
+                                     MAX_SWEEP_POINTS, Action, BatchRequest, BatchVariant, BuildRequest, ComboRequest, ExtendRequest, Rank, SweepPoint, SweepRequest)
+from src.server.routes.champion import admin as championsAdmin
+from src.server.routes.simulation import router as simulationRouter
+from src.server.routes.simulation import batch_simulation, extend_simulation, optimize_build, optimize_combo, stream_simulation, sweep_simulation, v1_simulation
+from src.server.simulation.executor import SimulationExecutor
+from src.server.simulation.result_cache import result_cache, state_cache
+from src.server.simulation.simulation import Simulation
+from src.server.utils.cache import invalidate_document
+
+
+
+
+def _combo(*action_types: ActionType) -> list[Action]:
+    return [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in action_types]
+
+
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    result_cache.clear()
+    state_cache.clear()
+    yield
+    result_cache.clear()
+    state_cache.clear()
+
+
+@pytest.fixture
+def mock_fetch(mocker, aatrox_dot):
+    champion = mocker.patch("src.server.routes.simulation.get_required_champions", side_effect=lambda ids: [aatrox_dot] * len(ids))
+    item = mocker.patch("src.server.routes.simulation.get_required_items", return_value=[])
+    return champion, item
+
+
+@pytest.fixture
+def batch_request() -> BatchRequest:
+    return BatchRequest(
+        id_attacker="aatrox",
+        lvl_attacker=9,
+        ability_points_attacker=Rank(q=3, w=1, e=1, r=0),
+        id_defender="aatrox",
+        lvl_defender=9,
+        ability_points_defender=Rank(q=3, w=1, e=1, r=0),
+        combo=_combo(ActionType.W, ActionType.AA),
+        variants=[
+            BatchVariant(),
+            BatchVariant(lvl_attacker=18),
+            BatchVariant(combo=_combo(ActionType.E, ActionType.AA, ActionType.AA))
+        ]
+    )
+
+
+
+class TestBatchSimulation():
+
+    def test_resolve_variant(self, batch_request):
+        resolved = batch_request.resolve(batch_request.variants[1])
+        assert resolved.lvl_attacker == 18
+        assert resolved.lvl_defender == 9
+        assert resolved.combo == batch_request.combo
+
+
+    def test_variants_are_capped(self, batch_request):
+        base = batch_request.dict(exclude={"variants"})
+        assert len(BatchRequest(**base, variants=[{}] * MAX_BATCH_VARIANTS).variants) == MAX_BATCH_VARIANTS
+        with pytest.raises(ValidationError):
+            BatchRequest(**base, variants=[{}] * (MAX_BATCH_VARIANTS + 1))
+
+
+    def test_sweep_points_are_capped(self, batch_request):
+        base = batch_request.dict(exclude={"variants"})
+        assert len(SweepRequest(**base, points=[{}] * MAX_SWEEP_POINTS).points) == MAX_SWEEP_POINTS
+        for points in ([], [{}] * (MAX_SWEEP_POINTS + 1)):
+            with pytest.raises(ValidationError):
+                SweepRequest(**base, points=points)
+
+
+    @pytest.mark.parametrize("field", ["lvl_attacker", "lvl_defender"])
+    def test_sweep_levels_are_bounded(self, field):
+        assert getattr(SweepPoint(**{field: MAX_LEVEL}), field) == MAX_LEVEL
+        for level in (0, MAX_LEVEL + 1):
+            with pytest.raises(ValidationError):
+                SweepPoint(**{field: level})
+
+
+    @pytest.mark.asyncio
+    async def test_batch_loads_documents_once(self, mock_fetch, batch_request):
+        champion, item = mock_fetch
+        response = await batch_simulation(batch_request)
+        assert [result.index for result in response.results] == [0, 1, 2]
+        champion.assert_awaited_once_with(["aatrox"])
+        item.assert_awaited_once_with([])
+
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_single_requests(self, mock_fetch, batch_request):
+        response = await batch_simulation(batch_request)
+        for variant, batch_result in zip(batch_request.variants, response.results):
+            single = await v1_simulation(batch_request.resolve(variant))
+            assert batch_result.error is None
+            assert batch_result.result == single
+
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_errors_per_entry(self, mocker, mock_fetch, batch_request):
+        batch_request.variants.append(BatchVariant(lvl_attacker=18))
+        run = mocker.patch("src.server.simulation.executor.Simulation.do_combo", autospec=True)
+        run.side_effect = [NotImplementedError("not supported"), mocker.DEFAULT, mocker.DEFAULT, mocker.DEFAULT]
+        run.return_value = None
+        response = await batch_simulation(batch_request)
+        assert response.results[0].error == "not supported"
+        assert all(result.error is None for result in response.results[1:])
+
+
+    @pytest.mark.asyncio
+    async def test_repeat_request_is_cached(self, mocker, mock_fetch, batch_request):
+        champion, _ = mock_fetch
+        v1_request = batch_request.resolve(batch_request.variants[0])
+        run = mocker.spy(Simulation, "do_combo")
+        first = await v1_simulation(v1_request)
+        second = await v1_simulation(v1_request.copy(deep=True))
+        assert first is second
+        assert run.call_count == 1
+        assert champion.await_count == 1
+
+
+    @pytest.mark.asyncio
+    async def test_cached_result_dropped_on_document_update(self, mocker, mock_fetch, batch_request):
+        v1_request = batch_request.resolve(batch_request.variants[0])
+        first = await v1_simulation(v1_request)
+        invalidate_document("aatrox")
+        assert await v1_simulation(v1_request) is not first
+
+
+    @pytest.mark.asyncio
+    async def test_admin_update_reaches_public_app(self, mocker, mock_fetch, batch_request, aatrox_dot):
+        # The admin app is a separate process, so its in-process invalidation hooks never reach the public app.
+        mocker.patch.object(database, "invalidate_document")
+        collection = mocker.patch.object(database, "champion_collection")
+        collection.update_one = mocker.AsyncMock(return_value=UpdateResult({"n": 1, "nModified": 1}, True))
+        public, admin = FastAPI(), FastAPI()
+        public.include_router(simulationRouter, prefix="/simulation")
+        admin.include_router(championsAdmin, prefix="/admin/champion")
+        run = mocker.spy(Simulation, "do_combo")
+        body = json.loads(batch_request.resolve(batch_request.variants[0]).json())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=public), base_url="http://public") as public_client, \
+                   httpx.AsyncClient(transport=httpx.ASGITransport(app=admin), base_url="http://admin") as admin_client:
+            first = await public_client.post("/simulation/v1", json=body)
+            assert (await public_client.post("/simulation/v1", json=body)).json() == first.json()
+            assert run.call_count == 1
+            response = await admin_client.put("/admin/champion/", json=json.loads(aatrox_dot.json(by_alias=True)))
+            assert response.status_code == 200
+            # The public process re-reads the shared version once its DATA_VERSION_TTL has passed.
+            database.data_version_cache.clear()
+            assert (await public_client.post("/simulation/v1", json=body)).json() == first.json()
+            assert run.call_count == 2
+
+
+    @pytest.mark.asyncio
+    async def test_optimize_build(self, mocker, mock_fetch, batch_request, make_item):
+        pool = [make_item(1, {"attack damage": 60}, 3000), make_item(2, {"ability power": 100}, 3000), make_item(3, {"attack damage": 30}, 1500)]
+        mocker.patch("src.server.routes.simulation.fetch_items_by_patch", return_value=pool)
+        mocker.patch("src.server.routes.simulation.get_executor", return_value=SimulationExecutor(mode="inline"))
+        build_request = BuildRequest(**batch_request.dict(exclude={"variants"}), patch="14.1", slots=1, top_k=2)
+        response = await optimize_build(build_request)
+        assert response.candidates == 2
+        assert [build.items for build in response.builds] == [[str(pool[0].id)], [str(pool[2].id)]]
+        assert response.builds[0].damage > response.builds[1].damage
+
+
+    @pytest.mark.asyncio
+    async def test_optimize_combo(self, mocker, mock_fetch, batch_request):
+        mocker.patch("src.server.routes.simulation.get_executor", return_value=SimulationExecutor(mode="inline"))
+        combo_request = ComboRequest(**batch_request.dict(exclude={"variants", "combo"}), tick_budget=90, beam_width=4)
+        response = await optimize_combo(combo_request)
+        assert response.combo
+        assert response.result == await v1_simulation(batch_request.resolve(BatchVariant(combo=response.combo)))
+
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("field, limit", [("slots", MAX_BUILD_SLOTS), ("top_k", MAX_BUILD_TOP_K), ("max_evaluations", MAX_BUILD_EVALUATIONS)])
+    async def test_build_search_is_bounded(self, batch_request, field, limit):
+        base = batch_request.dict(exclude={"variants"}) | {"patch": "14.1"}
+        assert getattr(BuildRequest(**base, **{field: limit}), field) == limit
+        app = FastAPI()
+        app.include_router(simulationRouter, prefix="/simulation")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for value in (0, limit + 1):
+                response = await client.post("/simulation/item", json=json.loads(BuildRequest(**base).json()) | {field: value})
+                assert response.status_code == 422
+
+
+    @pytest.mark.parametrize("field, limit", [("max_actions", MAX_COMBO_ACTIONS), ("beam_width", MAX_COMBO_BEAM_WIDTH)])
+    def test_combo_search_is_bounded(self, batch_request, field, limit):
+        base = batch_request.dict(exclude={"variants", "combo"})
+        assert getattr(ComboRequest(**base, tick_budget=90, **{field: limit}), field) == limit
+        for value in (0, limit + 1):
+            with pytest.raises(ValidationError):
+                ComboRequest(**base, tick_budget=90, **{field: value})
+
+
+    @pytest.mark.asyncio
+    async def test_extend_simulation(self, mock_fetch, batch_request):
+        champion, _ = mock_fetch
+        base = batch_request.resolve(batch_request.variants[0])
+        extra = _combo(ActionType.AA, ActionType.E)
+        extended = await extend_simulation(ExtendRequest(base=base, actions=extra))
+        assert extended == await v1_simulation(base.copy(update={"combo": base.combo + extra}))
+        more = await extend_simulation(ExtendRequest(base=base, actions=extra + _combo(ActionType.AA)))
+        assert more.damage > extended.damage
+        assert champion.await_count == 2
+
+
+    @pytest.mark.asyncio
+    async def test_sweep_simulation(self, mocker, mock_fetch, batch_request):
+        mocker.patch("src.server.routes.simulation.get_executor", return_value=SimulationExecutor(mode="inline"))
+        points = [SweepPoint(lvl_attacker=level) for level in (1, 9, 18)]
+        response = await sweep_simulation(SweepRequest(**batch_request.dict(exclude={"variants"}), points=points))
+        for point, result in zip(points, response.results):
+            expected = await v1_simulation(batch_request.resolve(BatchVariant(lvl_attacker=point.lvl_attacker)))
+            assert (result.damage, result.ticks) == (expected.damage, expected.ticks)
+
+
+    @pytest.mark.asyncio
+    async def test_summary_mode(self, mock_fetch, batch_request):
+        batch_request.summary = True
+        response = await batch_simulation(batch_request)
+        batch_request.summary = False
+        full = await batch_simulation(batch_request)
+        for summary, result in zip(response.results, full.results):
+            assert summary.result.effect_list == []
+            assert summary.result.totals
+            assert summary.result.damage == result.result.damage
+
+
+    @pytest.mark.asyncio
+    async def test_stream_ndjson(self, mock_fetch, batch_request):
+        v1_request = batch_request.resolve(batch_request.variants[2])
+        response = await stream_simulation(v1_request, accept=None)
+        assert response.media_type == "application/x-ndjson"
+        lines = [json.loads(line) async for chunk in response.body_iterator for line in chunk.splitlines()]
+        full = await v1_simulation(v1_request)
+        assert lines[:-1] == json.loads(full.json())["effect_list"]
+        assert lines[-1]["damage"] == full.damage
+
+
+    @pytest.mark.asyncio
+    async def test_stream_sse_reports_errors(self, mock_fetch, batch_request):
+        v1_request = batch_request.resolve(BatchVariant(combo=_combo(ActionType.AA, ActionType.R)))
+        response = await stream_simulation(v1_request, accept="text/event-stream")
+        assert response.media_type == "text/event-stream"
+        chunks = [chunk async for chunk in response.body_iterator]
+        assert chunks[0].startswith("event: tick\ndata: ")
+        assert chunks[-1].startswith("event: error\ndata: ")
@@ -0,0 +1,62 @@
+from src.server.simulation.scheduler import EventQueue
+
+
+
+
+class TestEventQueue():
+
+    def test_pop_in_tick_order(self, q_damage_aa, q_damage_w, q_damage_q):
+        queue = EventQueue()
+        queue.push(30, q_damage_w)
+        queue.push(7, q_damage_aa)
+        queue.push(15, q_damage_q)
+        assert queue.pop() == (7, [q_damage_aa])
+        assert queue.pop() == (15, [q_damage_q])
+        assert queue.pop() == (30, [q_damage_w])
+        assert not queue
+
+
+    def test_stable_order_within_tick(self, q_damage_aa, q_damage_w, q_damage_q):
+        queue = EventQueue()
+        queue.push(10, q_damage_w)
+        queue.push(10, q_damage_aa)
+        queue.push(10, q_damage_q)
+        assert queue.pop() == (10, [q_damage_w, q_damage_aa, q_damage_q])
+
+
+    def test_pop_due(self, q_damage_aa, q_damage_w):
+        queue = EventQueue.from_dict({6: [q_damage_aa], 15: [q_damage_w]})
+        assert queue.pop_due(5) is None
+        assert queue.pop_due(10) == (6, [q_damage_aa])
+        assert queue.pop_due(10) is None
+        assert queue.pop_due(15) == (15, [q_damage_w])
+
+
+    def test_cancel(self, q_damage_aa, q_damage_w):
+        queue = EventQueue()
+        queue.push(10, q_damage_aa)
+        handle = queue.push(10, q_damage_w)
+        queue.cancel(handle)
+        assert len(queue) == 1
+        assert queue.to_dict() == {10: [q_damage_aa]}
+        assert queue.pop() == (10, [q_damage_aa])
+
+
+    def test_cancel_skips_empty_tick(self, q_damage_aa, q_damage_w):
+        queue = EventQueue()
+        handle = queue.push(10, q_damage_w)
+        queue.push(20, q_damage_aa)
+        queue.cancel(handle)
+        assert queue.peek_tick() == 20
+        assert queue.pop_due(20) == (20, [q_damage_aa])
+        assert len(queue) == 0
+
+
+    def test_cancel_after_pop(self, q_damage_aa, q_damage_w):
+        queue = EventQueue()
+        handle = queue.push(10, q_damage_w)
+        queue.pop()
+        queue.push(10, q_damage_aa)
+        queue.cancel(handle)
+        assert queue.to_dict() == {10: [q_damage_aa]}
+        assert len(queue) == 1
@@ -1,12 +1,30 @@
+import copy
+import dataclasses
 import pytest
 
 
+from src.server.simulation.scheduler import EventQueue
 from src.server.simulation.simulation import Simulation
-from src.server.models.dataenums import ActionType, Actor, DotState
+from src.server.models.dataenums import ActionType, Actor, Buff, Comparison, Condition, DotState, EffectResult, EffectType, HpScaling, Stat
+from src.server.models.passive_effect import StatProperties
 from src.server.models.request import Action
 
 
 
+
+def queue_with_dot(initial_queue, dot_state, dot_component) -> EventQueue:
+    # Pushes the entries in order and hands the DoT the handle of its irregular final tick, if queued.
+    irregular_end = dot_state is not None and dot_state.end != dot_state.last_regular
+    queue = EventQueue()
+    for tick, components in initial_queue.items():
+        for component in components:
+            handle = queue.push(tick, component)
+            if irregular_end and tick == dot_state.end and component is dot_component:
+                dot_state.end_handle = handle
+    return queue
+
+
+
 class TestSimulation():
 
 
@@ -33,7 +51,8 @@ class TestSimulation():
             ({5: ["q_damage_w"]}, {5: ["q_damage_w"]}),
             ({10: ["q_damage_w"]}, {}),
             ({5: ["q_damage_w"], 10: ["q_damage_w"]}, {5: ["q_damage_w"]}),
-            ({5: ["q_damage_w"], 10: ["q_damage_w", "q_damage_aa"]}, {5: ["q_damage_w"], 10: ["q_damage_aa"]})
+            ({5: ["q_damage_w"], 10: ["q_damage_w", "q_damage_aa"]}, {5: ["q_damage_w"], 10: ["q_damage_aa"]}),
+            ({5: ["q_damage_w"], 10: ["q_damage_aa", "q_damage_w"]}, {5: ["q_damage_w"], 10: ["q_damage_aa"]})
         ]
     )
     def test_remove_dot_end(self, sim: Simulation, q_damage_w, q_damage_aa, initial_queue, expected_queue):
@@ -41,11 +60,13 @@ class TestSimulation():
             "q_damage_w": q_damage_w,
             "q_damage_aa": q_damage_aa
         }
-        sim.queue = {k: [mapping[v] for v in values] for k, values in initial_queue.items()}
-        sim._remove_dot_end(q_damage_w.source, Actor.RED, 10)
+        dot_state = DotState(start=0, last_regular=5, end=10)
+        sim.queue = queue_with_dot({k: [mapping[v] for v in values] for k, values in initial_queue.items()}, dot_state, q_damage_w)
+        sim._remove_dot_end(dot_state)
 
         expected_queue_mapped = {k: [mapping[v] for v in values] for k, values in expected_queue.items()}
-        assert sim.queue == expected_queue_mapped
+        assert sim.queue.to_dict() == expected_queue_mapped
+        assert dot_state.end_handle is None
 
 
 
@@ -90,7 +111,7 @@ class TestSimulation():
     )
     def test_find_existing_dot(self, sim: Simulation, q_damage_w, e_damage_w, initial_queue, dot_state, expected_queue):
         sim.tick = 10
-        sim.queue = {k: [q_damage_w for v in values] for k, values in initial_queue.items()}
+        sim.queue = queue_with_dot({k: [q_damage_w for v in values] for k, values in initial_queue.items()}, dot_state, q_damage_w)
         sim.dots[(e_damage_w.source, e_damage_w.target)] = dot_state
         dot_state = DotState(
             start=0,
@@ -102,7 +123,7 @@ class TestSimulation():
         expected_queue_mapped = {k: [q_damage_w for v in values] for k, values in expected_queue.items()}
         assert result == dot_state
         assert sim.dots[(e_damage_w.source, e_damage_w.target)] == dot_state
-        assert sim.queue == expected_queue_mapped
+        assert sim.queue.to_dict() == expected_queue_mapped
 
 
 
@@ -136,11 +157,11 @@ class TestSimulation():
         ]
     )
     def test_apply_dot(self, sim: Simulation, e_damage_w, q_damage_w, initial_queue, initial_dot_state, expected_queue, expected_dot_state):
-        sim.queue = {k: [q_damage_w for v in values] for k, values in initial_queue.items()}
+        sim.queue = queue_with_dot({k: [q_damage_w for v in values] for k, values in initial_queue.items()}, initial_dot_state, q_damage_w)
         sim.dots[(e_damage_w.source, e_damage_w.target)] = initial_dot_state
         sim._apply_dot(e_damage_w, Actor.BLUE)
         expected_queue_mapped = {k: [q_damage_w for v in values] for k, values in expected_queue.items()}
-        assert sim.queue == expected_queue_mapped
+        assert sim.queue.to_dict() == expected_queue_mapped
         assert sim.dots[(e_damage_w.source, e_damage_w.target)] == expected_dot_state
 
 
@@ -205,11 +226,11 @@ class TestSimulation():
             "e_damage_aa": e_damage_aa,
             "e_damage_w": e_damage_w
         }
-        sim.queue = {k: [mapping[v] for v in values] for k, values in initial_queue.items()}
+        sim.queue = queue_with_dot({k: [mapping[v] for v in values] for k, values in initial_queue.items()}, initial_dot_state, q_damage_w)
         args_mapped = [mapping[value] for value in queue_args]
         sim._queue_status(args_mapped, Actor.BLUE)
         expected_queue_mapped = {k: [mapping[v] for v in values] for k, values in expected_queue.items()}
-        assert sim.queue == expected_queue_mapped
+        assert sim.queue.to_dict() == expected_queue_mapped
 
 
     @pytest.mark.parametrize(
@@ -242,15 +263,15 @@ class TestSimulation():
             "q_damage_w": q_damage_w,
             "q_damage_aa": q_damage_aa,
         }
-        sim.queue = {k: [mapping[v] for v in values] for k, values in initial_queue.items()}
+        sim.queue = EventQueue.from_dict({k: [mapping[v] for v in values] for k, values in initial_queue.items()})
         sim.tick = tick
         sim._process_queue()
         expected_queue_mapped = {k: [mapping[v] for v in values] for k, values in expected_queue.items()}
-        assert sim.queue == expected_queue_mapped
+        assert sim.queue.to_dict() == expected_queue_mapped
 
 
     def test_process_queue_heal(self, sim: Simulation, q_vamp_aa):
-        sim.queue = {15: [q_vamp_aa]}
+        sim.queue = EventQueue.from_dict({15: [q_vamp_aa]})
         sim.tick = 30
         sim.actors[Actor.BLUE].hp = 900
         sim._process_queue()
@@ -258,11 +279,23 @@ class TestSimulation():
         assert round(sim.actors[Actor.BLUE].hp, 3) == 918.363
 
 
+    def test_process_queue_heal_keeps_damage_results(self, sim: Simulation, q_vamp_aa):
+        # The vamp heal is applied in a follow-up round of the same tick; it must not replace the damage results.
+        sim.queue = EventQueue.from_dict({15: [q_vamp_aa]})
+        sim.tick = 30
+        sim.actors[Actor.BLUE].hp = 900
+        sim._process_queue()
+        [event] = sim.effect_list
+        assert event.tick == 15
+        assert [(record.type_, record.target) for record in event.result] == [(EffectType.DAMAGE, Actor.RED), (EffectType.HEAL, Actor.BLUE)]
+        assert round(event.result[1].value, 3) == 18.363
+
+
     def test_do_action(self, sim: Simulation, q_damage_aa):
         sim._do_action(Action(actor=Actor.BLUE, target=Actor.RED, action_type=ActionType.AA))
         assert sim.tick == 7
-        assert list(sim.queue.keys())[0] == 7
-        assert list(sim.queue.values())[0][0] == q_damage_aa
+        assert list(sim.queue.to_dict().keys())[0] == 7
+        assert list(sim.queue.to_dict().values())[0][0] == q_damage_aa
 
 
     @pytest.mark.parametrize("input, output", [
@@ -277,4 +310,125 @@ class TestSimulation():
         result = sim.do_combo(input)
         assert result.damage == output[0]
         assert result.ticks == output[1]
-        assert round(sim.actors[Actor.RED].hp, 3) == output[2]
\ No newline at end of file
+        assert round(sim.actors[Actor.RED].hp, 3) == output[2]
+
+
+    def test_fork_matches_full_run(self, dot_sim: Simulation):
+        prefix = [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in (ActionType.W, ActionType.AA, ActionType.E)]
+        extra = [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in (ActionType.AA, ActionType.W)]
+        full = dot_sim.fork().do_combo(prefix + extra)
+        base = dot_sim.fork()
+        base.do_combo(prefix)
+        branch = base.fork()
+        assert branch.do_combo(extra) == full
+        assert base.tick < branch.tick
+        assert base.actors[Actor.RED].damage_taken < branch.actors[Actor.RED].damage_taken
+        assert branch.actors[Actor.BLUE].champion is base.actors[Actor.BLUE].champion
+
+
+    def test_snapshot_restore(self, dot_sim: Simulation):
+        aa = Action(actor=Actor.BLUE, target=Actor.RED, action_type=ActionType.AA)
+        dot_sim.step(Action(actor=Actor.BLUE, target=Actor.RED, action_type=ActionType.W))
+        state = dot_sim.snapshot()
+        first = dot_sim.do_combo([aa, aa])
+        dot_sim.restore(state)
+        assert dot_sim.tick == state.tick
+        assert dot_sim.queue.to_dict() == state.queue.to_dict()
+        assert dot_sim.do_combo([aa, aa]) == first
+
+
+    @pytest.mark.parametrize("action_types, hp_scaling, distance", [
+        ((ActionType.Q, ActionType.AA, ActionType.AA, ActionType.Q), HpScaling.FLAT, 0),
+        ((ActionType.AA,) * 60, HpScaling.FLAT, 0),
+        ((ActionType.AA, ActionType.Q) * 8, HpScaling.MAX_HP, 0),
+        ((ActionType.Q, ActionType.AA) * 8, HpScaling.CURRENT_HP, 300),
+        ((ActionType.AA, ActionType.AA, ActionType.Q) * 5, HpScaling.MISSING_HP, 0),
+    ])
+    def test_pure_damage_fast_path(self, sim: Simulation, action_types, hp_scaling, distance):
+        props = sim.actors[Actor.BLUE].champion.q.effects[0].effect_components[0].props
+        if hp_scaling != HpScaling.FLAT:
+            props.scaling = "0.05 + rank * 0.01"
+            props.hp_scaling = hp_scaling
+        sim.distance = distance
+        sim.actors[Actor.BLUE].champion.q.effects[0].effect_components[0].speed = 1200
+        combo = [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in action_types]
+        assert sim._is_pure_damage(combo)
+        event_sim = copy.deepcopy(sim)
+        assert sim.do_combo(combo) == event_sim.do_combo(combo, fast_path=False)
+        assert sim.snapshot().actors == event_sim.snapshot().actors
+        assert sim.queue.to_dict() == event_sim.queue.to_dict()
+        assert bool(sim.queue) == (distance > 0)
+
+
+    @pytest.mark.parametrize("actor", [Actor.BLUE, Actor.RED])
+    def test_fast_path_skips_conditional_buffs(self, sim: Simulation, actor):
+        combo = [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in (ActionType.Q, ActionType.AA, ActionType.AA, ActionType.Q)]
+        sim.actors[actor].add_buff(Buff.STATS, StatProperties(stat=Stat.AD, scaling="30", condition=Condition(key=Stat.ARMOR, comparison=Comparison.GT, value=0)))
+        assert not sim._is_pure_damage(combo)
+        event_sim = copy.deepcopy(sim)
+        assert sim.do_combo(combo) == event_sim.do_combo(combo, fast_path=False)
+
+
+    def test_fast_path_skips_dots(self, dot_sim: Simulation):
+        combo = [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in (ActionType.AA, ActionType.W)]
+        assert dot_sim._is_pure_damage(combo[:1])
+        assert not dot_sim._is_pure_damage(combo)
+
+
+    @pytest.mark.parametrize("action_types", [
+        (ActionType.Q, ActionType.AA, ActionType.AA, ActionType.Q),
+        (ActionType.W, ActionType.AA, ActionType.E, ActionType.AA, ActionType.W, ActionType.AA),
+    ])
+    def test_summary_mode(self, dot_sim: Simulation, action_types):
+        combo = [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in action_types]
+        full = copy.deepcopy(dot_sim).do_combo(combo)
+        summary_sim = Simulation(dot_sim.actors[Actor.BLUE], dot_sim.actors[Actor.RED], summary=True)
+        result = summary_sim.do_combo(combo)
+        assert result.effect_list == []
+        assert (result.damage, result.ticks) == (full.damage, full.ticks)
+        expected = {}
+        for event in full.effect_list:
+            for effect in event.result:
+                total = expected.setdefault((effect.source, effect.type_), [0, 0, 0])
+                total[0] += effect.value
+                total[1] += effect.raw
+                total[2] += 1
+        totals = {(total.source, total.type_): [total.value, total.raw, total.count] for total in result.totals}
+        assert totals.keys() == expected.keys()
+        for key, total in totals.items():
+            assert total == pytest.approx(expected[key])
+        assert sum(total.value for total in result.totals if total.type_ == EffectType.DAMAGE) == pytest.approx(summary_sim.actors[Actor.RED].damage_taken)
+
+
+    def test_summary_fork_is_independent(self, dot_sim: Simulation):
+        aa = Action(actor=Actor.BLUE, target=Actor.RED, action_type=ActionType.AA)
+        summary_sim = Simulation(dot_sim.actors[Actor.BLUE], dot_sim.actors[Actor.RED], summary=True)
+        summary_sim.do_combo([aa])
+        before = summary_sim.response().totals
+        branch = summary_sim.fork()
+        branch.do_combo([aa, aa])
+        assert summary_sim.response().totals == before
+        assert branch.actors[Actor.RED].summary is branch.summary
+        assert branch.response().totals[0].count == 3
+
+
+    def test_records_match_validated_models(self, sim: Simulation):
+        combo = [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in (ActionType.Q, ActionType.AA, ActionType.AA)]
+        sim.actors[Actor.RED].shields = [(100, 30, ActionType.W, Actor.RED)]
+        sim.do_combo(combo)
+        records = [record for event in sim.effect_list for record in event.result]
+        assert any(record.type_ == EffectType.SHIELD for record in records)
+        for record in records:
+            given = {field.name: getattr(record, field.name) for field in dataclasses.fields(record) if getattr(record, field.name) is not None}
+            assert record.to_model().json() == EffectResult(**given).json()
+
+
+    def test_stream_combo(self, dot_sim: Simulation):
+        combo = [Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type) for action_type in (ActionType.W, ActionType.AA, ActionType.E, ActionType.AA, ActionType.AA)]
+        full = copy.deepcopy(dot_sim).do_combo(combo, fast_path=False)
+        streamed = []
+        for record in dot_sim.stream_combo(combo):
+            assert dot_sim.effect_list == []
+            streamed.append(record.to_model())
+        assert streamed == full.effect_list
+        assert dot_sim.response().damage == full.damage
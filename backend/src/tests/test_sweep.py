@@ -0,0 +1,101 @@
+import json
+import pytest
+
+from src.server.models.champion import Champion
+from src.server.models.dataenums import ActionType, Actor, HpScaling, Stat
+from src.server.models.item import Item
+from src.server.models.request import Action, Rank, SweepPoint, V1Request
+from src.server.simulation.character import Character
+from src.server.simulation.simulation import Simulation
+from src.server.simulation.sweep import run_sweep
+
+
+
+
+@pytest.fixture
+def sweep_champion(aatrox_dot) -> Champion:
+    aatrox_dot.passive.effects = []
+    return aatrox_dot
+
+
+@pytest.fixture
+def sweep_items() -> dict[str, Item]:
+    items = {}
+    for name in ("triforce", "frozen_heart"):
+        with open(f"src/tests/static/json/{name}.json", encoding='UTF-8') as f:
+            items[name] = Item.parse_obj(json.load(f))
+    return items
+
+
+@pytest.fixture
+def sweep_request() -> V1Request:
+    return V1Request(
+        id_attacker="aatrox",
+        lvl_attacker=9,
+        ability_points_attacker=Rank(q=3, w=1, e=1, r=0),
+        items_attacker=["triforce"],
+        id_defender="aatrox",
+        lvl_defender=9,
+        ability_points_defender=Rank(q=3, w=1, e=1, r=0),
+        items_defender=["frozen_heart"],
+        combo=[Action(actor=Actor.BLUE, target=Actor.RED, action_type=action_type)
+               for action_type in (ActionType.Q, ActionType.AA, ActionType.W, ActionType.E, ActionType.AA, ActionType.Q)]
+    )
+
+
+@pytest.fixture
+def sweep_points() -> list[SweepPoint]:
+    points = [SweepPoint(lvl_attacker=level) for level in range(1, 19)]
+    points += [SweepPoint(ability_points_attacker=Rank(q=q, w=1, e=e, r=0)) for q in range(1, 6) for e in range(1, 6)]
+    points += [SweepPoint(bonus_stats_attacker={Stat.AD: ad, Stat.LETHALITY: lethality}) for ad in (0, 25, 60) for lethality in (0, 10, 20)]
+    points += [SweepPoint(bonus_stats_attacker={Stat.ATTACKSPEED_P: attackspeed}) for attackspeed in (0.1, 0.5, 1.2)]
+    points += [SweepPoint(bonus_stats_attacker={Stat.ABILITY_HASTE: 40}, lvl_defender=level) for level in (1, 13, 18)]
+    return points
+
+
+def simulate(v1_request: V1Request, point: SweepPoint, champion: Champion, items: dict[str, Item]) -> tuple[int, int]:
+    char_a = Character(champion, point.lvl_attacker or v1_request.lvl_attacker, point.ability_points_attacker or v1_request.ability_points_attacker,
+                       [items[item_id] for item_id in v1_request.items_attacker])
+    char_a.add_bonus_stats(point.bonus_stats_attacker)
+    char_d = Character(champion, point.lvl_defender or v1_request.lvl_defender, v1_request.ability_points_defender,
+                       [items[item_id] for item_id in v1_request.items_defender])
+    response = Simulation(char_a, char_d).do_combo(v1_request.combo)
+    return response.damage, response.ticks
+
+
+
+class TestSweep():
+
+    @pytest.mark.parametrize("hp_scaling", [HpScaling.FLAT, HpScaling.MAX_HP, HpScaling.CURRENT_HP, HpScaling.MISSING_HP])
+    def test_matches_full_simulation(self, sweep_champion, sweep_items, sweep_request, sweep_points, hp_scaling):
+        if hp_scaling != HpScaling.FLAT:
+            props = sweep_champion.q.effects[0].effect_components[0].props
+            props.scaling = "0.05 + rank * 0.01 + 0.0002 * ad"
+            props.hp_scaling = hp_scaling
+        outcome = run_sweep(sweep_request, sweep_points, {"aatrox": sweep_champion}, sweep_items)
+        assert outcome.vectorized == len(sweep_points)
+        assert 1 < outcome.timelines < len(sweep_points)
+        for point, result in zip(sweep_points, outcome.results):
+            assert (result.damage, result.ticks) == simulate(sweep_request, point, sweep_champion, sweep_items)
+
+
+    def test_stat_buffs_fall_back(self, aatrox_dot, sweep_items, sweep_request, sweep_points):
+        outcome = run_sweep(sweep_request, sweep_points, {"aatrox": aatrox_dot}, sweep_items)
+        assert outcome.vectorized == 0
+        for point, result in zip(sweep_points, outcome.results):
+            assert (result.damage, result.ticks) == simulate(sweep_request, point, aatrox_dot, sweep_items)
+
+
+    def test_indexed_formula(self, sweep_champion, sweep_items, sweep_request, sweep_points):
+        sweep_champion.q.effects[0].effect_components[0].props.scaling = "[0, 10, 20, 30, 40, 50][rank] + 0.5 * ad"
+        outcome = run_sweep(sweep_request, sweep_points, {"aatrox": sweep_champion}, sweep_items)
+        assert outcome.vectorized == len(sweep_points)
+        for point, result in zip(sweep_points, outcome.results):
+            assert (result.damage, result.ticks) == simulate(sweep_request, point, sweep_champion, sweep_items)
+
+
+    def test_errors_are_per_point(self, sweep_champion, sweep_items, sweep_request, sweep_points):
+        sweep_champion.w.validated = False
+        outcome = run_sweep(sweep_request, sweep_points, {"aatrox": sweep_champion}, sweep_items)
+        assert outcome.vectorized == 0
+        assert all(result.damage is None and "not implemented" in result.error for result in outcome.results)
@@ -0,0 +1,111 @@
+import copy
+import json
+import pytest
+
+from pydantic import BaseModel, ValidationError
+
+from src.server.models.champion import Champion
+from src.server.models.dataenums import DamageProperties, HealProperties, ShieldProperties, StatusProperties
+from src.server.models.item import Item
+from src.server.models.passive_effect import ActionProperties, EffectProps, GetHitProperties, HitProperties, StackProps, StatProperties
+from src.server.models.rune import Rune
+from src.server.models.summonerspell import Summonerspell
+from src.server.models.trusted import ALIASED_KEYS, POLYMORPHIC_PROPS, decode_document, trusted_decoder
+
+
+
+
+def load_document(name: str) -> dict:
+    with open(f"src/tests/static/json/{name}.json", encoding='UTF-8') as f:
+        document = json.load(f)
+    document.setdefault("_id", "668d33cd902f45aece3ca031")
+    document["validated"] = True
+    return document
+
+
+# One props document per class a polymorphic field can hold, so every entry of the props maps gets decoded.
+SAMPLE_PROPS: dict[type[BaseModel], dict] = {
+    DamageProperties: {"scaling": "20 + 0.5 * ad", "dmg_sub_type": "Magic", "hp_scaling": "max health", "vamp": 0.1},
+    HealProperties: {"scaling": "0.08 * ad", "hp_scaling": "missing health"},
+    ShieldProperties: {"scaling": "100", "duration": 2},
+    StatusProperties: {"type_": "Airborne", "duration": 1.5, "strength": 0.3},
+    StackProps: {"stack_key": "passive", "amount": "2"},
+    EffectProps: {"effect": {"type_": "Damage", "props": {"scaling": "30"}, "delay": 0.25}},
+    StatProperties: {"condition": {"key": "armor", "comparison": "Greater than", "value": 0}, "stat": "ad", "scaling": "10"},
+    ActionProperties: {"trigger": ["q"], "actions": [{"type_": "Stack", "props": {"stack_key": "q", "amount": "1"}}]},
+    HitProperties: {},
+    GetHitProperties: {"condition": {"key": "hp", "comparison": "Less than", "value": 500}}
+}
+
+POLYMORPHIC_CASES = [pytest.param(model_cls, {discriminator: value.value, "props": SAMPLE_PROPS[props_cls]}, id=f"{model_cls.__name__}-{props_cls.__name__}")
+                     for model_cls, (discriminator, props_map, _) in POLYMORPHIC_PROPS.items()
+                     for value, props_cls in props_map.items()]
+
+
+def nested_models(model: BaseModel) -> list[BaseModel]:
+    models = [model]
+    for value in model.__dict__.values():
+        for nested in value if isinstance(value, list) else [value]:
+            if isinstance(nested, BaseModel):
+                models += nested_models(nested)
+    return models
+
+
+def assert_decodes_like_parse_obj(compare_objects, model_cls: type[BaseModel], document: dict) -> None:
+    expected = model_cls.parse_obj(copy.deepcopy(document))
+    # Called directly, since decode_document would hide a decoder error behind its parse_obj fallback.
+    decoded = trusted_decoder(model_cls)(copy.deepcopy(document))
+    assert compare_objects(decoded, expected)
+    assert [type(model) for model in nested_models(decoded)] == [type(model) for model in nested_models(expected)]
+    assert [list(model.__dict__) for model in nested_models(decoded)] == [list(model.__dict__) for model in nested_models(expected)]
+    assert [model.__fields_set__ for model in nested_models(decoded)] == [model.__fields_set__ for model in nested_models(expected)]
+    assert decoded.json() == expected.json()
+    assert decode_document(model_cls, copy.deepcopy(document) | {"validated": True}).json() == expected.json()
+
+
+
+class TestTrustedDecoder():
+
+    @pytest.mark.parametrize("name, model_cls", [("aatrox", Champion), ("triforce", Item), ("frozen_heart", Item), ("smite", Summonerspell), ("conqueror", Rune)])
+    def test_matches_parse_obj(self, compare_objects, name, model_cls):
+        assert_decodes_like_parse_obj(compare_objects, model_cls, load_document(name))
+
+
+    @pytest.mark.parametrize("model_cls, document", POLYMORPHIC_CASES)
+    def test_polymorphic_props_match_parse_obj(self, compare_objects, model_cls, document):
+        assert_decodes_like_parse_obj(compare_objects, model_cls, document)
+
+
+    @pytest.mark.parametrize("model_cls, field", [(model_cls, field) for model_cls, fields in ALIASED_KEYS.items() for field in fields])
+    def test_aliased_keys_match_parse_obj(self, compare_objects, model_cls, field):
+        document = load_document("triforce") | {field: {"attack damage": 10, "ability haste": 5, "health": 100}}
+        for cls in (model_cls, *model_cls.__subclasses__()):
+            assert_decodes_like_parse_obj(compare_objects, cls, document)
+
+
+    def test_samples_cover_every_props_class(self):
+        assert set(SAMPLE_PROPS) == {props_cls for _, props_map, _ in POLYMORPHIC_PROPS.values() for props_cls in props_map.values()}
+
+
+    def test_does_not_share_defaults(self):
+        document = load_document("triforce")
+        del document["changes"]
+        first = trusted_decoder(Item)(document)
+        second = trusted_decoder(Item)(document)
+        first.changes.append("changed")
+        assert second.changes == []
+
+
+    def test_unvalidated_documents_are_parsed(self, mocker):
+        document = load_document("smite")
+        document["validated"] = False
+        decoder = mocker.patch("src.server.models.trusted.trusted_decoder")
+        assert decode_document(Summonerspell, document).name == document["name"]
+        decoder.assert_not_called()
+
+
+    def test_invalid_documents_fall_back_to_validation(self):
+        document = load_document("aatrox")
+        document["q"]["effects"][0]["effect_components"][0]["type_"] = "Not an effect"
+        with pytest.raises((ValidationError, ValueError)):
+            decode_document(Champion, document)